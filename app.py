@@ -14,13 +14,19 @@ In this lab, we will explore the Operational Risk Assessment Lifecycle Simulator
 *   Recognize the importance of clear taxonomies and consistent tracking in risk management.
 """)
 # Your code starts here
-page = st.sidebar.selectbox(label="Navigation", options=["Overview & Loss Data Simulation", "Risk Assessment"])
+page = st.sidebar.selectbox(label="Navigation", options=["Overview & Loss Data Simulation", "Risk Assessment", "Scenario Sweep"])
+from application_pages.diagnostics import DIAGNOSTICS_DEFAULT, render_diagnostics_panel, start_run_profile
+profile = start_run_profile(st.sidebar.toggle("Diagnostics", value=DIAGNOSTICS_DEFAULT, help="Time each page section and show the results in the sidebar"))
 if page == "Overview & Loss Data Simulation":
     from application_pages.loss_data_simulation import run_overview_loss_simulation
     run_overview_loss_simulation()
 elif page == "Risk Assessment":
     from application_pages.risk_assessment import run_risk_assessment
     run_risk_assessment()
+elif page == "Scenario Sweep":
+    from application_pages.scenario_sweep import run_scenario_sweep_page
+    run_scenario_sweep_page()
+render_diagnostics_panel(profile)
 # Your code ends
 
 
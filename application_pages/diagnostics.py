@@ -0,0 +1,57 @@
+import logging
+import os
+import time
+
+import streamlit as st
+import pandas as pd
+
+from oprisk.instrumentation import NULL_PROFILE, RunProfile
+
+logger = logging.getLogger("qulab.diagnostics")
+DIAGNOSTICS_DEFAULT = os.environ.get("QULAB_DIAGNOSTICS", "0") == "1"
+
+def start_run_profile(enabled):
+    """Creates the profile for this script run (a no-op profile when disabled) and makes it current."""
+    profile = RunProfile() if enabled else NULL_PROFILE
+    st.session_state.run_profile = profile
+    return profile
+
+def current_profile():
+    """Returns the profile of the current script run."""
+    return st.session_state.get('run_profile', NULL_PROFILE)
+
+def plotly_chart(fig, **kwargs):
+    """Renders a Plotly figure; with diagnostics on, also records its payload size and serialization time."""
+    profile = current_profile()
+    if not profile.enabled:
+        return st.plotly_chart(fig, **kwargs)
+    section = profile.current_section
+    profile.record(section, "payload_bytes", len(fig.to_json().encode('utf-8')))
+    started = time.perf_counter()
+    result = st.plotly_chart(fig, **kwargs)
+    profile.record(section, "serialize_seconds", time.perf_counter() - started)
+    return result
+
+def record_dataframe(name, df):
+    """Records the deep memory footprint of a DataFrame when diagnostics are on."""
+    profile = current_profile()
+    if profile.enabled:
+        profile.record(name, "dataframe_bytes", int(df.memory_usage(index=True, deep=True).sum()))
+
+def render_diagnostics_panel(profile):
+    """Shows this run's measurements in the sidebar and emits them as structured logs."""
+    if not profile.enabled:
+        return
+    records = profile.to_records()
+    for line in profile.to_json_lines().splitlines():
+        logger.info(line)
+
+    with st.sidebar.expander("Diagnostics", expanded=True):
+        if not records:
+            st.caption("No sections recorded in this run.")
+            return
+        table = pd.DataFrame(records).pivot_table(index='section', columns='metric', values='value', aggfunc='sum', sort=False)
+        st.metric("Run Time", f"{table['seconds'].sum() * 1000:,.0f} ms")
+        st.dataframe(table, use_container_width=True)
+        st.download_button("Download JSON Lines", profile.to_json_lines(), file_name="qulab_diagnostics.jsonl", mime="application/json")
+        st.download_button("Download Prometheus Metrics", profile.to_prometheus(), file_name="qulab_metrics.prom", mime="text/plain")
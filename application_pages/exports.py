@@ -0,0 +1,67 @@
+import os
+import tempfile
+
+import streamlit as st
+
+from oprisk.export import EXPORT_FORMATS, excel_available, export_format, export_to_file, export_to_temporary_file
+from oprisk.paths import resolve_in_directory
+
+EXPORT_DIR = os.environ.get("QULAB_EXPORT_DIR", os.path.join(tempfile.gettempdir(), "qulab-exports"))
+
+@st.fragment
+def export_data(file_stem, tables, key):
+    """Renders the format choice, a download button and a save-to-server option for a set of tables.
+
+    ``tables`` maps table names to a DataFrame or a list of DataFrames (e.g. history
+    batches). CSV and Parquet export one table at a time, Excel writes every table to
+    its own sheet. Files are only produced on request and are streamed chunk by chunk,
+    so choosing a format reruns just this section and serializes nothing.
+    """
+    formats = [file_format for file_format in EXPORT_FORMATS if file_format != "xlsx" or excel_available()]
+    col1, col2 = st.columns(2)
+    with col1:
+        file_format = st.selectbox("Format", options=formats, format_func=lambda file_format: EXPORT_FORMATS[file_format][0],
+                                   key=f"{key}_format")
+    with col2:
+        if file_format == "xlsx" or len(tables) == 1:
+            table = None
+            st.write("")
+        else:
+            table = st.selectbox("Table", options=list(tables), format_func=lambda name: name.replace('_', ' '), key=f"{key}_table")
+    if table is None:
+        data = tables if file_format == "xlsx" else next(iter(tables.values()))
+        file_name = f"{file_stem}.{file_format}"
+    else:
+        data = tables[table]
+        file_name = f"{file_stem}_{table.lower()}.{file_format}"
+
+    # The file is streamed into a temporary file only when the button is clicked
+    st.download_button(f"Download {file_name}", lambda: export_to_temporary_file(data, file_format), file_name=file_name,
+                       mime=EXPORT_FORMATS[file_format][1], key=f"{key}_download")
+    if not excel_available():
+        st.caption("Install the optional openpyxl package to export to Excel.")
+
+    col1, col2, col3 = st.columns([3, 1, 1])
+    with col1:
+        name = st.text_input("Or Save to the Server Export Folder", placeholder=file_name, key=f"{key}_path",
+                             help=f"Streams the export to a file under {EXPORT_DIR} on the app server, for data too large to download")
+    with col2:
+        st.write("")
+        overwrite = st.checkbox("Overwrite", key=f"{key}_overwrite", help="Replace a file of the same name")
+    with col3:
+        st.write("")
+        save = st.button("Save", key=f"{key}_save", disabled=not name.strip())
+    if save:
+        try:
+            path = resolve_in_directory(EXPORT_DIR, name)
+            if export_format(path) != file_format:
+                raise ValueError(f"'{name.strip()}' does not match the selected format; use a .{file_format} file.")
+            os.makedirs(EXPORT_DIR, exist_ok=True)
+            with st.spinner(f"Writing {path}..."):
+                written = export_to_file(data, path, file_format, overwrite=overwrite)
+        except FileExistsError:
+            st.error(f"'{name.strip()}' already exists; tick Overwrite to replace it.")
+        except (ValueError, OSError) as error:
+            st.error(f"Could not export: {error}")
+        else:
+            st.success(f"Wrote {written:,} bytes to {path}")
@@ -0,0 +1,39 @@
+import os
+
+import streamlit as st
+
+from oprisk.cache import DatasetCache, estimate_nbytes
+
+FIGURE_CACHE_MAX_BYTES = int(os.environ.get("QULAB_FIGURE_CACHE_MAX_MB", "64")) * 1024 * 1024
+
+def figure_nbytes(fig):
+    """Estimates the memory held by a Plotly figure, which is mostly the data arrays of its traces."""
+    return estimate_nbytes(fig.to_plotly_json())
+
+@st.cache_resource(show_spinner=False)
+def get_figure_cache():
+    """Returns the process-wide LRU cache of figures that do not belong to a cached dataset."""
+    return DatasetCache(max_bytes=FIGURE_CACHE_MAX_BYTES)
+
+def memoized_figure(name, version, build):
+    """Returns the figure ``name`` for a data ``version``, calling ``build()`` only the first time.
+
+    ``version`` identifies the figure's input data (e.g. an assessment store version) plus
+    any display options, so a figure is rebuilt only when its data actually changes and
+    is shared by every session viewing the same data. Figures are evicted least recently
+    used first once they exceed ``QULAB_FIGURE_CACHE_MAX_MB`` (default 64).
+    """
+    return get_figure_cache().get_or_create((name, version), build, nbytes=figure_nbytes).data
+
+def dataset_figure(cache, entry, name, build):
+    """Returns the figure ``name`` of a cached dataset, calling ``build()`` only the first time.
+
+    The figure is stored with the dataset's aggregates, so the raw rows it may embed
+    count against the dataset cache's memory budget and are freed with the dataset.
+    ``name`` must include any display options the figure depends on.
+    """
+    return cache.get_aggregate(entry, f"figure:{name}", lambda data: build(), nbytes=figure_nbytes)
+
+def dataset_payload_bytes(cache, entry, name, fig):
+    """Returns the size of the JSON the dataset figure ``name`` sends to the browser."""
+    return cache.get_aggregate(entry, f"payload_bytes:{name}", lambda data: len(fig.to_json().encode('utf-8')))
@@ -1,38 +1,127 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import plotly.express as px
-import plotly.graph_objects as go
-from datetime import datetime, timedelta
-
-def generate_synthetic_loss_data(num_events, start_date, end_date, business_units, risk_categories):
-    """Generates a synthetic dataset of operational loss events."""
-    data = []
-    for _ in range(num_events):
-        timestamp = pd.to_datetime(start_date) + pd.to_timedelta(np.random.randint(0, (end_date - start_date).days + 1), unit='D')
-
-        # Handle empty lists for business units and risk categories
-        if business_units:
-            business_unit = np.random.choice(business_units)
-        else:
-            business_unit = np.random.choice(["BU1", "BU2", "BU3"])  #Default values
-        if risk_categories:
-            risk_category = np.random.choice(risk_categories)
+import os
+import tempfile
+
+from application_pages.diagnostics import current_profile, plotly_chart
+from application_pages.exports import export_data
+from application_pages.figures import dataset_figure, dataset_payload_bytes
+from oprisk.cache import DatasetCache
+from oprisk.copula import CORRELATION_CHECK_YEARS, CORRELATION_TOLERANCE, DEFAULT_DEGREES_OF_FREEDOM, cell_correlation_matrix
+from oprisk.export import loss_aggregate_tables
+from oprisk.history import APPEND_PERIODS, LossHistory, append_loss_data_key
+from oprisk.ingest import loss_data_date_range, loss_file_cache_key, read_loss_data
+from oprisk.jobs import JobManager
+from oprisk.lda import (convergence_of_estimates, fit_lda_parameters_from_cube, simulate_annual_losses, simulate_correlated_annual_losses,
+                        summarize_annual_losses)
+from oprisk.paths import resolve_in_directory
+from oprisk.simulation import (LOSS_DATA_COLUMNS, SAMPLE_CANDIDATE_POINTS, SCATTER_MAX_POINTS, SCATTER_TAIL_POINTS, loss_data_cache_key,
+                               sample_loss_events, summarize_loss_cube)
+from oprisk.timeseries import EWMA_HALFLIFE_DAYS, ROLLING_VAR_LEVEL, ROLLING_WINDOWS, deterioration_report, rolling_loss_analytics_from_profile
+
+RENDER_ROW_THRESHOLD = int(os.environ.get("QULAB_RENDER_ROW_THRESHOLD", "50000"))
+MAX_LISTED_REJECTED_ROWS = 1000
+ROLLING_METRICS = {"Loss Total": "Loss", "Event Count": "Events", f"VaR {ROLLING_VAR_LEVEL:.0%}": "VaR", "EWMA Daily Loss": None}
+UPLOAD_DIR = os.environ.get("QULAB_UPLOAD_DIR", os.path.join(tempfile.gettempdir(), "qulab-uploads"))
+DATA_DIR = os.environ.get("QULAB_DATA_DIR", os.path.join(tempfile.gettempdir(), "qulab-data"))
+JOB_POLL_SECONDS = 0.5
+DEPENDENCE_OPTIONS = {"Independent": None, "Gaussian copula": "Gaussian", "t copula": "t"}
+# Cached per dataset and shared by the page sections; precomputed by generation jobs
+LOSS_AGGREGATES = {
+    "summary": lambda history: summarize_loss_cube(history.cube),
+    "rolling_analytics": lambda history: rolling_loss_analytics_from_profile(history.daily_profile, history.start_date, history.end_date),
+    "lda_parameters": lambda history: fit_lda_parameters_from_cube(history.cube, history.period_years),
+    "export_tables": lambda history: loss_aggregate_tables(history.cube),
+}
+HISTORY_AGGREGATES = ["memory_report", "loss_histogram", "sample_candidates"]
+
+@st.cache_resource
+def get_loss_data_cache():
+    """Returns the dataset cache shared by every session in this server process."""
+    return DatasetCache()
+
+@st.cache_resource
+def get_job_manager():
+    """Returns the background job pool shared by every session in this server process."""
+    return JobManager()
+
+def build_loss_history(key, on_chunk=None):
+    """Builds the loss history for a dataset key.
+
+    Keys longer than a ``loss_data_cache_key`` carry appended batches; the history is
+    built by appending the last batch to its (cached or rebuilt) parent. Keys from
+    ``loss_file_cache_key`` (the same length) are read from the file. ``on_chunk`` is
+    passed on to ``LossHistory.generate`` for simulated histories.
+    """
+    if len(key) > 6:
+        return get_cached_loss_data(key[:-1]).data.append_events(*key[-1])
+    if key[0] == "file":
+        _, path, _, start_date, end_date, (business_units, risk_categories) = key
+        loss_data, rejected = read_loss_data(path, start_date=start_date, end_date=end_date,
+                                             business_units=list(business_units), risk_categories=list(risk_categories))
+        if len(loss_data) == 0:
+            raise ValueError("No valid loss events match the selected file and filters.")
+        return LossHistory.from_loss_data(loss_data, *loss_data_date_range(loss_data, start_date, end_date), rejected=rejected)
+    return LossHistory.generate(*key[:5], seed=key[5], on_chunk=on_chunk)
+
+def generate_loss_data_job(job, cache, key):
+    """Generates and aggregates the dataset for a simulation key into the shared cache, reporting progress.
+
+    Runs on a ``JobManager`` worker. Partial results are the summary of the events
+    generated so far; the aggregates the page needs are computed here too, so the
+    page only has to draw them once the job is done.
+    """
+    num_events = key[0]
+
+    def on_chunk(events_so_far, cube):
+        job.report(0.8 * events_so_far / num_events, f"Generated {events_so_far:,} of {num_events:,} events",
+                   partial=summarize_loss_cube(cube))
+
+    entry = cache.get_or_create(key, lambda: build_loss_history(key, on_chunk=on_chunk))
+    names = list(LOSS_AGGREGATES) + HISTORY_AGGREGATES
+    for step, name in enumerate(names):
+        job.report(0.8 + 0.2 * step / len(names), f"Aggregating ({name.replace('_', ' ')})")
+        if name in LOSS_AGGREGATES:
+            cache.get_aggregate(entry, name, LOSS_AGGREGATES[name])
         else:
-            risk_category = np.random.choice(["RC1", "RC2", "RC3"])  #Default values
+            getattr(entry.data, name)
+    return entry
+
+def save_uploaded_loss_file(uploaded_file):
+    """Saves an uploaded loss data file to a new file under ``UPLOAD_DIR`` and returns its path.
 
-        # More realistic loss amount distribution
-        loss_amount = np.random.lognormal(mean=8, sigma=1.5)  # Log-normal for realistic loss distribution
-        near_miss_flag = np.random.choice([True, False], p=[0.1, 0.9])
-        control_breach_type = np.random.choice(["Type1", "Type2", "Type3"])
-        recovery_time_days = np.random.randint(1, 30)
+    Reading from disk lets uploads share the server-path ingestion (memory-mapped
+    Parquet, multithreaded CSV). Every upload gets its own file, which the caller
+    deletes once the dataset is loaded.
+    """
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    handle, path = tempfile.mkstemp(dir=UPLOAD_DIR, prefix="upload-", suffix=f"-{os.path.basename(uploaded_file.name)}")
+    with os.fdopen(handle, 'wb') as upload:
+        upload.write(uploaded_file.getvalue())
+    return path
 
-        data.append([timestamp, business_unit, risk_category, loss_amount, near_miss_flag, control_breach_type, recovery_time_days])
+def parse_labels(text):
+    """Parses a comma-separated list of labels, e.g. ``"Retail Banking, Operations"``."""
+    return [label.strip() for label in text.split(",") if label.strip()]
 
-    df = pd.DataFrame(data, columns=["Timestamp", "Business_Unit", "Risk_Category", "Loss_Amount", "Near_Miss_Flag", "Control_Breach_Type", "Recovery_Time_Days"])
-    return df.sort_values('Timestamp')
+def get_cached_loss_data(key):
+    """Returns the cache entry for a dataset key, rebuilding its loss history on a miss."""
+    return get_loss_data_cache().get_or_create(key, lambda: build_loss_history(key))
+
+def acquire_loss_data(key):
+    """Returns a handle to the shared dataset for a key; the session keeps only this handle."""
+    return get_loss_data_cache().acquire(key, lambda: build_loss_history(key))
+
+def run_overview_loss_simulation():
+    # Plotly is only needed to render, so it is imported lazily
+    import plotly.express as px
+    import plotly.graph_objects as go
+
+    profile = current_profile()
+    profile.page = "Loss Data Simulation"
+    profile.section("Inputs")
 
-def run_overview_loss_simulation():    
     # Loss Data Simulation Section
     st.header("Loss Data Simulation")
     
@@ -41,154 +130,190 @@ def run_overview_loss_simulation():
     ### Simulation Instructions
     
     **Configure Your Simulation:**
-    1. **Number of Events**: Choose how many loss events to generate (100-10,000). More events provide better trend visualization.
+    1. **Number of Events**: Choose how many loss events to generate (100-10,000,000). More events provide better trend visualization; above the rendering threshold the distribution and scatter charts switch to binned and sampled views.
     2. **Date Range**: Select the time period for your simulation data.
     3. **Business Units**: Select which business units to include in the simulation.
     4. **Risk Categories**: Choose the types of operational risks to simulate.
-    5. Click **"Generate Loss Data"** to create your synthetic dataset.
+    5. **Random Seed**: Fix the seed to reproduce the same dataset on every run.
+    6. Click **"Generate Loss Data"** to create your synthetic dataset (large runs show their progress and can be cancelled), or choose **Import File** to load historical loss events from a CSV or Parquet export instead.
+    7. Use **"Append Events"** to add a day, week or month of new events to the history and watch the dashboards update.
     """)
 
-    # Initialize session state variable
-    if 'loss_data' not in st.session_state:
-        st.session_state.loss_data = pd.DataFrame()
+    # Initialize session state variable; sessions hold a handle, the dataset itself lives in the shared cache
+    if 'loss_dataset' not in st.session_state:
+        st.session_state.loss_dataset = None
 
-    # Simulation Parameters
-    col1, col2 = st.columns(2)
-    
-    with col1:
-        num_events = st.number_input("Number of Loss Events to Simulate", min_value=100, max_value=10000, value=1000)
-        start_date, end_date = st.date_input("Simulation Date Range", value=[pd.to_datetime('2023-01-01'), pd.to_datetime('2023-12-31')])
-    
-    with col2:
-        business_units = st.multiselect("Select Business Units", options=['Investment Banking', 'Retail Banking', 'Asset Management', 'Operations'], default=['Investment Banking', 'Retail Banking'])
-        risk_categories = st.multiselect("Select Risk Categories", options=['Internal Fraud', 'External Fraud', 'System Failures', 'Process Errors'], default=['Internal Fraud', 'System Failures'])
+    # A finished generation job is collected before the inputs are drawn, so Generate is enabled again
+    pending = st.session_state.get('loss_data_job')
+    if pending is not None and pending[1].done:
+        collect_loss_data_job()
 
-    if st.button("Generate Loss Data", type="primary"):
-        with st.spinner("Generating synthetic loss data..."):
-            st.session_state.loss_data = generate_synthetic_loss_data(num_events, start_date, end_date, business_units, risk_categories)
-        st.success(f"Successfully generated {len(st.session_state.loss_data)} loss events!")
+    # Editing the inputs reruns only this fragment; generating reruns the page
+    loss_simulation_inputs()
+    if st.session_state.get('loss_data_job') is not None:
+        loss_data_job_progress()
+    job_notice = st.session_state.pop('loss_data_job_notice', None)
+    if job_notice:
+        level, text = job_notice
+        getattr(st, level)(text)
 
-    if not st.session_state.loss_data.empty:
+    if st.session_state.loss_dataset is not None:
+        notice = st.session_state.pop('loss_data_notice', None)
+        if notice:
+            st.success(notice)
+        rejected = st.session_state.loss_dataset.data.rejected
+        if rejected is not None and len(rejected) > 0:
+            with st.expander(f"Rejected Rows ({len(rejected):,})"):
+                st.dataframe(rejected.head(MAX_LISTED_REJECTED_ROWS), use_container_width=True)
+
+        profile.section("Append Events")
+        append_events_controls()
+
+        profile.section("Aggregation Cube")
+        cache = get_loss_data_cache()
+        dataset = st.session_state.loss_dataset
+        cached = dataset.entry
+        history = cached.data
+        # Every chart and metric below is answered from the cube, merged batch by batch
+        aggregates = cache.get_aggregate(cached, "summary", LOSS_AGGREGATES["summary"])
+        totals = aggregates["totals"]
+        if profile.enabled:
+            profile.record("Loss Data", "dataframe_bytes", history.nbytes)
+
+        profile.section("Summary Metrics")
         st.subheader("Generated Loss Data Overview")
+        st.caption(f"History covers {history.start_date:%Y-%m-%d} to {history.end_date:%Y-%m-%d} "
+                   f"in {history.num_batches} batch{'es' if history.num_batches > 1 else ''}")
         
         # Summary metrics
         col1, col2, col3, col4 = st.columns(4)
         with col1:
-            st.metric("Total Events", len(st.session_state.loss_data))
+            st.metric("Total Events", totals["event_count"])
         with col2:
-            st.metric("Total Loss Amount", f"${st.session_state.loss_data['Loss_Amount'].sum():,.0f}")
+            st.metric("Total Loss Amount", f"${totals['total_loss']:,.0f}")
         with col3:
-            st.metric("Average Loss", f"${st.session_state.loss_data['Loss_Amount'].mean():,.0f}")
+            st.metric("Average Loss", f"${totals['average_loss']:,.0f}")
         with col4:
-            st.metric("Max Loss", f"${st.session_state.loss_data['Loss_Amount'].max():,.0f}")
+            st.metric("Max Loss", f"${totals['max_loss']:,.0f}")
         
         # Data preview
         with st.expander("View Raw Data Sample"):
-            st.dataframe(st.session_state.loss_data.head(10))
+            st.dataframe(history.head(10))
+            if history.parent is not None:
+                st.markdown("Latest appended events")
+                st.dataframe(history.tail(10))
+
+        with st.expander("Memory Report"):
+            memory_report = history.memory_report
+            compact_mb, legacy_mb = memory_report['Bytes'].sum() / 1024**2, memory_report['Legacy_Bytes'].sum() / 1024**2
+            st.metric("Dataset Memory", f"{compact_mb:,.1f} MB", delta=f"{compact_mb - legacy_mb:,.1f} MB vs string/float64 schema", delta_color="inverse")
+            st.dataframe(memory_report, use_container_width=True, hide_index=True,
+                         column_config={"Savings": st.column_config.NumberColumn(format="percent")})
+
+        with st.expander("Export Data"):
+            # Batches are exported one after another, without concatenating the history
+            st.markdown("**Loss Events**")
+            export_data("loss_events", {"Loss_Events": history.chunks}, key="loss_events_export")
+            st.markdown("**Aggregates**")
+            export_data("loss_aggregates", cache.get_aggregate(cached, "export_tables", LOSS_AGGREGATES["export_tables"]), key="loss_aggregates_export")
+
+        cache_stats = cache.stats()
+        st.caption(f"Shared dataset cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses, "
+                   f"{cache_stats['evictions']} evictions, {cache_stats['entries']} datasets using "
+                   f"{cache_stats['nbytes'] / 1024**2:,.1f} of {cache_stats['max_bytes'] / 1024**2:,.0f} MB; "
+                   f"{cache_stats['references']} session handles on {cache_stats['shared_entries']} shared datasets")
 
         st.subheader("Loss Data Visualizations")
+        # Figures are stored with the cached dataset, so reruns reuse them until the data changes
 
         # Improved Trend Plot - Monthly Aggregation
+        profile.section("Monthly Loss Trend")
         st.markdown("### Monthly Loss Trend")
         
-        # Aggregate by month for cleaner visualization
-        monthly_data = st.session_state.loss_data.copy()
-        monthly_data['Year_Month'] = monthly_data['Timestamp'].dt.to_period('M')
-        monthly_agg = monthly_data.groupby('Year_Month').agg({
-            'Loss_Amount': ['sum', 'mean', 'count']
-        }).round(2)
-        monthly_agg.columns = ['Total_Loss', 'Average_Loss', 'Event_Count']
-        monthly_agg = monthly_agg.reset_index()
-        monthly_agg['Year_Month'] = monthly_agg['Year_Month'].dt.to_timestamp()
-        
-        # Create subplot with dual y-axis
-        fig_trend = go.Figure()
-        
-        # Add total loss amount
-        fig_trend.add_trace(go.Scatter(
-            x=monthly_agg['Year_Month'], 
-            y=monthly_agg['Total_Loss'],
-            mode='lines+markers',
-            name='Total Monthly Loss',
-            line=dict(color='red', width=3),
-            marker=dict(size=8)
-        ))
-        
-        fig_trend.update_layout(
-            title="Monthly Operational Loss Trends",
-            xaxis_title="Month",
-            yaxis_title="Loss Amount ($)",
-            hovermode='x unified',
-            showlegend=True,
-            height=500
-        )
+        # Monthly aggregation for cleaner visualization
+        monthly_agg = aggregates["monthly"]
+
+        def build_trend():
+            # Create subplot with dual y-axis
+            fig_trend = go.Figure()
+            
+            # Add total loss amount
+            fig_trend.add_trace(go.Scatter(
+                x=monthly_agg['Year_Month'], 
+                y=monthly_agg['Total_Loss'],
+                mode='lines+markers',
+                name='Total Monthly Loss',
+                line=dict(color='red', width=3),
+                marker=dict(size=8)
+            ))
+            
+            fig_trend.update_layout(
+                title="Monthly Operational Loss Trends",
+                xaxis_title="Month",
+                yaxis_title="Loss Amount ($)",
+                hovermode='x unified',
+                showlegend=True,
+                height=500
+            )
+            return fig_trend
         
-        st.plotly_chart(fig_trend, use_container_width=True)
+        plotly_chart(dataset_figure(cache, cached, "loss_trend", build_trend), use_container_width=True)
 
         # Event count trend
+        profile.section("Monthly Event Count")
         st.markdown("### Monthly Event Count")
-        fig_count = px.bar(monthly_agg, x='Year_Month', y='Event_Count', 
-                          title="Number of Loss Events per Month",
-                          labels={'Event_Count': 'Number of Events', 'Year_Month': 'Month'})
-        fig_count.update_layout(height=400)
-        st.plotly_chart(fig_count, use_container_width=True)
-
-        # Loss distribution
-        st.markdown("### Loss Amount Distribution")
-        fig_hist = px.histogram(st.session_state.loss_data, x="Loss_Amount", nbins=50,
-                               title="Distribution of Loss Amounts",
-                               labels={'Loss_Amount': 'Loss Amount ($)', 'count': 'Frequency'})
-        fig_hist.update_layout(height=400)
-        st.plotly_chart(fig_hist, use_container_width=True)
+
+        def build_count():
+            fig_count = px.bar(monthly_agg, x='Year_Month', y='Event_Count', 
+                              title="Number of Loss Events per Month",
+                              labels={'Event_Count': 'Number of Events', 'Year_Month': 'Month'})
+            fig_count.update_layout(height=400)
+            return fig_count
+
+        plotly_chart(dataset_figure(cache, cached, "event_count", build_count), use_container_width=True)
+
+        # Rolling trends have their own window and metric selectors, which rerun only that section
+        profile.section("Rolling Risk Trends")
+        rolling_risk_trends(cache, cached)
 
         # Business unit comparison
+        profile.section("Loss by Business Unit")
         st.markdown("### Loss Analysis by Business Unit")
         col1, col2 = st.columns(2)
+        loss_by_bu = aggregates["loss_by_bu"]
         
         with col1:
             # Total loss by business unit
-            loss_by_bu = st.session_state.loss_data.groupby("Business_Unit")["Loss_Amount"].sum().reset_index()
-            fig_bar = px.bar(loss_by_bu, x="Business_Unit", y="Loss_Amount", 
-                            title="Total Loss Amount by Business Unit",
-                            color="Loss_Amount", color_continuous_scale="Reds")
-            st.plotly_chart(fig_bar, use_container_width=True)
+            plotly_chart(dataset_figure(cache, cached, "loss_by_bu", lambda: px.bar(
+                loss_by_bu, x="Business_Unit", y="Loss_Amount",
+                title="Total Loss Amount by Business Unit",
+                color="Loss_Amount", color_continuous_scale="Reds")), use_container_width=True)
         
         with col2:
             # Average loss by business unit
-            avg_loss_by_bu = st.session_state.loss_data.groupby("Business_Unit")["Loss_Amount"].mean().reset_index()
-            fig_avg = px.bar(avg_loss_by_bu, x="Business_Unit", y="Loss_Amount", 
-                            title="Average Loss Amount by Business Unit",
-                            color="Loss_Amount", color_continuous_scale="Blues")
-            st.plotly_chart(fig_avg, use_container_width=True)
+            plotly_chart(dataset_figure(cache, cached, "avg_loss_by_bu", lambda: px.bar(
+                aggregates["avg_loss_by_bu"], x="Business_Unit", y="Loss_Amount",
+                title="Average Loss Amount by Business Unit",
+                color="Loss_Amount", color_continuous_scale="Blues")), use_container_width=True)
 
         # Risk category analysis
+        profile.section("Loss by Risk Category")
         st.markdown("### Loss Analysis by Risk Category")
-        loss_by_risk = st.session_state.loss_data.groupby("Risk_Category").agg({
-            'Loss_Amount': ['sum', 'mean', 'count']
-        }).round(2)
-        loss_by_risk.columns = ['Total_Loss', 'Average_Loss', 'Event_Count']
-        loss_by_risk = loss_by_risk.reset_index()
-        
-        fig_sunburst = px.sunburst(st.session_state.loss_data, 
-                                  path=['Risk_Category', 'Business_Unit'], 
-                                  values='Loss_Amount',
-                                  title="Loss Distribution by Risk Category and Business Unit")
-        st.plotly_chart(fig_sunburst, use_container_width=True)
-
-        # Recovery time analysis
-        st.markdown("### Recovery Time vs Loss Severity")
-        fig_scatter = px.scatter(st.session_state.loss_data, x="Recovery_Time_Days", y="Loss_Amount", 
-                               color="Business_Unit", size="Loss_Amount",
-                               title="Loss Amount vs. Recovery Time",
-                               labels={'Recovery_Time_Days': 'Recovery Time (Days)', 'Loss_Amount': 'Loss Amount ($)'},
-                               hover_data=['Risk_Category'])
-        fig_scatter.update_layout(height=500)
-        st.plotly_chart(fig_scatter, use_container_width=True)
+        plotly_chart(dataset_figure(cache, cached, "loss_by_risk_bu", lambda: px.sunburst(
+            aggregates["loss_by_risk_bu"],
+            path=['Risk_Category', 'Business_Unit'],
+            values='Loss_Sum',
+            labels={'Loss_Sum': 'Loss_Amount'},
+            title="Loss Distribution by Risk Category and Business Unit")), use_container_width=True)
+
+        # Rendering options only affect the event-level charts, which rerun on their own
+        event_level_charts(cache, cached, totals["event_count"])
         
         # Summary insights
+        profile.section("Key Insights")
         st.markdown("### Key Insights")
-        total_loss = st.session_state.loss_data['Loss_Amount'].sum()
-        avg_recovery = st.session_state.loss_data['Recovery_Time_Days'].mean()
+        total_loss = totals["total_loss"]
+        avg_recovery = totals["average_recovery_days"]
         highest_risk_bu = loss_by_bu.loc[loss_by_bu['Loss_Amount'].idxmax(), 'Business_Unit']
         
         st.info(f"""
@@ -198,3 +323,379 @@ def run_overview_loss_simulation():
         - **Total Simulated Losses:** ${total_loss:,.0f}
         - **Risk Concentration:** {(loss_by_bu['Loss_Amount'].max() / total_loss * 100):.1f}% of losses from top business unit
         """)
+
+        profile.section("Capital Estimation")
+        run_capital_estimation(cache, cached, dataset.key)
+    profile.end_section()
+
+@st.fragment
+def loss_simulation_inputs():
+    """Renders the simulation inputs; only a successful generation reruns the whole page."""
+    source = st.radio("Data Source", options=["Simulate", "Import File"], horizontal=True,
+                      help="Simulate synthetic loss events, or load historical ones from a CSV or Parquet export")
+    if source == "Import File":
+        loss_file_inputs()
+        return
+
+    # Simulation Parameters
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        num_events = st.number_input("Number of Loss Events to Simulate", min_value=100, max_value=10_000_000, value=1000)
+        seed = st.number_input("Random Seed", min_value=0, value=42, step=1, help="The same seed and parameters always reproduce the same dataset")
+        start_date, end_date = st.date_input("Simulation Date Range", value=[pd.to_datetime('2023-01-01'), pd.to_datetime('2023-12-31')])
+    
+    with col2:
+        business_units = st.multiselect("Select Business Units", options=['Investment Banking', 'Retail Banking', 'Asset Management', 'Operations'], default=['Investment Banking', 'Retail Banking'])
+        risk_categories = st.multiselect("Select Risk Categories", options=['Internal Fraud', 'External Fraud', 'System Failures', 'Process Errors'], default=['Internal Fraud', 'System Failures'])
+
+    # One generation job per session at a time; the progress section below polls it
+    if st.button("Generate Loss Data", type="primary", disabled=st.session_state.get('loss_data_job') is not None):
+        current_profile().section("Generation")
+        key = loss_data_cache_key(num_events, start_date, end_date, business_units, risk_categories, seed)
+        job = get_job_manager().submit(f"Generating {num_events:,} loss events", generate_loss_data_job, get_loss_data_cache(), key)
+        # Jobs that finish within one poll interval are shown straight away, without the progress section
+        job.wait(JOB_POLL_SECONDS)
+        st.session_state.loss_data_job = (key, job)
+        st.rerun()
+
+def collect_loss_data_job():
+    """Takes the session's finished generation job: keeps a handle to its dataset, or records why it stopped."""
+    key, job = st.session_state.pop('loss_data_job')
+    if job.state == "done":
+        # The job's entry is normally still cached; if it was evicted, its data is re-added as is
+        st.session_state.loss_dataset = get_loss_data_cache().acquire(key, lambda: job.result.data)
+        st.session_state.loss_data_notice = f"Successfully generated {job.result.data.event_count:,} loss events in {job.elapsed:.1f} s!"
+    elif job.state == "failed":
+        st.session_state.loss_data_job_notice = ("error", f"Generation failed: {job.error}")
+    elif job.partial is not None:
+        st.session_state.loss_data_job_notice = ("info", f"Generation cancelled after {job.partial['totals']['event_count']:,} events.")
+    else:
+        st.session_state.loss_data_job_notice = ("info", "Generation cancelled.")
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def loss_data_job_progress():
+    """Polls the session's generation job: shows its progress and partial results and lets the user cancel it.
+
+    The section reruns on its own every ``JOB_POLL_SECONDS`` while the job is pending;
+    once the job has finished, the whole page reruns to collect and show its dataset.
+    """
+    import plotly.express as px
+
+    _, job = st.session_state.loss_data_job
+    if job.done:
+        # The page run collects the job before drawing the dataset
+        st.rerun()
+
+    manager = get_job_manager()
+    col1, col2 = st.columns([5, 1])
+    with col1:
+        if job.state == "queued":
+            stats = manager.stats()
+            st.progress(0.0, text=f"{job.description}: queued behind {manager.queue_position(job)} job(s), "
+                                  f"{stats['running']} of {stats['max_workers']} workers busy")
+        else:
+            st.progress(job.progress, text=f"{job.description}: {'cancelling' if job.cancel_requested else job.message} ({job.elapsed:.1f} s)")
+    with col2:
+        if st.button("Cancel", disabled=job.cancel_requested):
+            job.cancel()
+
+    partial = job.partial
+    if partial is not None:
+        # Events come out in time order, so the partial monthly counts fill in month by month
+        totals = partial["totals"]
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Events so Far", f"{totals['event_count']:,}")
+        with col2:
+            st.metric("Total Loss so Far", f"${totals['total_loss']:,.0f}")
+        with col3:
+            st.metric("Max Loss so Far", f"${totals['max_loss']:,.0f}")
+        fig_partial = px.bar(partial["monthly"], x='Year_Month', y='Event_Count', title="Events Generated so Far per Month",
+                             labels={'Event_Count': 'Number of Events', 'Year_Month': 'Month'})
+        fig_partial.update_layout(height=300)
+        plotly_chart(fig_partial, use_container_width=True)
+
+def loss_file_inputs():
+    """Renders the loss data import inputs and loads the selected file into the shared cache."""
+    st.markdown(f"""
+    Load historical loss events with the columns `{'`, `'.join(LOSS_DATA_COLUMNS)}` from a CSV file, a Parquet
+    file or a partitioned Parquet directory. Values are converted to the simulator's schema; rows that fail
+    validation are skipped and listed. Date and label filters are applied while reading.
+    """)
+    col1, col2 = st.columns(2)
+    with col1:
+        uploaded_file = st.file_uploader("Loss Data File", type=['csv', 'parquet'])
+        server_path = st.text_input("Or Path in the Server Data Folder", placeholder="loss_events.parquet",
+                                    help=f"A CSV file, Parquet file or partitioned Parquet directory under {DATA_DIR} on the app server")
+    with col2:
+        filter_dates = st.checkbox("Only load a date range")
+        date_range = st.date_input("Import Date Range", value=[pd.to_datetime('2023-01-01'), pd.to_datetime('2023-12-31')],
+                                   disabled=not filter_dates, key="import_date_range")
+        business_units = parse_labels(st.text_input("Only these Business Units", help="Comma-separated; leave empty to load all"))
+        risk_categories = parse_labels(st.text_input("Only these Risk Categories", help="Comma-separated; leave empty to load all"))
+
+    if st.button("Load Loss Data", type="primary", disabled=uploaded_file is None and not server_path.strip()):
+        if filter_dates and len(date_range) != 2:
+            st.error("Select both a start and an end date.")
+            return
+        start_date, end_date = date_range if filter_dates else (None, None)
+        current_profile().section("Ingestion")
+        upload_path = None
+        try:
+            with st.spinner("Reading loss data..."):
+                if uploaded_file is not None:
+                    path = upload_path = save_uploaded_loss_file(uploaded_file)
+                else:
+                    path = resolve_in_directory(DATA_DIR, server_path)
+                dataset = acquire_loss_data(loss_file_cache_key(path, start_date, end_date, business_units, risk_categories))
+        except (ValueError, OSError) as error:
+            st.error(f"Could not load loss data: {error}")
+            return
+        finally:
+            # The cache holds the loaded history, so the uploaded copy is no longer needed
+            if upload_path is not None:
+                os.remove(upload_path)
+        st.session_state.loss_dataset = dataset
+        rejected = dataset.data.rejected
+        source = uploaded_file.name if uploaded_file is not None else os.path.basename(path)
+        st.session_state.loss_data_notice = (f"Loaded {dataset.data.event_count:,} loss events from {source}"
+                                             + (f"; {len(rejected):,} invalid rows skipped." if len(rejected) else "."))
+        st.rerun()
+
+@st.fragment
+def append_events_controls():
+    """Renders the append controls; only an append reruns the whole page."""
+    st.markdown("### Append New Events")
+    st.markdown("Simulate the arrival of new loss events after the current history. "
+                "Aggregates are updated from the new batch only, without rescanning past events.")
+    col1, col2, col3 = st.columns([2, 2, 1])
+    with col1:
+        append_period = st.selectbox("Append Period", options=list(APPEND_PERIODS), index=1)
+    with col2:
+        append_events = st.number_input("New Events per Period", min_value=1, max_value=1_000_000, value=100)
+    with col3:
+        st.write("")
+        if st.button("Append Events"):
+            with st.spinner("Appending loss events..."):
+                st.session_state.loss_dataset = acquire_loss_data(
+                    append_loss_data_key(st.session_state.loss_dataset.key, append_events, APPEND_PERIODS[append_period]))
+            st.rerun()
+
+@st.fragment
+def rolling_risk_trends(cache, cached):
+    """Renders rolling per-business-unit loss trends and the units deteriorating against the previous window."""
+    import plotly.express as px
+
+    st.markdown("### Rolling Risk Trends")
+    st.markdown("Trailing-window loss totals, event counts and tail losses for each business unit, to spot deteriorating units early.")
+    analytics = cache.get_aggregate(cached, "rolling_analytics", LOSS_AGGREGATES["rolling_analytics"])
+
+    col1, col2 = st.columns(2)
+    with col1:
+        window = st.radio("Rolling Window", options=list(ROLLING_WINDOWS), format_func=lambda days: f"{days} days", horizontal=True)
+    with col2:
+        metric = st.selectbox("Rolling Metric", options=list(ROLLING_METRICS),
+                              help=f"VaR is the {ROLLING_VAR_LEVEL:.0%} quantile of individual losses in the window; "
+                                   f"EWMA Daily Loss weights days with a {EWMA_HALFLIFE_DAYS}-day half-life")
+    column = f"{ROLLING_METRICS[metric]}_{window}D" if ROLLING_METRICS[metric] else "EWMA_Daily_Loss"
+    title = f"{metric} per Business Unit" + ("" if column == "EWMA_Daily_Loss" else f" (trailing {window} days)")
+
+    def build_rolling_trend():
+        fig_rolling = px.line(analytics, x='Date', y=column, color='Business_Unit', title=title, labels={column: metric})
+        fig_rolling.update_layout(height=450, hovermode='x unified')
+        return fig_rolling
+
+    plotly_chart(dataset_figure(cache, cached, f"rolling_trend:{column}", build_rolling_trend), use_container_width=True)
+
+    report = deterioration_report(analytics, window)
+    if len(report) == 0:
+        st.info(f"The history needs more than {window} days to compare two {window}-day windows.")
+        return
+    st.markdown(f"**Latest {window} days vs the {window} days before**")
+    money = st.column_config.NumberColumn(format="dollar")
+    change = st.column_config.NumberColumn(format="percent")
+    st.dataframe(report, use_container_width=True, hide_index=True, column_config={
+        f"Loss_{window}D": money, f"Previous_Loss_{window}D": money, f"VaR_{window}D": money, f"Previous_VaR_{window}D": money,
+        "Loss_Change": change, "Events_Change": change, "VaR_Change": change,
+    })
+    deteriorating = report.loc[(report['Loss_Change'] > 0) & (report['VaR_Change'] > 0), 'Business_Unit']
+    if len(deteriorating) > 0:
+        st.warning(f"Rising losses and tail losses over the last {window} days: {', '.join(map(str, deteriorating))}")
+
+@st.fragment
+def event_level_charts(cache, cached, event_count):
+    """Renders the distribution and scatter charts, whose rendering options rerun only this fragment."""
+    import plotly.express as px
+    import plotly.graph_objects as go
+
+    profile = current_profile()
+    history = cached.data
+    with st.expander("Rendering Options"):
+        render_threshold = st.number_input("Row threshold for binned/sampled charts", min_value=1000, value=RENDER_ROW_THRESHOLD, step=10000,
+                                           help="Above this many events the histogram is binned server-side and the scatter plot shows a WebGL sample")
+        scatter_points = st.number_input("Maximum scatter points", min_value=SCATTER_TAIL_POINTS * 2, max_value=SAMPLE_CANDIDATE_POINTS,
+                                         value=SCATTER_MAX_POINTS, step=1000)
+    large_dataset = event_count > render_threshold
+
+    # Loss distribution
+    profile.section("Loss Amount Distribution")
+    st.markdown("### Loss Amount Distribution")
+
+    def build_histogram():
+        if large_dataset:
+            # Log-spaced bins computed once per dataset suit the lognormal severities
+            loss_bins = history.loss_histogram
+            fig_hist = go.Figure(go.Scatter(
+                x=np.append(loss_bins['Bin_Start'], loss_bins['Bin_End'].iloc[-1]),
+                y=np.append(loss_bins['Count'], loss_bins['Count'].iloc[-1]),
+                mode='lines',
+                line_shape='hv',
+                fill='tozeroy',
+                name='Frequency'
+            ))
+            fig_hist.update_layout(title="Distribution of Loss Amounts (log-binned)",
+                                   xaxis_title="Loss Amount ($)", yaxis_title="Frequency", xaxis_type='log')
+        else:
+            fig_hist = px.histogram(history.frame(), x="Loss_Amount", nbins=50,
+                                   title="Distribution of Loss Amounts",
+                                   labels={'Loss_Amount': 'Loss Amount ($)', 'count': 'Frequency'})
+        fig_hist.update_layout(height=400)
+        return fig_hist
+
+    histogram_name = f"loss_histogram:{large_dataset}"
+    fig_hist = dataset_figure(cache, cached, histogram_name, build_histogram)
+    plotly_chart(fig_hist, use_container_width=True)
+    st.caption(f"Chart payload: {dataset_payload_bytes(cache, cached, histogram_name, fig_hist) / 1024:,.1f} KB"
+               + (f" (binned from {event_count:,} events)" if large_dataset else ""))
+
+    # Recovery time analysis
+    profile.section("Recovery Time vs Severity")
+    st.markdown("### Recovery Time vs Loss Severity")
+    if large_dataset:
+        # WebGL sample that always keeps the tail losses
+        scatter_data = cache.get_aggregate(cached, f"scatter_sample:{scatter_points}",
+                                           lambda history: sample_loss_events(history.sample_candidates, max_points=scatter_points))
+    else:
+        scatter_data = history.frame()
+
+    def build_scatter():
+        fig_scatter = px.scatter(scatter_data, x="Recovery_Time_Days", y="Loss_Amount",
+                               color="Business_Unit", size="Loss_Amount",
+                               title="Loss Amount vs. Recovery Time",
+                               labels={'Recovery_Time_Days': 'Recovery Time (Days)', 'Loss_Amount': 'Loss Amount ($)'},
+                               hover_data=['Risk_Category'],
+                               render_mode='webgl' if large_dataset else 'auto')
+        fig_scatter.update_layout(height=500)
+        return fig_scatter
+
+    scatter_name = f"recovery_scatter:{scatter_points}" if large_dataset else "recovery_scatter:all"
+    fig_scatter = dataset_figure(cache, cached, scatter_name, build_scatter)
+    plotly_chart(fig_scatter, use_container_width=True)
+    st.caption(f"Chart payload: {dataset_payload_bytes(cache, cached, scatter_name, fig_scatter) / 1024:,.1f} KB"
+               + (f" (showing {len(scatter_data):,} of {event_count:,} events, all top {SCATTER_TAIL_POINTS:,} losses kept)" if large_dataset else ""))
+
+@st.fragment
+def run_capital_estimation(cache, cached, loss_data_key):
+    """Renders the Loss Distribution Approach capital section for the current dataset."""
+    import plotly.graph_objects as go
+
+    st.markdown("### Capital Estimation (Loss Distribution Approach)")
+    st.markdown("""
+    The Loss Distribution Approach combines a Poisson event **frequency** with a lognormal loss **severity**
+    for each Business Unit / Risk Category cell and simulates many years to obtain the **annual aggregate
+    loss distribution**. Capital is read off its tail: **VaR 99.9%** and the **Expected Shortfall** beyond it.
+    Parameters are fitted from the generated data and can be edited before running. By default the cells are
+    independent; a **Gaussian** or **t copula** makes bad years coincide across cells, e.g. a system failure hitting
+    several business units at once, which raises the tail capital.
+    """)
+
+    fitted = cache.get_aggregate(cached, "lda_parameters", LOSS_AGGREGATES["lda_parameters"])
+    parameters = st.data_editor(fitted, use_container_width=True, disabled=['Business_Unit', 'Risk_Category'],
+                                key=f"lda_parameters_{hash(loss_data_key)}")
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        num_years = st.number_input("Simulated Years", min_value=1000, max_value=10_000_000, value=100_000, step=10_000)
+    with col2:
+        max_workers = st.number_input("Worker Processes", min_value=1, max_value=os.cpu_count() or 1, value=os.cpu_count() or 1)
+    with col3:
+        lda_seed = st.number_input("Capital Simulation Seed", min_value=0, value=42, step=1)
+
+    dependence = st.selectbox("Dependence Between Cells", options=DEPENDENCE_OPTIONS,
+                              help="Cells are simulated independently, or their annual losses are joined by a Gaussian or t copula")
+    copula = DEPENDENCE_OPTIONS[dependence]
+    if copula:
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            same_business_unit = st.slider("Same Business Unit", min_value=-0.5, max_value=1.0, value=0.5, step=0.05,
+                                           help="Copula correlation between two risk categories of one business unit")
+        with col2:
+            same_risk_category = st.slider("Same Risk Category", min_value=-0.5, max_value=1.0, value=0.3, step=0.05,
+                                           help="Copula correlation between two business units for one risk category")
+        with col3:
+            other_cells = st.slider("Other Cells", min_value=-0.5, max_value=1.0, value=0.1, step=0.05)
+        with col4:
+            degrees_of_freedom = st.number_input("Degrees of Freedom", min_value=1, max_value=100, value=DEFAULT_DEGREES_OF_FREEDOM,
+                                                 disabled=copula != "t", help="Fewer degrees of freedom make joint extreme years more likely")
+
+    if st.button("Run Capital Simulation"):
+        with st.spinner(f"Simulating {num_years:,} years of aggregate losses..."):
+            if copula:
+                correlation = cell_correlation_matrix(parameters, same_business_unit, same_risk_category, other_cells)
+                try:
+                    simulated = simulate_correlated_annual_losses(parameters, correlation, int(num_years), copula=copula,
+                                                                  degrees_of_freedom=int(degrees_of_freedom), seed=int(lda_seed),
+                                                                  max_workers=int(max_workers))
+                except ValueError as error:
+                    st.error(str(error))
+                    simulated = None
+            else:
+                simulated = {"annual_losses": simulate_annual_losses(parameters, int(num_years), seed=int(lda_seed), max_workers=int(max_workers))}
+        if simulated is not None:
+            annual_losses = simulated["annual_losses"]
+            st.session_state.lda_results = {
+                "dataset": loss_data_key,
+                "summary": summarize_annual_losses(annual_losses),
+                "convergence": convergence_of_estimates(annual_losses),
+                "dependence": dependence,
+                "independent_summary": summarize_annual_losses(simulated["independent_annual_losses"]) if copula else None,
+                "correlation_check": simulated.get("correlation_check"),
+            }
+
+    results = st.session_state.get('lda_results')
+    if results and results["dataset"] == loss_data_key:
+        summary, independent = results["summary"], results.get("independent_summary")
+        col1, col2, col3, col4 = st.columns(4)
+        for column, label, statistic in zip([col1, col2, col3, col4], ["Expected Annual Loss", "VaR 99%", "VaR 99.9%", "Expected Shortfall 99.9%"],
+                                            ["Expected Loss", "VaR 99.0%", "VaR 99.9%", "ES 99.9%"]):
+            with column:
+                delta = f"{round(summary[statistic] - independent[statistic]):+,} vs independent" if independent else None
+                st.metric(label, f"${summary[statistic]:,.0f}", delta=delta, delta_color="inverse")
+
+        statistics = pd.DataFrame({'Statistic': list(summary), 'Annual Loss ($)': list(summary.values())})
+        if independent:
+            statistics['Independent Cells ($)'] = list(independent.values())
+            statistics['Dependence Effect ($)'] = statistics['Annual Loss ($)'] - statistics['Independent Cells ($)']
+        st.dataframe(statistics, use_container_width=True)
+
+        check = results.get("correlation_check")
+        if check is not None:
+            with st.expander(f"Correlation Check ({results['dependence']})"):
+                st.caption(f"{int(check['Within_Tolerance'].sum()):,} of {len(check):,} cell pairs realize their requested correlation "
+                           f"within ±{CORRELATION_TOLERANCE:.2f}, measured by Kendall's tau on the first {CORRELATION_CHECK_YEARS:,} "
+                           "simulated years. Cells with many loss-free years realize less than requested.")
+                st.dataframe(check, use_container_width=True)
+
+        convergence = results["convergence"]
+        fig_convergence = go.Figure()
+        for column, label in [('VaR', 'VaR 99.9%'), ('Expected_Shortfall', 'Expected Shortfall 99.9%'), ('Expected_Loss', 'Expected Loss')]:
+            fig_convergence.add_trace(go.Scatter(x=convergence['Simulated_Years'], y=convergence[column], mode='lines+markers', name=label))
+        fig_convergence.update_layout(
+            title="Convergence of Capital Estimates",
+            xaxis_title="Simulated Years",
+            yaxis_title="Annual Loss ($)",
+            xaxis_type='log',
+            height=450
+        )
+        plotly_chart(fig_convergence, use_container_width=True)
@@ -1,79 +1,145 @@
+import time
+
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-
-def calculate_residual_risk(inherent_risk_level, control_effectiveness_level, approach):
-    """Calculates residual risk based on inherent risk, control effectiveness, and approach."""
-    if approach == "Simple":
-        risk_matrix = {
-            ("High", "Effective"): "Low",
-            ("High", "Partially Effective"): "Medium",
-            ("High", "Ineffective"): "High",
-            ("Medium", "Effective"): "Low",
-            ("Medium", "Partially Effective"): "Medium",
-            ("Medium", "Ineffective"): "Medium",
-            ("Low", "Effective"): "Low",
-            ("Low", "Partially Effective"): "Low",
-            ("Low", "Ineffective"): "Low",
-        }
-    elif approach == "Weighted":
-        # Enhanced weighted approach with more nuanced risk calculations
-        risk_matrix = {
-            ("High", "Effective"): "Low",
-            ("High", "Partially Effective"): "Medium-High",
-            ("High", "Ineffective"): "High",
-            ("Medium", "Effective"): "Very Low",
-            ("Medium", "Partially Effective"): "Medium",
-            ("Medium", "Ineffective"): "Medium-High",
-            ("Low", "Effective"): "Very Low",
-            ("Low", "Partially Effective"): "Low",
-            ("Low", "Ineffective"): "Medium",
-        }
-    else:
-        raise ValueError("Invalid approach. Must be 'Simple' or 'Weighted'.")
-    return risk_matrix[(inherent_risk_level, control_effectiveness_level)]
+
+from application_pages.diagnostics import current_profile, plotly_chart, record_dataframe
+from application_pages.exports import export_data
+from application_pages.figures import memoized_figure
+from oprisk.assessment import (CONTROL_EFFECTIVENESS_LEVELS, IMPORT_REQUIRED_FIELDS, INHERENT_RISK_LEVELS, RESIDUAL_RISK_LEVELS,
+                               RISK_MATRICES, read_assessment_file, record_assessment, validate_assessments)
+from oprisk.store import AssessmentStore
+from oprisk.whatif import encode_portfolio, residual_risk_heat_map, run_what_if
+
+MAX_LISTED_UNITS = 25
+MAX_LISTED_CHANGED_UNITS = 1000
+
+@st.cache_resource
+def get_assessment_store():
+    """Returns the assessment store shared by every session in this server process."""
+    return AssessmentStore()
 
 def store_risk_assessment_inputs(unit_name, inherent_risk, controls, control_effectiveness, risk_description):
-    """Stores risk assessment details in Streamlit session state."""
-    if 'risk_assessments' not in st.session_state:
-        st.session_state.risk_assessments = []
-    
-    # Calculate residual risk
-    residual_risk = calculate_residual_risk(inherent_risk, control_effectiveness, "Simple")
-    
-    # Store assessment
-    assessment = {
-        "unit_name": unit_name,
-        "inherent_risk": inherent_risk,
-        "controls": controls,
-        "control_effectiveness": control_effectiveness,
-        "residual_risk": residual_risk,
-        "risk_description": risk_description
-    }
-    
-    # Check if unit already exists and update, otherwise add new
-    existing_index = None
-    for i, existing in enumerate(st.session_state.risk_assessments):
-        if existing["unit_name"] == unit_name:
-            existing_index = i
-            break
-    
-    if existing_index is not None:
-        st.session_state.risk_assessments[existing_index] = assessment
-        st.success(f"Updated risk assessment for '{unit_name}'!")
-    else:
-        st.session_state.risk_assessments.append(assessment)
-        st.success(f"Added new risk assessment for '{unit_name}'!")
+    """Stores risk assessment details in the shared assessment store and returns a confirmation message."""
+    # Residual risk uses the Simple approach; the unit is updated if it already exists
+    _, added = record_assessment(get_assessment_store(), unit_name, inherent_risk, controls, control_effectiveness, risk_description)
+    if added:
+        return f"Added new risk assessment for '{unit_name}'!"
+    return f"Updated risk assessment for '{unit_name}'!"
 
-def run_risk_assessment():
-    st.header("Risk Assessment & Management")
+@st.cache_resource(max_entries=4, show_spinner=False)
+def encoded_portfolio(path, version, _store):
+    """Returns the portfolio encoded for what-if scenarios, once per store version."""
+    return encode_portfolio(_store.frame())
+
+def heat_map_figure(heat_map, title):
+    """Draws a residual risk heat map with the residual level and unit count of each cell."""
+    import plotly.graph_objects as go
+
+    # High inherent risk at the top, controls from weakest to strongest
+    cells = heat_map.set_index(['Inherent_Risk', 'Control_Effectiveness'])
+    rows, columns = INHERENT_RISK_LEVELS, CONTROL_EFFECTIVENESS_LEVELS[::-1]
+    residual = [[cells.loc[(inherent, control), 'Residual_Risk'] for control in columns] for inherent in rows]
+    counts = [[cells.loc[(inherent, control), 'Count'] for control in columns] for inherent in rows]
+    fig_heatmap = go.Figure(data=go.Heatmap(
+        z=[[RESIDUAL_RISK_LEVELS.index(level) for level in row] for row in residual],
+        x=columns,
+        y=rows,
+        text=[[f"{level}<br>{count:,} units" for level, count in zip(*row)] for row in zip(residual, counts)],
+        texttemplate="%{text}",
+        textfont={"size": 12, "color": "white"},
+        colorscale=[[0, '#90EE90'], [0.25, '#FFFF00'], [0.5, '#FFA500'], [0.75, '#FF6347'], [1, '#DC143C']],
+        zmin=0,
+        zmax=len(RESIDUAL_RISK_LEVELS) - 1,
+        showscale=False,
+        hoverongaps=False
+    ))
+    fig_heatmap.update_layout(
+        title=title,
+        xaxis_title="Control Effectiveness",
+        yaxis_title="Inherent Risk Level",
+        yaxis_autorange='reversed',
+        height=400
+    )
+    return fig_heatmap
+
+@st.fragment
+def what_if_analysis(version, encoded):
+    """Renders the control-effectiveness what-if section; changing a scenario reruns only this section."""
+    import plotly.express as px
+
+    st.markdown("### What-If Analysis")
+    st.markdown("""
+    Change the control effectiveness of every matching unit in the portfolio and see how the residual
+    risk distribution shifts, or compare the Simple and Weighted approaches on the same portfolio.
+    """)
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        from_levels = st.multiselect("Controls Currently", options=CONTROL_EFFECTIVENESS_LEVELS, default=['Partially Effective'])
+        to_level = st.selectbox("Become", options=CONTROL_EFFECTIVENESS_LEVELS, index=0)
+    with col2:
+        units = st.text_input("Business Units Containing", placeholder="e.g., Operations",
+                              help="Case-insensitive; leave empty for the whole portfolio")
+        inherent_levels = st.multiselect("Inherent Risk Levels", options=INHERENT_RISK_LEVELS,
+                                         help="Leave empty for every inherent risk level")
+    with col3:
+        baseline_approach = st.selectbox("Current Approach", options=list(RISK_MATRICES), key="what_if_baseline_approach")
+        approach = st.selectbox("Scenario Approach", options=list(RISK_MATRICES), key="what_if_approach")
+
+    change = {"to": to_level, "from": from_levels, "units": units.strip(), "inherent_risk": inherent_levels}
+    started = time.perf_counter()
+    result = run_what_if(encoded, [change], approach=approach, baseline_approach=baseline_approach)
+    elapsed = time.perf_counter() - started
+    distribution, changed_units = result["distribution"], result["changed_units"]
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Units Changed", f"{len(changed_units):,}")
+    with col2:
+        high_before = int(distribution.loc[distribution['Residual_Risk'].isin(['High', 'Medium-High']), 'Before'].sum())
+        high_after = int(distribution.loc[distribution['Residual_Risk'].isin(['High', 'Medium-High']), 'After'].sum())
+        st.metric("High Risk Units", f"{high_after:,}", delta=high_after - high_before, delta_color="inverse")
+    with col3:
+        low_before = int(distribution.loc[distribution['Residual_Risk'].isin(['Very Low', 'Low']), 'Before'].sum())
+        low_after = int(distribution.loc[distribution['Residual_Risk'].isin(['Very Low', 'Low']), 'After'].sum())
+        st.metric("Low Risk Units", f"{low_after:,}", delta=low_after - low_before)
+    st.caption(f"Scenario computed for {len(encoded['control']):,} assessments in {elapsed * 1000:.1f} ms")
+
+    # Scenario figures are memoized too, so flipping between scenarios reuses them
+    scenario = version + (tuple(from_levels), to_level, units.strip().lower(), tuple(inherent_levels), baseline_approach, approach)
+    plotly_chart(memoized_figure("what_if_distribution", scenario, lambda: px.bar(
+        distribution.melt(id_vars=['Residual_Risk'], value_vars=['Before', 'After'], var_name='Portfolio', value_name='Units'),
+        x='Residual_Risk', y='Units', color='Portfolio', barmode='group',
+        title="Residual Risk Distribution Before and After",
+        labels={'Residual_Risk': 'Residual Risk'},
+        category_orders={'Residual_Risk': RESIDUAL_RISK_LEVELS}
+    )), use_container_width=True)
+
+    col1, col2 = st.columns(2)
+    with col1:
+        plotly_chart(memoized_figure("what_if_heat_map_before", scenario, lambda: heat_map_figure(
+            result["heat_map_before"], f"Before ({baseline_approach})")), use_container_width=True)
+    with col2:
+        plotly_chart(memoized_figure("what_if_heat_map_after", scenario, lambda: heat_map_figure(
+            result["heat_map_after"], f"After ({approach})")), use_container_width=True)
+
+    if len(changed_units) > 0:
+        st.markdown(f"**Changed Units** ({len(changed_units):,})")
+        st.dataframe(changed_units.head(MAX_LISTED_CHANGED_UNITS), use_container_width=True, hide_index=True)
+        if len(changed_units) > MAX_LISTED_CHANGED_UNITS:
+            st.caption(f"Showing the first {MAX_LISTED_CHANGED_UNITS:,}; download the CSV for all of them.")
+        # Serialized only when the button is clicked, not on every scenario change
+        st.download_button("Download Changed Units (CSV)", lambda: changed_units.to_csv(index=False), file_name="what_if_changed_units.csv", mime="text/csv")
+    else:
+        st.info("No unit's control effectiveness or residual risk changes in this scenario.")
 
-    # Initialize session state variables
-    if 'risk_assessments' not in st.session_state:
-        st.session_state.risk_assessments = []
+def store_risk_assessment_batch(assessments):
+    """Adds or updates a validated batch of assessments in the shared store; returns (added, updated)."""
+    return get_assessment_store().upsert_many(assessments)
 
+@st.fragment
+def risk_assessment_form():
+    """Renders the assessment form; only adding an assessment reruns the whole page."""
     # Input Section with contextual instructions
     st.subheader("Define Risk Assessment")
     
@@ -128,18 +194,70 @@ def run_risk_assessment():
     # Add assessment button
     if st.button("Add/Update Risk Assessment", type="primary"):
         if unit_name and risk_description and controls:
-            store_risk_assessment_inputs(unit_name, inherent_risk, controls, control_effectiveness, risk_description)
+            st.session_state.assessment_notice = store_risk_assessment_inputs(unit_name, inherent_risk, controls, control_effectiveness, risk_description)
+            st.rerun()
         else:
             st.error("Please fill in all required fields (Business Unit Name, Risk Description, and Controls)")
+    notice = st.session_state.pop('assessment_notice', None)
+    if notice:
+        st.success(notice)
+
+@st.fragment
+def bulk_import_assessments():
+    """Renders the bulk import expander; only a completed import reruns the whole page."""
+    with st.expander("Bulk Import Assessments"):
+        st.markdown(f"""
+        Upload a **CSV** or **Parquet** file with the columns `{'`, `'.join(IMPORT_REQUIRED_FIELDS)}`.
+        Residual risk is calculated for the whole file at once; existing business units are updated.
+        """)
+        uploaded_file = st.file_uploader("Assessment File", type=['csv', 'parquet'])
+        import_approach = st.radio("Residual Risk Approach", options=list(RISK_MATRICES), horizontal=True)
+        if uploaded_file is not None and st.button("Import Assessments"):
+            try:
+                valid, rejected = validate_assessments(read_assessment_file(uploaded_file, uploaded_file.name), import_approach)
+            except ValueError as error:
+                st.error(str(error))
+            else:
+                added, updated = store_risk_assessment_batch(valid)
+                # Kept across the page rerun that refreshes the portfolio below
+                st.session_state.assessment_import_result = (len(valid), added, updated, rejected.head(100), len(rejected))
+                st.rerun()
+        result = st.session_state.pop('assessment_import_result', None)
+        if result:
+            imported, added, updated, rejected, rejected_count = result
+            st.success(f"Imported {imported:,} assessments ({added:,} added, {updated:,} updated).")
+            if rejected_count > 0:
+                st.warning(f"Rejected {rejected_count:,} rows:")
+                st.dataframe(rejected, use_container_width=True)
+
+def run_risk_assessment():
+    # Plotly is only needed to render, so it is imported lazily
+    import plotly.express as px
+
+    profile = current_profile()
+    profile.page = "Risk Assessment"
+    profile.section("Inputs")
+
+    st.header("Risk Assessment & Management")
+
+    # The portfolio is shared by all sessions; pick up writes from other app processes
+    store = get_assessment_store()
+    store.refresh()
+
+    # Typing into the form reruns only its fragment; adding or importing reruns the page
+    risk_assessment_form()
+    bulk_import_assessments()
 
     st.divider()
 
     # Display existing assessments
-    if st.session_state.risk_assessments:
+    if len(store) > 0:
         st.subheader("Risk Assessment Portfolio")
         
-        # Create DataFrame for analysis
-        df_assessments = pd.DataFrame(st.session_state.risk_assessments)
+        profile.section("Portfolio Summary")
+        # Columnar view of the portfolio, maintained by the store
+        df_assessments = store.frame()
+        record_dataframe("Portfolio Summary", df_assessments)
         
         # Summary metrics
         col1, col2, col3, col4 = st.columns(4)
@@ -156,42 +274,54 @@ def run_risk_assessment():
             st.metric("Risk Reduction Cases", risk_reduction)
 
         # Detailed assessments table
+        profile.section("Assessment Details")
         st.markdown("### Assessment Details")
         
-        # Format the data for better display
-        display_df = df_assessments.copy()
-        display_df = display_df[['unit_name', 'inherent_risk', 'control_effectiveness', 'residual_risk', 'risk_description']]
-        display_df.columns = ['Business Unit', 'Inherent Risk', 'Control Effectiveness', 'Residual Risk', 'Risk Description']
-        
-        st.dataframe(display_df, use_container_width=True)
+        # Relabel columns at display time instead of copying the shared portfolio frame
+        st.dataframe(df_assessments, use_container_width=True,
+                     column_order=['unit_name', 'inherent_risk', 'control_effectiveness', 'residual_risk', 'risk_description'],
+                     column_config={
+                         'unit_name': 'Business Unit',
+                         'inherent_risk': 'Inherent Risk',
+                         'control_effectiveness': 'Control Effectiveness',
+                         'residual_risk': 'Residual Risk',
+                         'risk_description': 'Risk Description',
+                     })
+        with st.expander("Export Portfolio"):
+            export_data("risk_assessments", {"Risk_Assessments": df_assessments}, key="portfolio_export")
         
         # Visualizations
+        profile.section("Risk Distribution Charts")
         st.markdown("### Risk Analysis Visualizations")
+        # Figures are memoized by store version, so reruns reuse them until the portfolio changes
+        version = (store.path, store.version)
         
         # Risk distribution charts
         col1, col2 = st.columns(2)
         
         with col1:
             # Inherent vs Residual Risk comparison
-            risk_comparison = pd.DataFrame({
-                'Risk Type': ['Inherent Risk'] * len(df_assessments) + ['Residual Risk'] * len(df_assessments),
-                'Risk Level': list(df_assessments['inherent_risk']) + list(df_assessments['residual_risk']),
-                'Business Unit': list(df_assessments['unit_name']) + list(df_assessments['unit_name'])
-            })
-            
-            fig_comparison = px.histogram(
-                risk_comparison, 
-                x='Risk Level', 
-                color='Risk Type',
-                barmode='group',
-                title="Inherent vs Residual Risk Distribution",
-                category_orders={'Risk Level': ['Low', 'Medium', 'Medium-High', 'High']}
-            )
-            st.plotly_chart(fig_comparison, use_container_width=True)
+            def build_comparison():
+                # Level counts only, rather than a long-format copy of every assessment
+                risk_comparison = pd.concat({
+                    'Inherent Risk': df_assessments['inherent_risk'].value_counts(),
+                    'Residual Risk': df_assessments['residual_risk'].value_counts(),
+                }, names=['Risk Type', 'Risk Level']).reset_index(name='count')
+                
+                return px.bar(
+                    risk_comparison, 
+                    x='Risk Level', 
+                    y='count',
+                    color='Risk Type',
+                    barmode='group',
+                    title="Inherent vs Residual Risk Distribution",
+                    category_orders={'Risk Level': ['Low', 'Medium', 'Medium-High', 'High']}
+                )
+            plotly_chart(memoized_figure("risk_comparison", version, build_comparison), use_container_width=True)
         
         with col2:
             # Control effectiveness distribution
-            fig_controls = px.pie(
+            plotly_chart(memoized_figure("control_effectiveness", version, lambda: px.pie(
                 df_assessments, 
                 names='control_effectiveness',
                 title="Control Effectiveness Distribution",
@@ -200,78 +330,55 @@ def run_risk_assessment():
                     'Partially Effective': '#FFD700', 
                     'Ineffective': '#DC143C'
                 }
-            )
-            st.plotly_chart(fig_controls, use_container_width=True)
+            )), use_container_width=True)
 
         # Risk matrix visualization
+        profile.section("Risk Heat Map")
         st.markdown("### Risk Heat Map")
         
-        # Create risk matrix data
-        risk_levels = ['Low', 'Medium', 'High']
-        control_levels = ['Ineffective', 'Partially Effective', 'Effective']
-        
-        # Simple approach matrix
-        matrix_data = []
-        matrix_colors = []
-        for inherent in risk_levels:
-            row_data = []
-            row_colors = []
-            for control in control_levels:
-                residual = calculate_residual_risk(inherent, control, "Simple")
-                row_data.append(residual)
-                # Color mapping
-                color_map = {'Low': 1, 'Medium': 2, 'Medium-High': 3, 'High': 4, 'Very Low': 0}
-                row_colors.append(color_map.get(residual, 2))
-            matrix_data.append(row_data)
-            matrix_colors.append(row_colors)
-
-        fig_heatmap = go.Figure(data=go.Heatmap(
-            z=matrix_colors,
-            x=control_levels,
-            y=risk_levels[::-1],  # Reverse to show High at top
-            text=matrix_data[::-1],  # Reverse to match y-axis
-            texttemplate="%{text}",
-            textfont={"size": 12, "color": "white"},
-            colorscale=[[0, '#90EE90'], [0.25, '#FFFF00'], [0.5, '#FFA500'], [0.75, '#FF6347'], [1, '#DC143C']],
-            showscale=False,
-            hoverongaps=False
-        ))
-        
-        fig_heatmap.update_layout(
-            title="Risk Assessment Matrix (Inherent Risk vs Control Effectiveness)",
-            xaxis_title="Control Effectiveness",
-            yaxis_title="Inherent Risk Level",
-            height=400
-        )
-        
-        st.plotly_chart(fig_heatmap, use_container_width=True)
+        heat_map_approach = st.radio("Heat Map Approach", options=list(RISK_MATRICES), horizontal=True)
+        # Each cell shows its residual risk and how many units sit in it
+        encoded = encoded_portfolio(store.path, store.version, store)
+        plotly_chart(memoized_figure("risk_heat_map", version + (heat_map_approach,), lambda: heat_map_figure(
+            residual_risk_heat_map(encoded["inherent"], encoded["control"], heat_map_approach),
+            f"Risk Assessment Matrix (Inherent Risk vs Control Effectiveness, {heat_map_approach})"
+        )), use_container_width=True)
+
+        # Scenario inputs rerun only the what-if section
+        profile.section("What-If Analysis")
+        what_if_analysis(version, encoded)
 
         # Business unit risk profile
+        profile.section("Business Unit Risk Profiles")
         st.markdown("### Business Unit Risk Profiles")
         
         # Create a comprehensive view
-        fig_profile = px.scatter(
-            df_assessments,
-            x='inherent_risk',
-            y='control_effectiveness',
-            size=[10] * len(df_assessments),  # Fixed size for visibility
-            color='residual_risk',
-            hover_name='unit_name',
-            hover_data=['risk_description'],
-            title="Risk Profile by Business Unit",
-            color_discrete_map={
-                'Low': '#2E8B57',
-                'Medium': '#FFD700',
-                'Medium-High': '#FF6347',
-                'High': '#DC143C',
-                'Very Low': '#90EE90'
-            }
-        )
+        def build_profile():
+            fig_profile = px.scatter(
+                df_assessments,
+                x='inherent_risk',
+                y='control_effectiveness',
+                size=[10] * len(df_assessments),  # Fixed size for visibility
+                color='residual_risk',
+                hover_name='unit_name',
+                hover_data=['risk_description'],
+                title="Risk Profile by Business Unit",
+                color_discrete_map={
+                    'Low': '#2E8B57',
+                    'Medium': '#FFD700',
+                    'Medium-High': '#FF6347',
+                    'High': '#DC143C',
+                    'Very Low': '#90EE90'
+                }
+            )
         
-        fig_profile.update_layout(height=500)
-        st.plotly_chart(fig_profile, use_container_width=True)
+            fig_profile.update_layout(height=500)
+            return fig_profile
+
+        plotly_chart(memoized_figure("risk_profile", version, build_profile), use_container_width=True)
 
         # Risk improvement recommendations
+        profile.section("Recommendations")
         st.markdown("### Risk Management Recommendations")
         
         high_risk_units = df_assessments[df_assessments['residual_risk'].isin(['High', 'Medium-High'])]
@@ -279,13 +386,17 @@ def run_risk_assessment():
         
         if len(high_risk_units) > 0:
             st.warning(f"**High Priority Actions Required:**")
-            for _, unit in high_risk_units.iterrows():
+            for _, unit in high_risk_units.head(MAX_LISTED_UNITS).iterrows():
                 st.write(f"- **{unit['unit_name']}**: Residual risk is {unit['residual_risk']}. Consider strengthening controls.")
+            if len(high_risk_units) > MAX_LISTED_UNITS:
+                st.write(f"- ...and {len(high_risk_units) - MAX_LISTED_UNITS:,} more units")
         
         if len(ineffective_controls) > 0:
             st.error(f"**Control Effectiveness Issues:**")
-            for _, unit in ineffective_controls.iterrows():
+            for _, unit in ineffective_controls.head(MAX_LISTED_UNITS).iterrows():
                 st.write(f"- **{unit['unit_name']}**: Controls are ineffective. Immediate review required.")
+            if len(ineffective_controls) > MAX_LISTED_UNITS:
+                st.write(f"- ...and {len(ineffective_controls) - MAX_LISTED_UNITS:,} more units")
         
         if len(high_risk_units) == 0 and len(ineffective_controls) == 0:
             st.success("**Good Risk Posture**: All business units have acceptable residual risk levels with effective controls.")
@@ -293,6 +404,8 @@ def run_risk_assessment():
     else:
         st.info("**Get Started**: Add your first risk assessment using the form above to see visualizations and analysis.")
 
+    profile.end_section()
+
     # Educational content
     with st.expander("Learn More About Risk Assessment"):
         st.markdown("""
@@ -0,0 +1,117 @@
+import os
+
+import streamlit as st
+import pandas as pd
+
+from application_pages.diagnostics import current_profile, plotly_chart
+from oprisk.simulation import DEFAULT_NEAR_MISS_PROBABILITY, DEFAULT_SEVERITY_MU, DEFAULT_SEVERITY_SIGMA
+from oprisk.sweep import expand_scenario_grid, run_scenario_sweep
+
+BUSINESS_UNIT_OPTIONS = ['Investment Banking', 'Retail Banking', 'Asset Management', 'Operations']
+RISK_CATEGORY_OPTIONS = ['Internal Fraud', 'External Fraud', 'System Failures', 'Process Errors']
+MAX_SWEEP_SCENARIOS = 200
+
+def parse_values(text, cast=float):
+    """Parses a comma-separated list of values, e.g. ``"7.5, 8, 8.5"``."""
+    return [cast(value) for value in text.replace(";", ",").split(",") if value.strip()]
+
+def run_scenario_sweep_page():
+    # Plotly is only needed to render, so it is imported lazily
+    import plotly.express as px
+
+    profile = current_profile()
+    profile.page = "Scenario Sweep"
+    profile.section("Inputs")
+
+    st.header("Scenario Sweep")
+    st.markdown("""
+    Compare many what-if configurations of the loss generator side by side. Every combination of the
+    values below is simulated in its own worker process with an independent seed, and only summary
+    statistics come back, so dozens of scenarios can be compared without holding their raw events.
+    """)
+
+    col1, col2 = st.columns(2)
+    with col1:
+        num_events = st.number_input("Events per Scenario", min_value=100, max_value=10_000_000, value=100_000, step=10_000)
+        start_date, end_date = st.date_input("Simulation Date Range", value=[pd.to_datetime('2023-01-01'), pd.to_datetime('2023-12-31')],
+                                             key="sweep_date_range")
+        severity_mu_text = st.text_input("Severity Mu values", value=f"{DEFAULT_SEVERITY_MU - 0.5:g}, {DEFAULT_SEVERITY_MU:g}, {DEFAULT_SEVERITY_MU + 0.5:g}",
+                                         help="Comma-separated means of the log loss amount")
+        severity_sigma_text = st.text_input("Severity Sigma values", value=f"{DEFAULT_SEVERITY_SIGMA:g}",
+                                            help="Comma-separated standard deviations of the log loss amount")
+        near_miss_text = st.text_input("Near-Miss Probabilities", value=f"{DEFAULT_NEAR_MISS_PROBABILITY:g}")
+    with col2:
+        business_units = st.multiselect("Business Units", options=BUSINESS_UNIT_OPTIONS, default=BUSINESS_UNIT_OPTIONS[:2], key="sweep_business_units")
+        split_business_units = st.checkbox("Also run each business unit on its own")
+        risk_categories = st.multiselect("Risk Categories", options=RISK_CATEGORY_OPTIONS, default=RISK_CATEGORY_OPTIONS[::2], key="sweep_risk_categories")
+        split_risk_categories = st.checkbox("Also run each risk category on its own")
+        sweep_seed = st.number_input("Sweep Seed", min_value=0, value=42, step=1)
+        max_workers = st.number_input("Worker Processes", min_value=1, max_value=os.cpu_count() or 1, value=os.cpu_count() or 1, key="sweep_workers")
+
+    try:
+        grid = {
+            "num_events": int(num_events),
+            "start_date": start_date,
+            "end_date": end_date,
+            "business_units": [business_units] + ([[unit] for unit in business_units] if split_business_units and len(business_units) > 1 else []),
+            "risk_categories": [risk_categories] + ([[category] for category in risk_categories] if split_risk_categories and len(risk_categories) > 1 else []),
+            "severity_mu": parse_values(severity_mu_text),
+            "severity_sigma": parse_values(severity_sigma_text),
+            "near_miss_probability": parse_values(near_miss_text),
+        }
+        scenarios = expand_scenario_grid(grid)
+    except ValueError as error:
+        st.error(f"Invalid sweep parameters: {error}")
+        return
+    st.caption(f"{len(scenarios)} scenario(s) x {num_events:,} events")
+
+    if st.button("Run Scenario Sweep", type="primary", disabled=len(scenarios) > MAX_SWEEP_SCENARIOS):
+        profile.section("Sweep")
+        try:
+            with st.spinner(f"Simulating {len(scenarios)} scenarios..."):
+                summary, by_bu = run_scenario_sweep(scenarios, seed=int(sweep_seed), max_workers=int(max_workers))
+        except ValueError as error:
+            st.error(f"Sweep failed: {error}")
+        else:
+            st.session_state.sweep_results = {"summary": summary, "by_bu": by_bu}
+    if len(scenarios) > MAX_SWEEP_SCENARIOS:
+        st.warning(f"Reduce the grid to at most {MAX_SWEEP_SCENARIOS} scenarios.")
+
+    results = st.session_state.get('sweep_results')
+    if results:
+        profile.section("Comparison")
+        summary, by_bu = results["summary"], results["by_bu"]
+        st.subheader("Scenario Comparison")
+        columns = ['Scenario', 'Label', 'Events', 'Total_Loss', 'Average_Loss', 'Loss_P50', 'Loss_P99', 'Loss_P99.9', 'Max_Loss',
+                   'Near_Miss_Rate', 'Top_Business_Unit', 'Concentration_Ratio']
+        st.dataframe(summary[columns], use_container_width=True, hide_index=True, column_config={
+            "Total_Loss": st.column_config.NumberColumn(format="dollar"),
+            "Average_Loss": st.column_config.NumberColumn(format="dollar"),
+            "Loss_P50": st.column_config.NumberColumn(format="dollar"),
+            "Loss_P99": st.column_config.NumberColumn(format="dollar"),
+            "Loss_P99.9": st.column_config.NumberColumn(format="dollar"),
+            "Max_Loss": st.column_config.NumberColumn(format="dollar"),
+            "Near_Miss_Rate": st.column_config.NumberColumn(format="percent"),
+            "Concentration_Ratio": st.column_config.NumberColumn(format="percent"),
+        })
+
+        col1, col2 = st.columns(2)
+        with col1:
+            fig_total = px.bar(summary, x='Label', y='Total_Loss', title="Total Loss by Scenario",
+                               labels={'Total_Loss': 'Total Loss ($)', 'Label': 'Scenario'})
+            fig_total.update_layout(height=450, xaxis_tickangle=-30)
+            plotly_chart(fig_total, use_container_width=True)
+        with col2:
+            quantiles = summary.melt(id_vars=['Label'], value_vars=['Loss_P50', 'Loss_P99', 'Loss_P99.9'], var_name='Quantile', value_name='Loss_Amount')
+            fig_quantiles = px.bar(quantiles, x='Label', y='Loss_Amount', color='Quantile', barmode='group', log_y=True,
+                                   title="Loss Quantiles by Scenario", labels={'Loss_Amount': 'Loss Amount ($)', 'Label': 'Scenario'})
+            fig_quantiles.update_layout(height=450, xaxis_tickangle=-30)
+            plotly_chart(fig_quantiles, use_container_width=True)
+
+        fig_bu = px.bar(by_bu, x='Label', y='Total_Loss', color='Business_Unit', title="Business Unit Breakdown by Scenario",
+                        labels={'Total_Loss': 'Total Loss ($)', 'Label': 'Scenario'}, hover_data=['Event_Count', 'Loss_Share'])
+        fig_bu.update_layout(height=500, xaxis_tickangle=-30)
+        plotly_chart(fig_bu, use_container_width=True)
+
+        st.download_button("Download Scenario Summary (CSV)", summary.to_csv(index=False), file_name="scenario_sweep.csv", mime="text/csv")
+    profile.end_section()
@@ -0,0 +1,311 @@
+"""Reproducible performance benchmarks for generation, aggregation, rolling analytics, ingestion, scenario sweeps, residual risk, what-if scenarios, page render and interaction.
+
+Each case is timed (median of ``--repeat`` runs) and then run once more under
+tracemalloc to record its peak Python/numpy allocation. Results are written as
+JSON and, when a baseline is given, compared against it: a case regresses when its
+time or peak memory exceeds the baseline by more than ``--threshold``. Interaction
+cases time a whole AppTest rerun, which varies from run to run, so they are run at
+least ``INTERACTION_REPEAT`` times and allowed ``INTERACTION_THRESHOLD``. Cases that
+run on a worker pool (``PARALLEL_CASES``) only measure pool overhead on a single core,
+so they are not compared when either the baseline or this run had one CPU.
+
+    python benchmarks/run_benchmarks.py --output bench.json --baseline benchmarks/baseline.json
+    python benchmarks/run_benchmarks.py --save-baseline          # refresh benchmarks/baseline.json
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# The page-render cases use a throwaway assessment database
+os.environ.setdefault("QULAB_ASSESSMENT_DB", os.path.join(tempfile.mkdtemp(prefix="qulab-bench-"), "assessments.db"))
+
+import numpy as np
+import pandas as pd
+
+from oprisk.assessment import (CONTROL_EFFECTIVENESS_LEVELS, INHERENT_RISK_LEVELS, calculate_residual_risk,
+                               calculate_residual_risk_batch)
+from oprisk.copula import cell_correlation_matrix
+from oprisk.export import iter_export_bytes
+from oprisk.ingest import read_loss_data
+from oprisk.lda import simulate_annual_losses, simulate_correlated_annual_losses
+from oprisk.simulation import build_loss_cube, generate_synthetic_loss_data, summarize_loss_cube
+from oprisk.sweep import expand_scenario_grid, run_scenario_sweep
+from oprisk.timeseries import rolling_loss_analytics
+from oprisk.whatif import encode_portfolio, run_what_if
+
+DEFAULT_BASELINE = os.path.join(ROOT, "benchmarks", "baseline.json")
+START_DATE = datetime.date(2023, 1, 1)
+END_DATE = datetime.date(2023, 12, 31)
+BUSINESS_UNITS = ['Investment Banking', 'Retail Banking', 'Asset Management', 'Operations']
+RISK_CATEGORIES = ['Internal Fraud', 'External Fraud', 'System Failures', 'Process Errors']
+INTERACTION_REPEAT = 9
+INTERACTION_THRESHOLD = 0.5
+PARALLEL_CASES = ("sweep_parallel/",)
+
+def _label(size):
+    """Formats an event or assessment count as ``<mantissa>e<exponent>``, e.g. 1e3 or 2e5."""
+    exponent = int(np.floor(np.log10(size)))
+    return f"{size / 10 ** exponent:g}e{exponent}"
+
+def _generate(num_events):
+    return generate_synthetic_loss_data(num_events, START_DATE, END_DATE, BUSINESS_UNITS, RISK_CATEGORIES, seed=42)
+
+def _write_loss_file(num_events, extension):
+    path = os.path.join(tempfile.mkdtemp(prefix="qulab-bench-"), f"loss_events{extension}")
+    loss_data = _generate(num_events)
+    if extension == ".csv":
+        loss_data.to_csv(path, index=False)
+    else:
+        loss_data.to_parquet(path, index=False, row_group_size=100_000)
+    return path
+
+def _sweep_scenarios():
+    return expand_scenario_grid({"num_events": 100_000, "start_date": START_DATE, "end_date": END_DATE,
+                                 "business_units": [BUSINESS_UNITS], "risk_categories": [RISK_CATEGORIES],
+                                 "severity_mu": [7.0, 8.0, 9.0, 10.0], "severity_sigma": [1.0, 2.0]})
+
+def _assessment_levels(num_assessments):
+    rng = np.random.default_rng(42)
+    return (np.asarray(INHERENT_RISK_LEVELS, dtype=object)[rng.integers(0, 3, num_assessments)],
+            np.asarray(CONTROL_EFFECTIVENESS_LEVELS, dtype=object)[rng.integers(0, 3, num_assessments)])
+
+def _encoded_portfolio(num_assessments):
+    inherent, control = _assessment_levels(num_assessments)
+    return encode_portfolio(pd.DataFrame({
+        "unit_name": [f"Unit {i}" for i in range(num_assessments)],
+        "inherent_risk": inherent,
+        "control_effectiveness": control,
+    }))
+
+def _lda_parameters():
+    return pd.DataFrame([(unit, category, 2.5, 9.0, 1.8) for unit in BUSINESS_UNITS for category in RISK_CATEGORIES],
+                        columns=["Business_Unit", "Risk_Category", "Frequency", "Severity_Mu", "Severity_Sigma"])
+
+def _generate_on_page(app, num_events):
+    """Clicks Generate Loss Data and polls the page until its background job has finished."""
+    app.number_input[0].set_value(num_events)
+    app.button[0].click().run()
+    while "loss_data_job" in app.session_state and not app.exception:
+        time.sleep(0.01)
+        app.run()
+
+def _render_loss_page(num_events):
+    import streamlit as st
+    from streamlit.testing.v1 import AppTest
+
+    # Start from a cold shared dataset cache so every run generates and renders
+    st.cache_resource.clear()
+    app = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=600)
+    app.run()
+    _generate_on_page(app, num_events)
+    if app.exception:
+        raise RuntimeError(app.exception[0].message)
+
+def _render_risk_page():
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=600)
+    app.run()
+    app.sidebar.selectbox[0].select("Risk Assessment").run()
+    if app.exception:
+        raise RuntimeError(app.exception[0].message)
+
+def _open_loss_page(num_events):
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=600)
+    app.run()
+    _generate_on_page(app, num_events)
+    return app
+
+def _open_risk_page(num_assessments):
+    from streamlit.testing.v1 import AppTest
+
+    _seed_assessments(num_assessments)
+    app = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=600)
+    app.run()
+    app.sidebar.selectbox[0].select("Risk Assessment").run()
+    return app
+
+def _interact(app, widget):
+    """Changes one input widget on an already rendered page and times the rerun it triggers.
+
+    AppTest reruns the whole script even for widgets inside a fragment, so this is the
+    full rerun with memoized figures, an upper bound on the fragment rerun in a browser.
+    """
+    if widget == "multiselect":
+        selected = app.multiselect[0].value
+        app.multiselect[0].set_value(selected[:1] if len(selected) > 1 else ['Investment Banking', 'Retail Banking'])
+    else:
+        app.text_area[0].input(f"Edited {time.perf_counter()}")
+    app.run()
+    if app.exception:
+        raise RuntimeError(app.exception[0].message)
+
+def build_cases(sizes, assessment_sizes, render):
+    """Returns ``{name: (setup, run)}``; ``setup()`` builds inputs outside the timed region."""
+    cases = {}
+    for size in sizes:
+        cases[f"generate/{_label(size)}"] = (lambda: None, lambda _, size=size: _generate(size))
+        cases[f"aggregate_cube/{_label(size)}"] = (lambda size=size: _generate(size), build_loss_cube)
+    for size in sizes[-1:]:
+        cases[f"aggregate_summary/{_label(size)}"] = (lambda size=size: build_loss_cube(_generate(size)), summarize_loss_cube)
+        cases[f"rolling_analytics/{_label(size)}"] = (lambda size=size: _generate(size), rolling_loss_analytics)
+    # Ingestion reads files written up front; capped at 1e6 events to keep setup short
+    ingest_size = min(sizes[-1], 1_000_000)
+    for extension in (".csv", ".parquet"):
+        cases[f"ingest{extension.replace('.', '_')}/{_label(ingest_size)}"] = (
+            lambda extension=extension: _write_loss_file(ingest_size, extension), read_loss_data)
+    cases[f"ingest_parquet_filtered/{_label(ingest_size)}"] = (
+        lambda: _write_loss_file(ingest_size, ".parquet"),
+        lambda path: read_loss_data(path, columns=["Timestamp", "Loss_Amount"], start_date=datetime.date(2023, 3, 1),
+                                    end_date=datetime.date(2023, 3, 31), business_units=["Retail Banking"]))
+    # Exports stream generated batches and discard the bytes, so only serialization is timed
+    for file_format in ("csv", "parquet"):
+        cases[f"export_{file_format}/{_label(ingest_size)}"] = (
+            lambda: [_generate(ingest_size)],
+            lambda batches, file_format=file_format: sum(len(piece) for piece in iter_export_bytes(batches, file_format)))
+    # A million scenario-years of the 16 cells, one worker, independent and with a t copula
+    cases["lda_independent/1e6"] = (_lda_parameters, lambda parameters: simulate_annual_losses(parameters, 1_000_000, seed=42, max_workers=1))
+    cases["lda_t_copula/1e6"] = (
+        _lda_parameters,
+        lambda parameters: simulate_correlated_annual_losses(parameters, cell_correlation_matrix(parameters, 0.5, 0.3, 0.1), 1_000_000,
+                                                             copula="t", seed=42, max_workers=1))
+    # Eight 1e5-event scenarios in-process and across a pool of four workers; their ratio is the sweep's
+    # parallel speedup, which on a single core shows the pool's overhead instead
+    for name, workers in (("sweep_serial", 1), ("sweep_parallel", 4)):
+        cases[f"{name}/8x1e5"] = (_sweep_scenarios, lambda scenarios, workers=workers: run_scenario_sweep(scenarios, seed=42, max_workers=workers))
+    for size in assessment_sizes:
+        cases[f"residual_risk_batch/{_label(size)}"] = (
+            lambda size=size: _assessment_levels(size),
+            lambda levels: calculate_residual_risk_batch(levels[0], levels[1], "Weighted"))
+    cases[f"residual_risk_scalar/{_label(assessment_sizes[0])}"] = (
+        lambda: _assessment_levels(assessment_sizes[0]),
+        lambda levels: [calculate_residual_risk(i, c, "Weighted") for i, c in zip(*levels)])
+    cases[f"what_if_scenario/{_label(assessment_sizes[-1])}"] = (
+        lambda: _encoded_portfolio(assessment_sizes[-1]),
+        lambda encoded: run_what_if(encoded, [{"from": ["Partially Effective"], "to": "Effective", "units": "unit 1"}],
+                                    approach="Weighted", baseline_approach="Simple"))
+    if render:
+        for size in (1_000, 200_000):
+            cases[f"render_loss_page/{_label(size)}"] = (lambda: None, lambda _, size=size: _render_loss_page(size))
+        cases["render_risk_page"] = (lambda: _seed_assessments(10_000), lambda _: _render_risk_page())
+        # Editing an input on a page that already shows a dataset or portfolio
+        cases[f"interact_loss_page/{_label(200_000)}"] = (lambda: _open_loss_page(200_000), lambda app: _interact(app, "multiselect"))
+        cases["interact_risk_page"] = (lambda: _open_risk_page(10_000), lambda app: _interact(app, "text_area"))
+    return cases
+
+def _seed_assessments(num_assessments):
+    from oprisk.assessment import validate_assessments
+    from oprisk.store import AssessmentStore
+
+    inherent, control = _assessment_levels(num_assessments)
+    store = AssessmentStore(os.environ["QULAB_ASSESSMENT_DB"])
+    store.upsert_many(validate_assessments(pd.DataFrame({
+        "unit_name": [f"Unit {i}" for i in range(num_assessments)],
+        "inherent_risk": inherent,
+        "controls": "Dual authorization",
+        "control_effectiveness": control,
+        "risk_description": "Benchmark assessment",
+    }))[0])
+    store.close()
+
+def run_case(setup, run, repeat):
+    """Returns the median wall time in seconds and peak traced memory in MB for one case."""
+    payload = setup()
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run(payload)
+        timings.append(time.perf_counter() - started)
+    tracemalloc.start()
+    run(payload)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"seconds": float(np.median(timings)), "peak_mb": peak / 1024 ** 2}
+
+def compare(results, baseline, threshold, cpu_count=None):
+    """Returns human-readable regressions against the baseline results and the names of the cases not compared.
+
+    Parallel cases are skipped when the baseline or this run (``cpu_count``, by default
+    ``os.cpu_count()``) had a single CPU, where their timing is pool overhead rather than speedup.
+    """
+    single_core = min(baseline.get("meta", {}).get("cpu_count") or 1, cpu_count or os.cpu_count() or 1) == 1
+    regressions, skipped = [], []
+    for name, result in results.items():
+        reference = baseline.get("results", {}).get(name)
+        if reference is None:
+            continue
+        if single_core and name.startswith(PARALLEL_CASES):
+            skipped.append(name)
+            continue
+        for metric in ("seconds", "peak_mb"):
+            allowed = max(threshold, INTERACTION_THRESHOLD) if metric == "seconds" and name.startswith("interact_") else threshold
+            if reference[metric] > 0 and result[metric] > reference[metric] * (1 + allowed):
+                regressions.append(f"{name}: {metric} {result[metric]:.4g} vs baseline {reference[metric]:.4g} "
+                                   f"(+{result[metric] / reference[metric] - 1:.0%})")
+    return regressions, skipped
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--max-events", type=float, default=1e7, help="Largest loss-event count (sizes run 1e3 up to this)")
+    parser.add_argument("--max-assessments", type=float, default=1e6)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--skip-render", action="store_true", help="Skip the AppTest page-render cases")
+    parser.add_argument("--filter", default="", help="Only run cases whose name contains this text")
+    parser.add_argument("--output", help="Write results JSON to this file")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed relative slowdown before failing (interaction cases allow at least INTERACTION_THRESHOLD)")
+    parser.add_argument("--save-baseline", action="store_true", help="Write the results to --baseline instead of comparing")
+    args = parser.parse_args(argv)
+
+    sizes = [10 ** power for power in range(3, int(np.log10(args.max_events)) + 1)]
+    assessment_sizes = [10 ** power for power in range(4, int(np.log10(args.max_assessments)) + 1)]
+    results = {}
+    for name, (setup, run) in build_cases(sizes, assessment_sizes, not args.skip_render).items():
+        if args.filter in name:
+            repeat = max(args.repeat, INTERACTION_REPEAT) if name.startswith("interact_") else args.repeat
+            results[name] = run_case(setup, run, repeat)
+            print(f"{name:32s} {results[name]['seconds']:10.4f} s {results[name]['peak_mb']:10.1f} MB", flush=True)
+
+    report = {
+        "meta": {
+            "created": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "cpu_count": os.cpu_count(),
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as handle:
+            json.dump(report, handle, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w") as handle:
+            json.dump(report, handle, indent=2)
+        print(f"Saved baseline to {args.baseline}")
+        return 0
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as handle:
+            regressions, skipped = compare(results, json.load(handle), args.threshold)
+        for name in skipped:
+            print(f"SKIPPED {name}: not comparable when the baseline or this run has a single CPU")
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        print(f"{len(regressions)} regression(s) beyond +{args.threshold:.0%} against {args.baseline}")
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
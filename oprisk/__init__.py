@@ -0,0 +1,21 @@
+"""Streamlit-free compute core of the Operational Risk Assessment Lifecycle Simulator.
+
+The modules here depend only on numpy and pandas (pyarrow for Parquet I/O) so they
+can be imported by headless batch jobs without paying for streamlit or plotly:
+
+* ``oprisk.simulation`` - synthetic loss-event generation, streaming and aggregation
+* ``oprisk.ingest`` - validated CSV/Parquet ingestion of historical loss events
+* ``oprisk.history`` - append-only loss history with incrementally merged aggregates
+* ``oprisk.jobs`` - background job pool with progress reporting and cancellation
+* ``oprisk.timeseries`` - rolling per-business-unit loss totals, counts, EWMA rates and VaR
+* ``oprisk.lda`` - Loss Distribution Approach capital engine
+* ``oprisk.copula`` - Gaussian and t copula dependence between LDA cells
+* ``oprisk.sweep`` - parallel scenario sweeps over generator parameters
+* ``oprisk.assessment`` - residual-risk calculation and bulk assessment validation
+* ``oprisk.whatif`` - portfolio-wide control-effectiveness what-if scenarios
+* ``oprisk.export`` - chunked CSV, Parquet and Excel export of loss data and aggregates
+* ``oprisk.paths`` - confinement of user-entered server paths to a configured directory
+* ``oprisk.store`` - indexed, SQLite-backed assessment store
+* ``oprisk.cache`` - memory-bounded LRU dataset cache
+* ``oprisk.cli`` - command-line entry point (``python -m oprisk``)
+"""
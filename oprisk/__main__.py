@@ -0,0 +1,3 @@
+from oprisk.cli import main
+
+raise SystemExit(main())
@@ -0,0 +1,118 @@
+import numpy as np
+import pandas as pd
+
+from oprisk.store import ASSESSMENT_FIELDS
+
+INHERENT_RISK_LEVELS = ['High', 'Medium', 'Low']
+CONTROL_EFFECTIVENESS_LEVELS = ['Effective', 'Partially Effective', 'Ineffective']
+RESIDUAL_RISK_LEVELS = ['Very Low', 'Low', 'Medium', 'Medium-High', 'High']
+IMPORT_REQUIRED_FIELDS = ["unit_name", "inherent_risk", "controls", "control_effectiveness", "risk_description"]
+
+RISK_MATRICES = {
+    "Simple": {
+        ("High", "Effective"): "Low",
+        ("High", "Partially Effective"): "Medium",
+        ("High", "Ineffective"): "High",
+        ("Medium", "Effective"): "Low",
+        ("Medium", "Partially Effective"): "Medium",
+        ("Medium", "Ineffective"): "Medium",
+        ("Low", "Effective"): "Low",
+        ("Low", "Partially Effective"): "Low",
+        ("Low", "Ineffective"): "Low",
+    },
+    # Enhanced weighted approach with more nuanced risk calculations
+    "Weighted": {
+        ("High", "Effective"): "Low",
+        ("High", "Partially Effective"): "Medium-High",
+        ("High", "Ineffective"): "High",
+        ("Medium", "Effective"): "Very Low",
+        ("Medium", "Partially Effective"): "Medium",
+        ("Medium", "Ineffective"): "Medium-High",
+        ("Low", "Effective"): "Very Low",
+        ("Low", "Partially Effective"): "Low",
+        ("Low", "Ineffective"): "Medium",
+    },
+}
+
+# Precompiled lookup arrays: [inherent code, control code] -> residual code, per approach
+RESIDUAL_RISK_LOOKUP = {
+    approach: np.array([[RESIDUAL_RISK_LEVELS.index(matrix[(inherent, control)]) for control in CONTROL_EFFECTIVENESS_LEVELS]
+                        for inherent in INHERENT_RISK_LEVELS], dtype=np.int8)
+    for approach, matrix in RISK_MATRICES.items()
+}
+
+def level_codes(values, levels):
+    """Encodes an array of level labels as positions in ``levels`` (-1 for unknown labels).
+
+    Only the distinct labels are looked up, so encoding costs one hash pass over the
+    values however long they are.
+    """
+    codes, uniques = pd.factorize(np.asarray(values, dtype=object), use_na_sentinel=False)
+    return pd.Index(levels).get_indexer(uniques).astype(np.int8)[codes]
+
+def calculate_residual_risk(inherent_risk_level, control_effectiveness_level, approach):
+    """Calculates residual risk based on inherent risk, control effectiveness, and approach."""
+    if approach not in RISK_MATRICES:
+        raise ValueError("Invalid approach. Must be 'Simple' or 'Weighted'.")
+    return RISK_MATRICES[approach][(inherent_risk_level, control_effectiveness_level)]
+
+def calculate_residual_risk_batch(inherent_risk_levels, control_effectiveness_levels, approach):
+    """Calculates residual risk for whole arrays of assessments at once.
+
+    Levels are encoded with ``level_codes`` and looked up in the precompiled
+    ``RESIDUAL_RISK_LOOKUP`` array, giving the same results as ``calculate_residual_risk``
+    element by element. Returns a ``pd.Categorical`` over ``RESIDUAL_RISK_LEVELS``.
+    """
+    if approach not in RESIDUAL_RISK_LOOKUP:
+        raise ValueError("Invalid approach. Must be 'Simple' or 'Weighted'.")
+    inherent_codes = level_codes(inherent_risk_levels, INHERENT_RISK_LEVELS)
+    control_codes = level_codes(control_effectiveness_levels, CONTROL_EFFECTIVENESS_LEVELS)
+    if (inherent_codes < 0).any() or (control_codes < 0).any():
+        raise ValueError("Unknown inherent risk or control effectiveness level.")
+    return pd.Categorical.from_codes(RESIDUAL_RISK_LOOKUP[approach][inherent_codes, control_codes], categories=RESIDUAL_RISK_LEVELS)
+
+def read_assessment_file(file, file_name):
+    """Reads a CSV or Parquet file of assessments into a DataFrame."""
+    if file_name.lower().endswith('.parquet'):
+        return pd.read_parquet(file)
+    if file_name.lower().endswith('.csv'):
+        return pd.read_csv(file, dtype=str, keep_default_na=False)
+    raise ValueError("Unsupported file type. Upload a .csv or .parquet file.")
+
+def validate_assessments(df, approach="Simple"):
+    """Validates bulk-imported assessment rows and computes their residual risk.
+
+    Returns ``(valid, rejected)``: valid rows carry all ``ASSESSMENT_FIELDS`` with
+    ``residual_risk`` computed for the whole batch at once; rejected rows keep their
+    original values plus a ``reason`` column. When a unit_name appears more than once
+    the last row wins, matching the add/update behaviour of the form.
+    """
+    missing = [field for field in IMPORT_REQUIRED_FIELDS if field not in df.columns]
+    if missing:
+        raise ValueError(f"Missing required columns: {', '.join(missing)}")
+    # Nulls (None/NaN from Parquet or pandas) count as empty; astype(str) would keep them as NaN.
+    # Going through object first lets fillna work on categorical (dictionary-encoded Parquet) columns too
+    rows = df[IMPORT_REQUIRED_FIELDS].astype(object).fillna('').astype(str).apply(lambda column: column.str.strip())
+
+    reason = pd.Series('', index=rows.index)
+    empty = (rows[['unit_name', 'controls', 'risk_description']] == '').any(axis=1)
+    reason[empty] = 'Missing Business Unit Name, Risk Description or Controls'
+    reason[(reason == '') & ~rows['inherent_risk'].isin(INHERENT_RISK_LEVELS)] = 'Unknown inherent risk level'
+    reason[(reason == '') & ~rows['control_effectiveness'].isin(CONTROL_EFFECTIVENESS_LEVELS)] = 'Unknown control effectiveness level'
+
+    rejected = df[reason != ''].assign(reason=reason[reason != ''])
+    valid = rows[reason == ''].drop_duplicates('unit_name', keep='last')
+    valid = valid.assign(residual_risk=calculate_residual_risk_batch(valid['inherent_risk'], valid['control_effectiveness'], approach).astype(str))
+    return valid[ASSESSMENT_FIELDS].reset_index(drop=True), rejected
+
+def record_assessment(store, unit_name, inherent_risk, controls, control_effectiveness, risk_description, approach="Simple"):
+    """Calculates residual risk and upserts the assessment into ``store``; returns (assessment, added)."""
+    assessment = {
+        "unit_name": unit_name,
+        "inherent_risk": inherent_risk,
+        "controls": controls,
+        "control_effectiveness": control_effectiveness,
+        "residual_risk": calculate_residual_risk(inherent_risk, control_effectiveness, approach),
+        "risk_description": risk_description
+    }
+    return assessment, store.upsert(assessment)
@@ -0,0 +1,196 @@
+import os
+import sys
+import threading
+import weakref
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+import pandas as pd
+
+DEFAULT_CACHE_MAX_BYTES = int(os.environ.get("QULAB_CACHE_MAX_MB", "512")) * 1024 * 1024
+
+def estimate_nbytes(value):
+    """Estimates the in-memory size of a cached value in bytes."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True, deep=True))
+    if isinstance(value, dict):
+        return sum(estimate_nbytes(item) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(estimate_nbytes(item) for item in value)
+    if hasattr(value, "nbytes"):
+        return int(value.nbytes)
+    return sys.getsizeof(value)
+
+class CacheEntry:
+    """A cached dataset together with the aggregates derived from it."""
+
+    def __init__(self, data, nbytes=estimate_nbytes):
+        self.data = data
+        self.aggregates = {}
+        self.nbytes = nbytes(data)
+
+class DatasetHandle:
+    """A session's reference to a shared cache entry, identified by its dataset key.
+
+    The entry stays pinned in the cache while any handle to it is alive; the reference
+    is released when the handle is garbage collected, e.g. when the session holding it
+    ends or replaces it with a handle to another dataset, and the entry then becomes
+    evictable like any other.
+    """
+
+    def __init__(self, cache, key, entry):
+        self.key = key
+        self.entry = entry
+        weakref.finalize(self, cache._release, key)
+
+    @property
+    def data(self):
+        return self.entry.data
+
+class DatasetCache:
+    """Thread-safe LRU cache of datasets keyed by their generation parameters and seed.
+
+    Entries are evicted least-recently-used first once the estimated size of all cached
+    datasets and aggregates exceeds ``max_bytes``. The most recently used entry is
+    never evicted, so a single oversized dataset is still served from the cache. Each
+    key is built at most once even when many sessions request it concurrently.
+
+    Sessions that ``acquire`` a dataset share one read-only copy through reference
+    counted handles: a referenced entry is never evicted. Once its last handle is
+    released the entry stays cached, unpinned, until the LRU budget evicts it, so a
+    later request for the same key is still a hit. Cached frames must not be modified
+    in place; pandas copy-on-write turns any modification made through pandas into a
+    private copy, so sessions never see each other's edits.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.releases = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self._references = {}
+        self._pending_releases = deque()
+
+    def get_or_create(self, key, factory, nbytes=estimate_nbytes):
+        """Returns the entry for ``key``, building its dataset with ``factory()`` on a miss.
+
+        ``nbytes(value)`` estimates the size of a new value against the memory budget.
+        """
+        entry = self._lookup(key)
+        if entry is not None:
+            return entry
+        with self._key_lock(key):
+            entry = self._lookup(key, count_miss=True)
+            if entry is None:
+                entry = CacheEntry(factory(), nbytes)
+                with self._locked():
+                    self._entries[key] = entry
+                    self._evict()
+        return entry
+
+    def acquire(self, key, factory):
+        """Returns a ``DatasetHandle`` to the entry for ``key``, building it with ``factory()`` on a miss."""
+        entry = self.get_or_create(key, factory)
+        with self._locked():
+            self._references[key] = self._references.get(key, 0) + 1
+            # The entry may have been evicted before it was pinned here
+            self._entries.setdefault(key, entry)
+        return DatasetHandle(self, key, self._entries[key])
+
+    def _release(self, key):
+        # Called by a handle's finalizer, which garbage collection may run on a thread that
+        # already holds the lock, so the release is only queued and applied under the lock later
+        self._pending_releases.append(key)
+
+    def _apply_releases(self):
+        """Drops the references of released handles; unpinned entries fall back under the LRU budget."""
+        released = False
+        while self._pending_releases:
+            key = self._pending_releases.popleft()
+            remaining = self._references.get(key, 0) - 1
+            if remaining > 0:
+                self._references[key] = remaining
+            elif self._references.pop(key, None) is not None:
+                self.releases += 1
+                released = True
+        if released:
+            self._evict()
+
+    @contextmanager
+    def _locked(self):
+        with self._lock:
+            self._apply_releases()
+            yield
+
+    def get_aggregate(self, entry, name, compute, nbytes=estimate_nbytes):
+        """Returns the aggregate ``name`` of a cached entry, computing it from the data once.
+
+        Aggregates count against the memory budget with their entry and are evicted with it.
+        """
+        with self._locked():
+            if name in entry.aggregates:
+                self.hits += 1
+                return entry.aggregates[name]
+            self.misses += 1
+        value = compute(entry.data)
+        with self._locked():
+            if name not in entry.aggregates:
+                entry.aggregates[name] = value
+                entry.nbytes += nbytes(value)
+                self._evict()
+            return entry.aggregates[name]
+
+    def clear(self):
+        """Drops all cached entries and resets the counters."""
+        with self._locked():
+            self._entries.clear()
+            self._key_locks.clear()
+            self._references.clear()
+            self.hits = self.misses = self.evictions = self.releases = 0
+
+    def stats(self):
+        """Returns hit/miss/eviction counters and the current memory usage."""
+        with self._locked():
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "releases": self.releases,
+                "entries": len(self._entries),
+                "shared_entries": len(self._references),
+                "references": sum(self._references.values()),
+                "nbytes": sum(entry.nbytes for entry in self._entries.values()),
+                "max_bytes": self.max_bytes,
+            }
+
+    def _lookup(self, key, count_miss=False):
+        with self._locked():
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            elif count_miss:
+                self.misses += 1
+            return entry
+
+    def _key_lock(self, key):
+        with self._locked():
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def _evict(self):
+        total = sum(entry.nbytes for entry in self._entries.values())
+        # Entries referenced by a session handle are pinned
+        candidates = [key for key in list(self._entries)[:-1] if key not in self._references]
+        for evicted_key in candidates:
+            if total <= self.max_bytes:
+                break
+            evicted = self._entries.pop(evicted_key)
+            self._key_locks.pop(evicted_key, None)
+            total -= evicted.nbytes
+            self.evictions += 1
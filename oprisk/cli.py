@@ -0,0 +1,197 @@
+import argparse
+import os
+import sys
+
+def _write_frame(df, path):
+    """Writes a DataFrame to CSV, Parquet or Excel based on the file extension."""
+    from oprisk.export import export_to_file
+
+    export_to_file(df, path)
+
+def _iter_loss_file(path, chunk_size):
+    """Yields a CSV file, Parquet file or partitioned Parquet directory of loss events in chunks."""
+    import pandas as pd
+
+    if path.lower().endswith('.csv'):
+        yield from pd.read_csv(path, parse_dates=['Timestamp'], chunksize=chunk_size)
+    else:
+        import pyarrow.dataset as ds
+
+        for batch in ds.dataset(path, format='parquet', partitioning='hive').to_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+
+def run_generate(args):
+    from oprisk.simulation import iter_synthetic_loss_chunks, write_loss_data_parquet
+
+    chunks = iter_synthetic_loss_chunks(args.events, args.start, args.end, args.business_units, args.risk_categories,
+                                        seed=args.seed, chunk_size=args.chunk_size)
+    if args.partition_by:
+        rows = write_loss_data_parquet(chunks, args.output, partition_by=args.partition_by)
+    else:
+        from oprisk.export import export_to_file
+
+        rows = 0
+
+        def counted(chunks):
+            nonlocal rows
+            for chunk in chunks:
+                rows += len(chunk)
+                yield chunk
+
+        export_to_file(counted(chunks), args.output)
+    print(f"Generated {rows:,} loss events -> {args.output}")
+
+def run_ingest(args):
+    from oprisk.ingest import read_loss_data
+
+    loss_data, rejected = read_loss_data(args.input, columns=args.columns, start_date=args.start, end_date=args.end,
+                                         business_units=args.business_units, risk_categories=args.risk_categories,
+                                         compact_amounts=args.compact_amounts)
+    _write_frame(loss_data, args.output)
+    if args.rejected and len(rejected) > 0:
+        _write_frame(rejected, args.rejected)
+    print(f"Ingested {len(loss_data):,} loss events, rejected {len(rejected):,} rows -> {args.output}")
+
+def run_aggregate(args):
+    import pandas as pd
+
+    from oprisk.simulation import CUBE_DIMENSIONS, build_loss_cube, rollup_loss_cube
+
+    # Cubes of each chunk are merged by rolling up over all dimensions, keeping memory bounded
+    cubes = [build_loss_cube(chunk) for chunk in _iter_loss_file(args.input, args.chunk_size)]
+    if not cubes:
+        raise ValueError(f"No loss events found in '{args.input}'.")
+    cube = rollup_loss_cube(pd.concat(cubes, ignore_index=True), args.by or CUBE_DIMENSIONS)
+    _write_frame(cube, args.output)
+    print(f"Aggregated {int(cube['Event_Count'].sum()):,} events into {len(cube):,} cells -> {args.output}")
+
+def run_assess(args):
+    from oprisk.assessment import read_assessment_file, validate_assessments
+
+    valid, rejected = validate_assessments(read_assessment_file(args.input, args.input), args.approach)
+    if args.output:
+        _write_frame(valid, args.output)
+    if args.rejected and len(rejected) > 0:
+        _write_frame(rejected, args.rejected)
+    if args.db:
+        from oprisk.store import AssessmentStore
+
+        store = AssessmentStore(args.db)
+        added, updated = store.upsert_many(valid)
+        store.close()
+        print(f"Stored in {args.db}: {added:,} added, {updated:,} updated")
+    print(f"Assessed {len(valid):,} units ({args.approach} approach), rejected {len(rejected):,} rows")
+    print(valid['residual_risk'].value_counts().to_string())
+
+def run_export(args):
+    from oprisk.store import AssessmentStore
+
+    store = AssessmentStore(args.db)
+    portfolio = store.frame()
+    _write_frame(portfolio, args.output)
+    store.close()
+    print(f"Exported {len(portfolio):,} assessments -> {args.output}")
+
+def run_sweep(args):
+    from oprisk.sweep import expand_scenario_grid, run_scenario_sweep
+
+    grid = {
+        "num_events": args.events,
+        "start_date": args.start,
+        "end_date": args.end,
+        "severity_mu": args.severity_mu,
+        "severity_sigma": args.severity_sigma,
+        "near_miss_probability": args.near_miss,
+    }
+    if args.business_units:
+        grid["business_units"] = [units.split(",") for units in args.business_units]
+    if args.risk_categories:
+        grid["risk_categories"] = [categories.split(",") for categories in args.risk_categories]
+    scenarios = expand_scenario_grid(grid)
+    summary, by_bu = run_scenario_sweep(scenarios, seed=args.seed, max_workers=args.workers)
+    for column in ("business_units", "risk_categories"):
+        summary[column] = summary[column].map(",".join)
+    _write_frame(summary, args.output)
+    if args.by_business_unit:
+        _write_frame(by_bu, args.by_business_unit)
+    print(f"Ran {len(scenarios):,} scenarios -> {args.output}")
+
+def build_parser():
+    from oprisk.simulation import DEFAULT_NEAR_MISS_PROBABILITY, DEFAULT_SEVERITY_MU, DEFAULT_SEVERITY_SIGMA
+
+    parser = argparse.ArgumentParser(prog="python -m oprisk", description="Headless batch runs of the operational risk simulator.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    generate = commands.add_parser("generate", help="Generate synthetic loss events to CSV, Parquet or Excel")
+    generate.add_argument("--events", type=int, required=True)
+    generate.add_argument("--start", type=_date, default="2023-01-01")
+    generate.add_argument("--end", type=_date, default="2023-12-31")
+    generate.add_argument("--business-units", nargs="*", default=[])
+    generate.add_argument("--risk-categories", nargs="*", default=[])
+    generate.add_argument("--seed", type=int, default=None)
+    generate.add_argument("--chunk-size", type=int, default=1_000_000)
+    generate.add_argument("--partition-by", choices=["month", "business_unit"], help="Write a partitioned Parquet directory")
+    generate.add_argument("--output", required=True)
+    generate.set_defaults(handler=run_generate)
+
+    ingest = commands.add_parser("ingest", help="Validate historical loss events and convert them to the simulator's schema")
+    ingest.add_argument("--input", required=True, help="CSV file, Parquet file or partitioned Parquet directory")
+    ingest.add_argument("--columns", nargs="*", help="Only keep these columns (default: all)")
+    ingest.add_argument("--start", type=_date, help="Only events on or after this date")
+    ingest.add_argument("--end", type=_date, help="Only events on or before this date")
+    ingest.add_argument("--business-units", nargs="*", default=[])
+    ingest.add_argument("--risk-categories", nargs="*", default=[])
+    ingest.add_argument("--output", required=True)
+    ingest.add_argument("--rejected", help="Write rejected rows with their reason to this file")
+    ingest.add_argument("--compact-amounts", action="store_true", help="Store loss amounts as float32 (about seven significant digits)")
+    ingest.set_defaults(handler=run_ingest)
+
+    aggregate = commands.add_parser("aggregate", help="Build the aggregation cube of a loss event file")
+    aggregate.add_argument("--input", required=True, help="CSV file, Parquet file or partitioned Parquet directory")
+    aggregate.add_argument("--by", nargs="*", help="Roll the cube up to these dimensions")
+    aggregate.add_argument("--chunk-size", type=int, default=1_000_000)
+    aggregate.add_argument("--output", required=True)
+    aggregate.set_defaults(handler=run_aggregate)
+
+    assess = commands.add_parser("assess", help="Validate assessments and compute residual risk in bulk")
+    assess.add_argument("--input", required=True)
+    assess.add_argument("--approach", choices=["Simple", "Weighted"], default="Simple")
+    assess.add_argument("--output")
+    assess.add_argument("--rejected", help="Write rejected rows with their reason to this file")
+    assess.add_argument("--db", help="Also upsert the valid assessments into this assessment store")
+    assess.set_defaults(handler=run_assess)
+
+    sweep = commands.add_parser("sweep", help="Run a grid of generator configurations in parallel and compare their summaries")
+    sweep.add_argument("--events", type=int, nargs="+", required=True)
+    sweep.add_argument("--start", type=_date, nargs="+", default=[_date("2023-01-01")])
+    sweep.add_argument("--end", type=_date, nargs="+", default=[_date("2023-12-31")])
+    sweep.add_argument("--business-units", nargs="*", help="Comma-separated business unit subsets, e.g. BU1,BU2 BU1")
+    sweep.add_argument("--risk-categories", nargs="*", help="Comma-separated risk category mixes")
+    sweep.add_argument("--severity-mu", type=float, nargs="+", default=[DEFAULT_SEVERITY_MU])
+    sweep.add_argument("--severity-sigma", type=float, nargs="+", default=[DEFAULT_SEVERITY_SIGMA])
+    sweep.add_argument("--near-miss", type=float, nargs="+", default=[DEFAULT_NEAR_MISS_PROBABILITY])
+    sweep.add_argument("--seed", type=int, default=None)
+    sweep.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    sweep.add_argument("--by-business-unit", help="Also write the per-business-unit breakdown to this file")
+    sweep.add_argument("--output", required=True)
+    sweep.set_defaults(handler=run_sweep)
+
+    export = commands.add_parser("export", help="Export the assessment portfolio from an assessment store")
+    export.add_argument("--db", default=os.environ.get("QULAB_ASSESSMENT_DB", "risk_assessments.db"))
+    export.add_argument("--output", required=True)
+    export.set_defaults(handler=run_export)
+    return parser
+
+def _date(value):
+    from datetime import date
+
+    return date.fromisoformat(value)
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        args.handler(args)
+    except (ValueError, FileNotFoundError) as error:
+        print(f"error: {error}", file=sys.stderr)
+        return 1
+    return 0
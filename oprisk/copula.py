@@ -0,0 +1,111 @@
+import numpy as np
+import pandas as pd
+
+COPULAS = ("Gaussian", "t")
+DEFAULT_DEGREES_OF_FREEDOM = 4
+CORRELATION_CHECK_YEARS = 4_000
+CORRELATION_TOLERANCE = 0.1
+KENDALL_BLOCK_ROWS = 64
+
+def cell_correlation_matrix(cells, same_business_unit=0.0, same_risk_category=0.0, other=0.0):
+    """Builds the correlation matrix between Business_Unit/Risk_Category cells from three levels.
+
+    Two cells in the same business unit are correlated by ``same_business_unit``, two in
+    the same risk category by ``same_risk_category`` and any other pair by ``other``.
+    """
+    business_units = cells['Business_Unit'].to_numpy(dtype=object)
+    risk_categories = cells['Risk_Category'].to_numpy(dtype=object)
+    correlation = np.where(business_units[:, None] == business_units[None, :], same_business_unit,
+                           np.where(risk_categories[:, None] == risk_categories[None, :], same_risk_category, other))
+    np.fill_diagonal(correlation, 1.0)
+    return correlation.astype(np.float64)
+
+def correlation_factor(correlation):
+    """Returns a matrix ``F`` with ``F @ F.T == correlation``, validating the correlation matrix.
+
+    An eigendecomposition is used rather than a Cholesky factorization so that
+    semi-definite matrices, e.g. with perfectly correlated cells, are accepted.
+    """
+    correlation = np.asarray(correlation, dtype=np.float64)
+    if correlation.ndim != 2 or correlation.shape[0] != correlation.shape[1]:
+        raise ValueError("The correlation matrix must be square.")
+    if not np.allclose(correlation, correlation.T) or not np.allclose(np.diag(correlation), 1.0) or (np.abs(correlation) > 1).any():
+        raise ValueError("The correlation matrix must be symmetric with a unit diagonal and entries between -1 and 1.")
+    eigenvalues, eigenvectors = np.linalg.eigh(correlation)
+    if eigenvalues.min() < -1e-8:
+        raise ValueError("The correlation matrix is not positive semi-definite; lower the correlations between cells.")
+    return eigenvectors * np.sqrt(eigenvalues.clip(min=0.0))
+
+def copula_scores(rng, factor, num_years, copula="Gaussian", degrees_of_freedom=DEFAULT_DEGREES_OF_FREEDOM):
+    """Draws ``num_years`` rows of correlated Gaussian or Student t scores, one column per cell.
+
+    Only the ranks of the scores are used, so they are never mapped to uniforms and no
+    distribution functions are needed. The t scores share one chi-square draw per year,
+    which gives the joint tail events of the t copula.
+    """
+    if copula not in COPULAS:
+        raise ValueError(f"Unknown copula '{copula}'. Must be among {list(COPULAS)}.")
+    scores = rng.standard_normal((num_years, factor.shape[1])) @ factor.T
+    if copula == "t":
+        if degrees_of_freedom <= 0:
+            raise ValueError("The t copula needs positive degrees of freedom.")
+        scores /= np.sqrt(rng.chisquare(degrees_of_freedom, size=(num_years, 1)) / degrees_of_freedom)
+    return scores
+
+def reorder_to_copula(samples, scores):
+    """Reorders each column of ``samples`` so that its ranks match those of ``scores`` (Iman-Conover).
+
+    Every column keeps exactly its simulated values, so the marginal distributions are
+    unchanged, while the rows take on the rank dependence of the copula.
+    """
+    # Sorted values are scattered to the positions of the sorted scores, one row per cell
+    reordered = np.empty_like(samples.T)
+    np.put_along_axis(reordered, np.argsort(scores.T, axis=1), np.sort(samples.T, axis=1), axis=1)
+    return reordered.T
+
+def kendall_tau_matrix(samples, block_rows=KENDALL_BLOCK_ROWS):
+    """Returns Kendall's tau-b between every pair of columns of ``samples``.
+
+    The concordance signs of all row pairs are summed with one matrix product per block
+    of rows, so the cost is quadratic in the number of rows; use a few thousand rows.
+    Columns without any variation give NaN.
+    """
+    num_rows, num_columns = samples.shape
+    # Dense ranks keep ties exact and are small integers, so float32 sums stay exact
+    ranks = np.empty(samples.shape, dtype=np.float32)
+    for column in range(num_columns):
+        ranks[:, column] = np.unique(samples[:, column], return_inverse=True)[1]
+    concordance = np.zeros((num_columns, num_columns))
+    for start in range(0, num_rows, block_rows):
+        # Each block against the later rows, plus its own pairs, which are counted in both orders
+        block, later = ranks[start:start + block_rows], ranks[start + block_rows:]
+        signs = np.sign(block[:, None, :] - later[None, :, :]).reshape(-1, num_columns)
+        within = np.sign(block[:, None, :] - block[None, :, :]).reshape(-1, num_columns)
+        concordance += signs.T @ signs + within.T @ within / 2
+    untied = np.sqrt(np.diag(concordance))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return concordance / np.outer(untied, untied)
+
+def correlation_check(cell_losses, correlation, cells, tolerance=CORRELATION_TOLERANCE):
+    """Compares the realized dependence of simulated per-cell annual losses with the requested correlations.
+
+    For both the Gaussian and the t copula, Kendall's tau and the correlation parameter
+    are related by ``tau = 2 / pi * arcsin(rho)``, so the realized correlation is read
+    off the sample's Kendall's tau. On ``CORRELATION_CHECK_YEARS`` years its sampling
+    error is about 0.02 per pair, and realized values fall short of the requested ones
+    for cells with many loss-free years, whose tied zeros carry no ranking.
+    """
+    tau = kendall_tau_matrix(np.asarray(cell_losses, dtype=np.float64))
+    realized = np.sin(np.pi / 2 * tau)
+    first, second = np.triu_indices(len(cells), k=1)
+    names = (cells['Business_Unit'].astype(str) + " / " + cells['Risk_Category'].astype(str)).to_numpy()
+    check = pd.DataFrame({
+        'Cell_1': names[first],
+        'Cell_2': names[second],
+        'Requested_Correlation': np.asarray(correlation)[first, second],
+        'Kendall_Tau': tau[first, second],
+        'Realized_Correlation': realized[first, second],
+    })
+    check['Difference'] = check['Realized_Correlation'] - check['Requested_Correlation']
+    check['Within_Tolerance'] = check['Difference'].abs() <= tolerance
+    return check
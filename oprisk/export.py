@@ -0,0 +1,203 @@
+import importlib.util
+import io
+import os
+import tempfile
+
+import pandas as pd
+
+from oprisk.simulation import CUBE_DIMENSIONS, rollup_loss_cube
+
+EXPORT_FORMATS = {
+    "csv": ("CSV", "text/csv"),
+    "parquet": ("Parquet", "application/vnd.apache.parquet"),
+    "xlsx": ("Excel", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+}
+EXPORT_CHUNK_ROWS = 250_000
+EXCEL_MAX_ROWS = 1_048_575  # Rows per worksheet, below the header
+EXPORT_BLOCK_BYTES = 1 << 20
+
+def export_format(path):
+    """Returns the export format of a file path from its extension."""
+    file_format = os.path.splitext(path)[1].lower().lstrip('.')
+    if file_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported output file '{path}'. Use a .csv, .parquet or .xlsx file.")
+    return file_format
+
+def excel_available():
+    """Returns whether the optional openpyxl package needed for Excel export is installed."""
+    return importlib.util.find_spec("openpyxl") is not None
+
+def _iter_frames(data, chunk_rows):
+    """Yields a DataFrame, or each DataFrame of an iterable of them (e.g. history batches), in slices of at most ``chunk_rows``.
+
+    Empty data still yields one empty slice, so the columns are known.
+    """
+    frames = [data] if isinstance(data, pd.DataFrame) else data
+    yielded, last = False, None
+    for frame in frames:
+        last = frame
+        for start in range(0, len(frame), chunk_rows):
+            yielded = True
+            yield frame.iloc[start:start + chunk_rows]
+    if not yielded and last is not None:
+        yield last
+
+def _to_arrow(chunk):
+    """Converts a chunk to an Arrow table without copying numeric columns; categoricals stay dictionary-encoded."""
+    import pyarrow as pa
+
+    return pa.Table.from_pandas(chunk, preserve_index=False)
+
+def _trim_timestamps(table):
+    """Casts timestamp columns that hold whole seconds to second precision, so CSV has no trailing nanoseconds."""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    for position, field in enumerate(table.schema):
+        if pa.types.is_timestamp(field.type) and field.type.unit != 's':
+            try:
+                table = table.set_column(position, field.name, pc.cast(table[field.name], pa.timestamp('s', field.type.tz)))
+            except pa.ArrowInvalid:
+                pass
+    return table
+
+class _DrainableSink(io.RawIOBase):
+    """Write-only file object whose written bytes are taken out piece by piece."""
+
+    def __init__(self):
+        self._pieces = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._pieces.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b"".join(self._pieces)
+        self._pieces.clear()
+        return data
+
+def iter_csv_bytes(data, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Yields CSV bytes for ``data`` (a DataFrame or iterable of DataFrames), one piece per chunk, header first."""
+    import pyarrow.csv as pacsv
+
+    header = True
+    for chunk in _iter_frames(data, chunk_rows):
+        sink = io.BytesIO()
+        pacsv.write_csv(_trim_timestamps(_to_arrow(chunk)), sink, pacsv.WriteOptions(include_header=header, quoting_style="needed"))
+        header = False
+        yield sink.getvalue()
+
+def iter_parquet_bytes(data, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Yields a Parquet file for ``data`` piece by piece, one row group per chunk."""
+    import pyarrow.parquet as pq
+
+    sink, writer = _DrainableSink(), None
+    try:
+        for chunk in _iter_frames(data, chunk_rows):
+            table = _to_arrow(chunk)
+            writer = writer or pq.ParquetWriter(sink, table.schema)
+            writer.write_table(table)
+            yield sink.drain()
+    finally:
+        if writer is not None:
+            writer.close()
+    yield sink.drain()
+
+def write_excel(sheets, target, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Writes ``{sheet name: DataFrame or iterable of DataFrames}`` to an Excel workbook at a path or file object.
+
+    Rows are streamed with openpyxl's write-only mode, so memory stays bounded by one
+    chunk; rows beyond Excel's sheet limit continue on numbered sheets. Returns the
+    number of data rows written.
+    """
+    try:
+        from openpyxl import Workbook
+    except ImportError as error:
+        raise ValueError("Excel export needs the optional openpyxl package (pip install openpyxl).") from error
+
+    workbook = Workbook(write_only=True)
+    rows = 0
+    for name, data in sheets.items():
+        sheet, sheet_rows, part = None, 0, 0
+        for chunk in _iter_frames(data, chunk_rows):
+            # Python scalars for openpyxl, with blanks for missing values
+            values = chunk.astype(object).where(chunk.notna(), None)
+            for row in values.itertuples(index=False, name=None):
+                if sheet is None or sheet_rows == EXCEL_MAX_ROWS:
+                    part += 1
+                    sheet = workbook.create_sheet(name[:31] if part == 1 else f"{name[:26]} ({part})")
+                    sheet.append([str(column) for column in chunk.columns])
+                    sheet_rows = 0
+                sheet.append(row)
+                sheet_rows += 1
+            if sheet is None:
+                sheet = workbook.create_sheet(name[:31])
+                sheet.append([str(column) for column in chunk.columns])
+            rows += len(chunk)
+    workbook.save(target)
+    return rows
+
+def iter_export_bytes(data, file_format, sheet_name="Data", chunk_rows=EXPORT_CHUNK_ROWS):
+    """Yields ``data`` exported as ``file_format`` ("csv", "parquet" or "xlsx") in pieces.
+
+    ``data`` is a DataFrame or an iterable of DataFrames with the same columns; for
+    Excel it may also be a dict of sheet name to either. CSV and Parquet are produced
+    chunk by chunk through Arrow. An Excel workbook is zipped at the end, so it is
+    spooled to a temporary file first and then read back in blocks.
+    """
+    if file_format == "csv":
+        yield from iter_csv_bytes(data, chunk_rows)
+    elif file_format == "parquet":
+        yield from iter_parquet_bytes(data, chunk_rows)
+    elif file_format == "xlsx":
+        with tempfile.TemporaryFile() as spool:
+            write_excel(data if isinstance(data, dict) else {sheet_name: data}, spool, chunk_rows)
+            spool.seek(0)
+            yield from iter(lambda: spool.read(EXPORT_BLOCK_BYTES), b"")
+    else:
+        raise ValueError(f"Unsupported export format '{file_format}'. Must be among {list(EXPORT_FORMATS)}.")
+
+def export_to_file(data, target, file_format=None, sheet_name="Data", chunk_rows=EXPORT_CHUNK_ROWS, overwrite=True):
+    """Streams an export to a path (format from its extension) or an open binary file; returns the bytes written.
+
+    With ``overwrite=False`` an existing file at the path raises ``FileExistsError``.
+    """
+    if isinstance(target, (str, os.PathLike)):
+        file_format = file_format or export_format(os.fspath(target))
+        with open(target, 'wb' if overwrite else 'xb') as handle:
+            return export_to_file(data, handle, file_format, sheet_name, chunk_rows)
+    if file_format == "xlsx":
+        # Written straight into the target rather than through a spool file
+        start = target.tell()
+        write_excel(data if isinstance(data, dict) else {sheet_name: data}, target, chunk_rows)
+        return target.tell() - start
+    written = 0
+    for piece in iter_export_bytes(data, file_format, sheet_name, chunk_rows):
+        target.write(piece)
+        written += len(piece)
+    return written
+
+def export_to_temporary_file(data, file_format, sheet_name="Data", chunk_rows=EXPORT_CHUNK_ROWS):
+    """Streams an export into an anonymous temporary file and returns it rewound, e.g. to serve as a download."""
+    spool = tempfile.TemporaryFile()
+    export_to_file(data, spool, file_format, sheet_name, chunk_rows)
+    spool.seek(0)
+    return spool
+
+def loss_aggregate_tables(cube):
+    """Returns the monthly, business unit, risk category and full cube aggregates of a loss cube, by table name."""
+    return {
+        "Monthly": rollup_loss_cube(cube, ['Year_Month']),
+        "Business_Units": rollup_loss_cube(cube, ['Business_Unit']),
+        "Risk_Categories": rollup_loss_cube(cube, ['Risk_Category']),
+        "Risk_Category_x_Business_Unit": rollup_loss_cube(cube, ['Risk_Category', 'Business_Unit']),
+        "Cube": rollup_loss_cube(cube, CUBE_DIMENSIONS),
+    }
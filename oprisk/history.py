@@ -0,0 +1,161 @@
+import datetime
+from functools import cached_property
+
+import numpy as np
+import pandas as pd
+
+from oprisk.simulation import (LOG_BINS_PER_DECADE, bin_loss_amounts, build_loss_cube, generate_synthetic_loss_data, iter_synthetic_loss_chunks,
+                               loss_data_memory_report, loss_sample_candidates, merge_loss_cubes, merge_loss_histograms)
+from oprisk.timeseries import build_daily_loss_profile, merge_daily_loss_profiles
+
+APPEND_PERIODS = {"1 day": 1, "1 week": 7, "30 days": 30}
+GENERATION_CHUNK_SIZE = 1_000_000
+
+def append_loss_data_key(key, num_events, period_days):
+    """Extends a ``loss_data_cache_key`` with one appended batch, so the key identifies the whole append history."""
+    return key + ((int(num_events), int(period_days)),)
+
+class LossHistory:
+    """An append-only loss event history made of immutable batches.
+
+    Each ``LossHistory`` is one batch of events on top of a ``parent`` history. The cube,
+    log-binned histogram, daily loss profile, scatter-sample candidates and memory
+    report are derived lazily by merging the parent's (already computed) aggregates
+    with the new batch's, so an append costs time proportional to the batch, not to the
+    history. Appending returns a new history and leaves the parent untouched, so both
+    can be cached and shared.
+
+    ``rejected`` holds the rows dropped by validation when the history was loaded from
+    a file, and is None for simulated histories.
+    """
+
+    rejected = None
+
+    def __init__(self, batch, start_date, end_date, business_units, risk_categories, seed, parent=None):
+        self.batch = batch
+        self.start_date = start_date
+        self.end_date = end_date
+        self.business_units = list(business_units)
+        self.risk_categories = list(risk_categories)
+        self.seed = seed
+        self.parent = parent
+        self.event_count = len(batch) + (parent.event_count if parent is not None else 0)
+        self.num_batches = 1 + (parent.num_batches if parent is not None else 0)
+
+    @classmethod
+    def generate(cls, num_events, start_date, end_date, business_units, risk_categories, seed=None, on_chunk=None,
+                 chunk_size=GENERATION_CHUNK_SIZE):
+        """Starts a history from a freshly generated dataset.
+
+        With ``on_chunk``, events are generated ``chunk_size`` at a time and
+        ``on_chunk(events_so_far, cube_so_far)`` is called after each chunk, e.g. to report
+        progress and partial aggregates (or to stop by raising). The cube is merged chunk
+        by chunk along the way, and the rows are the same as in one-shot generation.
+        """
+        if on_chunk is None:
+            batch = generate_synthetic_loss_data(num_events, start_date, end_date, business_units, risk_categories, seed=seed)
+            return cls(batch, start_date, end_date, business_units, risk_categories, seed)
+        chunks, cube = [], None
+        for chunk in iter_synthetic_loss_chunks(num_events, start_date, end_date, business_units, risk_categories, seed=seed,
+                                                chunk_size=chunk_size):
+            chunks.append(chunk)
+            cube = build_loss_cube(chunk) if cube is None else merge_loss_cubes([cube, build_loss_cube(chunk)])
+            on_chunk(chunk.index.stop, cube)
+        history = cls(pd.concat(chunks) if len(chunks) > 1 else chunks[0], start_date, end_date, business_units, risk_categories, seed)
+        history.cube = cube
+        return history
+
+    @classmethod
+    def from_loss_data(cls, loss_data, start_date, end_date, rejected=None):
+        """Starts a history from loaded loss events, e.g. from ``oprisk.ingest.read_loss_data``."""
+        history = cls(loss_data, start_date, end_date, loss_data['Business_Unit'].cat.categories, loss_data['Risk_Category'].cat.categories, seed=None)
+        history.rejected = rejected
+        return history
+
+    def append(self, batch, end_date):
+        """Returns a new history with ``batch`` (events up to ``end_date``) appended."""
+        batch = batch.set_axis(pd.RangeIndex(self.event_count, self.event_count + len(batch)))
+        # Simulated batches are float32; imported histories keep float64 amounts, and every batch shares one schema
+        batch = batch.astype({'Loss_Amount': self.batch['Loss_Amount'].dtype})
+        history = LossHistory(batch, self.start_date, end_date, self.business_units, self.risk_categories, self.seed, parent=self)
+        history.rejected = self.rejected
+        return history
+
+    def append_events(self, num_events, period_days):
+        """Simulates ``num_events`` new events over the ``period_days`` days after the history and appends them.
+
+        The batch is drawn from a seed derived from the history's seed and the batch
+        number, so the same sequence of appends always reproduces the same history.
+        """
+        start_date = self.end_date + datetime.timedelta(days=1)
+        end_date = self.end_date + datetime.timedelta(days=period_days)
+        batch_seed = int(np.random.SeedSequence([self.seed or 0, self.num_batches]).generate_state(1)[0])
+        batch = generate_synthetic_loss_data(num_events, start_date, end_date, self.business_units, self.risk_categories, seed=batch_seed)
+        return self.append(batch, end_date)
+
+    @property
+    def period_years(self):
+        return ((self.end_date - self.start_date).days + 1) / 365.25
+
+    @property
+    def chunks(self):
+        """Returns the batches of the history, oldest first."""
+        chunks, history = [], self
+        while history is not None:
+            chunks.append(history.batch)
+            history = history.parent
+        return chunks[::-1]
+
+    @property
+    def nbytes(self):
+        return sum(int(chunk.memory_usage(index=True, deep=True).sum()) for chunk in self.chunks)
+
+    def frame(self):
+        """Concatenates every batch into one DataFrame; costs time proportional to the history."""
+        chunks = self.chunks
+        return chunks[0] if len(chunks) == 1 else pd.concat(chunks)
+
+    def head(self, n=5):
+        return self.chunks[0].head(n)
+
+    def tail(self, n=5):
+        return self.batch.tail(n)
+
+    @cached_property
+    def cube(self):
+        if self.parent is None:
+            return build_loss_cube(self.batch)
+        return merge_loss_cubes([self.parent.cube, build_loss_cube(self.batch)])
+
+    @cached_property
+    def loss_histogram(self):
+        histogram = bin_loss_amounts(self.batch['Loss_Amount'], LOG_BINS_PER_DECADE)
+        if self.parent is None:
+            return histogram
+        return merge_loss_histograms([self.parent.loss_histogram, histogram], LOG_BINS_PER_DECADE)
+
+    @cached_property
+    def daily_profile(self):
+        if self.parent is None:
+            return build_daily_loss_profile(self.batch)
+        return merge_daily_loss_profiles([self.parent.daily_profile, build_daily_loss_profile(self.batch)])
+
+    @cached_property
+    def sample_candidates(self):
+        # Each batch draws its own priorities, seeded by its position in the history
+        candidates = loss_sample_candidates(self.batch, seed=self.num_batches)
+        if self.parent is None:
+            return candidates
+        return loss_sample_candidates(pd.concat([self.parent.sample_candidates, candidates]))
+
+    @cached_property
+    def memory_report(self):
+        report = loss_data_memory_report(self.batch)
+        if self.parent is None:
+            return report
+        report = report.assign(
+            Bytes=report['Bytes'] + self.parent.memory_report['Bytes'],
+            Legacy_Bytes=report['Legacy_Bytes'] + self.parent.memory_report['Legacy_Bytes'],
+        )
+        report['Savings'] = 1 - report['Bytes'] / report['Legacy_Bytes'].where(report['Legacy_Bytes'] > 0)
+        return report
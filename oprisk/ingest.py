@@ -0,0 +1,266 @@
+import datetime
+import os
+
+import numpy as np
+import pandas as pd
+
+from oprisk.simulation import LOSS_CATEGORY_COLUMNS, LOSS_DATA_COLUMNS
+
+NEAR_MISS_TRUE_VALUES = ["True", "true", "TRUE", "1", "Yes", "yes", "Y", "y"]
+NEAR_MISS_FALSE_VALUES = ["False", "false", "FALSE", "0", "No", "no", "N", "n"]
+CSV_BLOCK_SIZE = 1 << 24
+
+def _arrow_loss_types():
+    """Returns the Arrow type each loss column is parsed as on the typed fast path."""
+    import pyarrow as pa
+
+    labels = pa.dictionary(pa.int32(), pa.string())
+    return {
+        "Timestamp": pa.timestamp('ns'),
+        "Business_Unit": labels,
+        "Risk_Category": labels,
+        "Loss_Amount": pa.float64(),
+        "Near_Miss_Flag": pa.bool_(),
+        "Control_Breach_Type": labels,
+        "Recovery_Time_Days": pa.int64(),
+    }
+
+def _read_columns(columns, business_units, risk_categories):
+    """Returns the requested loss columns (all by default) in schema order, plus the ones the filters need."""
+    columns = list(LOSS_DATA_COLUMNS if columns is None else columns)
+    unknown = [column for column in columns if column not in LOSS_DATA_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown loss data columns: {unknown}. Must be among {LOSS_DATA_COLUMNS}.")
+    needed = set(columns) | {"Timestamp"}
+    if business_units:
+        needed.add("Business_Unit")
+    if risk_categories:
+        needed.add("Risk_Category")
+    return [column for column in LOSS_DATA_COLUMNS if column in columns], [column for column in LOSS_DATA_COLUMNS if column in needed]
+
+def _check_columns(available, needed, source):
+    missing = [column for column in needed if column not in available]
+    if missing:
+        raise ValueError(f"'{source}' is missing required columns: {', '.join(missing)}")
+
+def _date_bounds(start_date, end_date):
+    """Returns the [start, end) timestamps of an inclusive date range; either side may be open."""
+    start = pd.Timestamp(start_date) if start_date is not None else None
+    end = pd.Timestamp(end_date) + pd.Timedelta(days=1) if end_date is not None else None
+    return start, end
+
+def _loss_filter(schema, start_date, end_date, business_units, risk_categories):
+    """Builds the Arrow filter for the columns whose stored type allows it, or None.
+
+    Columns stored with another type (e.g. timestamps as text) are filtered after
+    coercion instead.
+    """
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    conditions = []
+    start, end = _date_bounds(start_date, end_date)
+    if "Timestamp" in schema.names and pa.types.is_timestamp(schema.field("Timestamp").type):
+        timestamp_type = schema.field("Timestamp").type
+        # Bounds are typed like the column; tz-aware columns are coerced to naive UTC, so the dates are UTC
+        bounds = [bound if bound is None or timestamp_type.tz is None else bound.tz_localize("UTC") for bound in (start, end)]
+        if start is not None:
+            conditions.append(ds.field("Timestamp") >= pa.scalar(bounds[0], type=timestamp_type))
+        if end is not None:
+            conditions.append(ds.field("Timestamp") < pa.scalar(bounds[1], type=timestamp_type))
+    # Month-partitioned datasets (write_loss_data_parquet) are pruned by directory as well
+    if "Year_Month" in schema.names and pa.types.is_string(schema.field("Year_Month").type):
+        if start is not None:
+            conditions.append(ds.field("Year_Month") >= start.strftime("%Y-%m"))
+        if end is not None:
+            conditions.append(ds.field("Year_Month") <= (end - pd.Timedelta(days=1)).strftime("%Y-%m"))
+    for column, values in (("Business_Unit", business_units), ("Risk_Category", risk_categories)):
+        if values and column in schema.names:
+            field_type = schema.field(column).type
+            if pa.types.is_string(field_type) or (pa.types.is_dictionary(field_type) and pa.types.is_string(field_type.value_type)):
+                conditions.append(ds.field(column).isin(list(values)))
+    if not conditions:
+        return None
+    expression = conditions[0]
+    for condition in conditions[1:]:
+        expression = expression & condition
+    return expression
+
+def _read_csv_table(path, columns, start_date, end_date, business_units, risk_categories, use_threads):
+    """Reads a CSV file with pyarrow's multithreaded parser.
+
+    Columns are parsed straight into the loss schema's types; a file with any value
+    that does not parse is re-read as text so ``coerce_loss_data`` can reject just the
+    offending rows, and is filtered only after coercion.
+    """
+    import pyarrow as pa
+    import pyarrow.csv as pcsv
+
+    read_options = pcsv.ReadOptions(use_threads=use_threads, block_size=CSV_BLOCK_SIZE)
+    header = pcsv.open_csv(path, read_options=pcsv.ReadOptions(block_size=1 << 16)).schema.names
+    _check_columns(header, columns, path)
+
+    types = _arrow_loss_types()
+    convert_options = pcsv.ConvertOptions(
+        include_columns=columns,
+        column_types={column: types[column] for column in columns},
+        true_values=NEAR_MISS_TRUE_VALUES,
+        false_values=NEAR_MISS_FALSE_VALUES,
+        strings_can_be_null=True,
+    )
+    try:
+        table = pcsv.read_csv(path, read_options=read_options, convert_options=convert_options)
+        typed = table.num_rows == 0 or not any(table.column(column).null_count for column in columns)
+    except pa.ArrowInvalid:
+        typed = False
+    if not typed:
+        convert_options = pcsv.ConvertOptions(include_columns=columns, column_types={column: pa.string() for column in columns})
+        return pcsv.read_csv(path, read_options=read_options, convert_options=convert_options)
+    expression = _loss_filter(table.schema, start_date, end_date, business_units, risk_categories)
+    return table.filter(expression) if expression is not None else table
+
+def _read_parquet_table(path, columns, start_date, end_date, business_units, risk_categories, use_threads):
+    """Reads a Parquet file or hive-partitioned directory through a memory-mapped dataset.
+
+    Only ``columns`` are decoded, and the filters are pushed down so row groups whose
+    statistics (and partitions whose directory names) rule them out are skipped.
+    """
+    import pyarrow.dataset as ds
+    from pyarrow import fs
+
+    dataset = ds.dataset(path, format='parquet', partitioning='hive', filesystem=fs.LocalFileSystem(use_mmap=True))
+    _check_columns(dataset.schema.names, columns, path)
+    expression = _loss_filter(dataset.schema, start_date, end_date, business_units, risk_categories)
+    return dataset.to_table(columns=columns, filter=expression, use_threads=use_threads)
+
+def coerce_loss_data(df, compact_amounts=False):
+    """Validates loss event rows and coerces them to the compact loss data schema.
+
+    Returns ``(loss_data, rejected)``. Rows with an unparseable Timestamp, a missing
+    label, a missing or non-positive Loss_Amount, a missing or negative
+    Recovery_Time_Days, or a Near_Miss_Flag that is not a recognised boolean are
+    rejected; rejected rows keep their original values plus a ``reason`` column. Columns that are already in the compact schema's
+    dtype are passed through without conversion.
+
+    Loss_Amount is kept as float64, so imported amounts stay exact to the cent. With
+    ``compact_amounts`` it is stored as float32 like simulated data, which halves the
+    column but keeps only about seven significant digits (cents are lost above $100,000).
+    """
+    reason = pd.Series('', index=df.index)
+
+    def reject(mask, message):
+        reason[(reason == '') & np.asarray(mask)] = message
+
+    columns = {}
+    if "Timestamp" in df.columns:
+        timestamps = df["Timestamp"]
+        if timestamps.dtype != 'datetime64[ns]':
+            timestamps = pd.to_datetime(timestamps, errors='coerce', format='mixed')
+            if timestamps.dt.tz is not None:
+                timestamps = timestamps.dt.tz_convert(None)
+            timestamps = timestamps.astype('datetime64[ns]')
+        reject(timestamps.isna(), 'Invalid Timestamp')
+        columns["Timestamp"] = timestamps
+    for column in LOSS_CATEGORY_COLUMNS:
+        if column in df.columns:
+            labels = df[column]
+            if not isinstance(labels.dtype, pd.CategoricalDtype):
+                labels = labels.astype('string').str.strip().replace('', pd.NA).astype('category')
+            reject(labels.isna(), f'Missing {column}')
+            columns[column] = labels
+    if "Loss_Amount" in df.columns:
+        amounts = pd.to_numeric(df["Loss_Amount"], errors='coerce')
+        # The log-moments of the loss cube need strictly positive amounts
+        reject(amounts.isna() | (amounts <= 0), 'Missing or non-positive Loss_Amount')
+        columns["Loss_Amount"] = amounts
+    if "Near_Miss_Flag" in df.columns:
+        flags = df["Near_Miss_Flag"]
+        if flags.dtype != bool:
+            text = flags.astype('string').str.strip()
+            flags = text.isin(NEAR_MISS_TRUE_VALUES)
+            reject(~(flags | text.isin(NEAR_MISS_FALSE_VALUES)), 'Invalid Near_Miss_Flag')
+        columns["Near_Miss_Flag"] = flags
+    if "Recovery_Time_Days" in df.columns:
+        days = pd.to_numeric(df["Recovery_Time_Days"], errors='coerce')
+        reject(days.isna() | (days < 0) | (days != days.round()), 'Missing or negative Recovery_Time_Days')
+        columns["Recovery_Time_Days"] = days
+
+    valid = (reason == '').to_numpy()
+    rejected = df[~valid].assign(reason=reason[~valid])
+    loss_data = pd.DataFrame({column: values[valid] for column, values in columns.items()}, columns=list(columns))
+    if "Loss_Amount" in loss_data.columns:
+        loss_data["Loss_Amount"] = loss_data["Loss_Amount"].astype(np.float32 if compact_amounts else np.float64)
+    if "Recovery_Time_Days" in loss_data.columns:
+        # The smallest integer type that holds the data, int8 for the usual 1-29 days
+        loss_data["Recovery_Time_Days"] = pd.to_numeric(loss_data["Recovery_Time_Days"].astype(np.int64), downcast='integer')
+    for column in LOSS_CATEGORY_COLUMNS:
+        if column in loss_data.columns:
+            loss_data[column] = loss_data[column].cat.remove_unused_categories()
+    return loss_data, rejected
+
+def _filter_loss_data(loss_data, start_date, end_date, business_units, risk_categories):
+    """Applies the date and label filters to coerced rows (a no-op for rows already filtered in Arrow)."""
+    mask = np.ones(len(loss_data), dtype=bool)
+    start, end = _date_bounds(start_date, end_date)
+    if start is not None:
+        mask &= (loss_data["Timestamp"] >= start).to_numpy()
+    if end is not None:
+        mask &= (loss_data["Timestamp"] < end).to_numpy()
+    if business_units:
+        mask &= loss_data["Business_Unit"].isin(business_units).to_numpy()
+    if risk_categories:
+        mask &= loss_data["Risk_Category"].isin(risk_categories).to_numpy()
+    return loss_data if mask.all() else loss_data[mask]
+
+def read_loss_data(path, columns=None, start_date=None, end_date=None, business_units=None, risk_categories=None, use_threads=True,
+                   compact_amounts=False):
+    """Reads historical loss events from a CSV file, Parquet file or partitioned Parquet directory.
+
+    Returns ``(loss_data, rejected)`` like ``coerce_loss_data``, with ``loss_data`` in
+    the compact schema of ``generate_synthetic_loss_data`` and sorted by Timestamp, so
+    every dashboard and aggregate works on it unchanged. Only ``columns`` (default: all
+    of ``LOSS_DATA_COLUMNS``) are returned, and only events between ``start_date`` and
+    ``end_date`` (inclusive) in the given business units and risk categories. CSV is
+    parsed by pyarrow's multithreaded reader; Parquet is memory-mapped with the column
+    projection and filters pushed down into the scan. Loss amounts are float64 unless
+    ``compact_amounts`` is set (see ``coerce_loss_data``).
+    """
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No such loss data file or directory: '{path}'")
+    output_columns, read_columns = _read_columns(columns, business_units, risk_categories)
+    if path.lower().endswith('.csv'):
+        table = _read_csv_table(path, read_columns, start_date, end_date, business_units, risk_categories, use_threads)
+    elif path.lower().endswith('.parquet') or os.path.isdir(path):
+        table = _read_parquet_table(path, read_columns, start_date, end_date, business_units, risk_categories, use_threads)
+    else:
+        raise ValueError(f"Unsupported loss data file '{path}'. Use a .csv or .parquet file or a Parquet directory.")
+
+    loss_data, rejected = coerce_loss_data(table.to_pandas(), compact_amounts)
+    loss_data = _filter_loss_data(loss_data, start_date, end_date, business_units, risk_categories)
+    if not loss_data["Timestamp"].is_monotonic_increasing:
+        loss_data = loss_data.sort_values("Timestamp", kind='stable')
+    loss_data = loss_data[output_columns].reset_index(drop=True)
+    return loss_data, rejected
+
+def loss_file_cache_key(path, start_date=None, end_date=None, business_units=(), risk_categories=()):
+    """Returns a hashable key for a loss data file and filters, as long as a ``loss_data_cache_key``.
+
+    The key includes the file's modification time and size (the newest file for a
+    directory), so a re-exported file is read again rather than served from a cache.
+    """
+    path = os.path.abspath(path)
+    if os.path.isdir(path):
+        stats = [os.stat(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names]
+        modified = (max((stat.st_mtime_ns for stat in stats), default=0), sum(stat.st_size for stat in stats))
+    else:
+        stat = os.stat(path)
+        modified = (stat.st_mtime_ns, stat.st_size)
+    return ("file", path, modified, start_date, end_date, (tuple(business_units or ()), tuple(risk_categories or ())))
+
+def loss_data_date_range(loss_data, start_date=None, end_date=None):
+    """Returns the (start, end) dates a loaded dataset covers: the requested range, else its first and last event."""
+    if start_date is None:
+        start_date = loss_data["Timestamp"].iloc[0].date() if len(loss_data) else datetime.date.today()
+    if end_date is None:
+        end_date = loss_data["Timestamp"].iloc[-1].date() if len(loss_data) else start_date
+    return start_date, end_date
@@ -0,0 +1,92 @@
+import json
+import time
+
+class RunProfile:
+    """Timings, DataFrame footprints and chart payload sizes recorded during one script run.
+
+    Sections are sequential: ``section(name)`` starts timing ``name`` and closes the
+    section that was open before it, which matches the top-to-bottom flow of a page
+    script without re-indenting it. Each record is a flat dict so the profile can be
+    shown as a table, logged as JSON lines or exposed in Prometheus text format.
+    """
+
+    enabled = True
+
+    def __init__(self):
+        self.started = time.time()
+        self.page = None
+        self.records = []
+        self._open = None
+
+    @property
+    def current_section(self):
+        return self._open[0] if self._open is not None else None
+
+    def section(self, name):
+        """Closes the open section, if any, and starts timing ``name``."""
+        self.end_section()
+        self._open = (name, time.perf_counter())
+
+    def end_section(self):
+        """Closes the open section and records its wall time."""
+        if self._open is not None:
+            name, started = self._open
+            self._open = None
+            self.records.append({"page": self.page, "section": name, "metric": "seconds", "value": time.perf_counter() - started})
+
+    def record(self, section, metric, value):
+        """Records an extra measurement (e.g. ``payload_bytes`` or ``dataframe_bytes``) for a section."""
+        self.records.append({"page": self.page, "section": section, "metric": metric, "value": value})
+
+    def to_records(self):
+        self.end_section()
+        return list(self.records)
+
+    def to_json_lines(self):
+        """Returns one JSON object per measurement, stamped with the run start time."""
+        return "\n".join(json.dumps({"run_started": self.started, **record}) for record in self.to_records())
+
+    def to_prometheus(self, prefix="qulab"):
+        """Returns the measurements as Prometheus text exposition format gauges.
+
+        Measurements of the same metric, page and section (e.g. the payloads of two
+        charts in one section) are summed like in the sidebar table, since Prometheus
+        rejects a scrape with duplicate series.
+        """
+        by_metric = {}
+        for record in self.to_records():
+            series = by_metric.setdefault(record["metric"], {})
+            labels = (record["page"], record["section"])
+            series[labels] = series.get(labels, 0) + record["value"]
+        lines = []
+        for metric, series in by_metric.items():
+            name = f"{prefix}_section_{metric}"
+            lines.append(f"# HELP {name} Page section {metric.replace('_', ' ')} in the last script run")
+            lines.append(f"# TYPE {name} gauge")
+            for (page, section), value in series.items():
+                lines.append(f'{name}{{page="{_escape_label(page)}",section="{_escape_label(section)}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+class NullProfile:
+    """Drop-in RunProfile that records nothing, used when diagnostics are off."""
+
+    enabled = False
+    page = None
+    current_section = None
+
+    def section(self, name):
+        pass
+
+    def end_section(self):
+        pass
+
+    def record(self, section, metric, value):
+        pass
+
+    def to_records(self):
+        return []
+
+NULL_PROFILE = NullProfile()
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
@@ -0,0 +1,156 @@
+import itertools
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_JOB_WORKERS = int(os.environ.get("QULAB_JOB_WORKERS", "2"))
+
+class JobCancelled(Exception):
+    """Raised inside a job's function when the job has been cancelled."""
+
+class Job:
+    """Handle to one background job: its state, progress, latest partial result and outcome.
+
+    The job's function receives the handle and calls ``report`` as it makes progress;
+    ``report`` raises ``JobCancelled`` once ``cancel`` has been requested, so the function
+    stops at its next checkpoint, keeping the last partial result it reported. Every
+    attribute can be read from any thread while the job runs.
+    """
+
+    def __init__(self, job_id, description):
+        self.id = job_id
+        self.description = description
+        self.state = "queued"
+        self.progress = 0.0
+        self.message = "Waiting for a free worker"
+        self.partial = None
+        self.result = None
+        self.error = None
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self._cancel_requested = threading.Event()
+        self._finished = threading.Event()
+
+    @property
+    def done(self):
+        return self.state in ("done", "failed", "cancelled")
+
+    @property
+    def cancel_requested(self):
+        return self._cancel_requested.is_set()
+
+    @property
+    def elapsed(self):
+        """Seconds spent running so far (or in total, once finished)."""
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.time()) - self.started
+
+    def report(self, progress, message=None, partial=None):
+        """Records progress (0 to 1), a status message and an optional partial result.
+
+        Raises ``JobCancelled`` if the job has been cancelled, so calling it between
+        chunks of work is also the job's cancellation checkpoint.
+        """
+        if self.cancel_requested:
+            raise JobCancelled()
+        self.progress = min(max(float(progress), 0.0), 1.0)
+        if message is not None:
+            self.message = message
+        if partial is not None:
+            self.partial = partial
+
+    def cancel(self):
+        """Asks the job to stop; a queued job never starts, a running one stops at its next ``report``."""
+        self._cancel_requested.set()
+
+    def wait(self, timeout=None):
+        """Blocks until the job has finished; returns False if ``timeout`` seconds passed first."""
+        return self._finished.wait(timeout)
+
+class JobManager:
+    """Runs jobs on a bounded pool of worker threads shared by every session.
+
+    At most ``max_workers`` jobs run at once; further jobs queue in submission order.
+    Workers are threads rather than processes so that finished datasets land directly
+    in the shared dataset cache without being pickled; the numpy work inside a job
+    releases the GIL, and sessions stay responsive because they only poll job handles.
+    """
+
+    def __init__(self, max_workers=DEFAULT_JOB_WORKERS):
+        self.max_workers = max(1, int(max_workers))
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="qulab-job")
+        self._ids = itertools.count(1)
+        self._active = {}
+        self._lock = threading.Lock()
+
+    def submit(self, description, function, *args, **kwargs):
+        """Queues ``function(job, *args, **kwargs)`` and returns its ``Job`` handle at once."""
+        job = Job(next(self._ids), description)
+        with self._lock:
+            self._active[job.id] = job
+        self._executor.submit(self._run, job, function, args, kwargs)
+        return job
+
+    def _run(self, job, function, args, kwargs):
+        try:
+            if job.cancel_requested:
+                raise JobCancelled()
+            job.started = time.time()
+            job.state = "running"
+            job.message = "Started"
+            job.result = function(job, *args, **kwargs)
+            job.progress = 1.0
+            state = "done"
+        except JobCancelled:
+            state = "cancelled"
+        except Exception as error:
+            job.error = error
+            state = "failed"
+        job.finished = time.time()
+        if state == "done":
+            # The result supersedes the partial results; a cancelled or failed job keeps its last one
+            job.partial = None
+        job.state = state
+        with self._lock:
+            self._active.pop(job.id, None)
+            if state == "done":
+                self.completed += 1
+            elif state == "failed":
+                self.failed += 1
+            else:
+                self.cancelled += 1
+        job._finished.set()
+
+    def queue_position(self, job):
+        """Returns how many jobs were submitted before a queued ``job`` and are still waiting (0 once it runs)."""
+        with self._lock:
+            if job.state != "queued":
+                return 0
+            return sum(1 for other in self._active.values() if other.state == "queued" and other.id < job.id)
+
+    def stats(self):
+        """Returns worker, running/queued and outcome counters."""
+        with self._lock:
+            states = [job.state for job in self._active.values()]
+            return {
+                "max_workers": self.max_workers,
+                "running": states.count("running"),
+                "queued": states.count("queued"),
+                "completed": self.completed,
+                "failed": self.failed,
+                "cancelled": self.cancelled,
+            }
+
+    def shutdown(self, cancel=True):
+        """Stops accepting jobs, optionally cancelling the unfinished ones, and waits for the workers."""
+        if cancel:
+            with self._lock:
+                for job in self._active.values():
+                    job.cancel()
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,170 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from oprisk.copula import (COPULAS, CORRELATION_CHECK_YEARS, DEFAULT_DEGREES_OF_FREEDOM, copula_scores, correlation_check,
+                           correlation_factor, reorder_to_copula)
+from oprisk.simulation import build_loss_cube, rollup_loss_cube
+
+LDA_QUANTILES = (0.5, 0.9, 0.99, 0.999)
+LDA_YEARS_PER_TASK = 50_000
+LDA_EVENTS_PER_BATCH = 2_000_000
+LDA_PARAMETER_COLUMNS = ["Business_Unit", "Risk_Category", "Frequency", "Severity_Mu", "Severity_Sigma"]
+
+def fit_lda_parameters(loss_data, period_years=None):
+    """Fits Poisson frequency and lognormal severity parameters per Business_Unit/Risk_Category cell.
+
+    Frequency is the number of events per year over ``period_years`` (by default the span
+    of the Timestamp column); Severity_Mu and Severity_Sigma are the mean and sample
+    standard deviation of the logarithm of the cell's loss amounts.
+    """
+    if period_years is None:
+        span = loss_data['Timestamp'].max() - loss_data['Timestamp'].min()
+        period_years = (span.days + 1) / 365.25
+    return fit_lda_parameters_from_cube(build_loss_cube(loss_data), period_years)
+
+def fit_lda_parameters_from_cube(cube, period_years):
+    """Fits the LDA parameters from the log-loss moments held in a loss cube."""
+    cells = rollup_loss_cube(cube, ['Business_Unit', 'Risk_Category'])
+    counts = cells['Event_Count']
+    mu = cells['Log_Loss_Sum'] / counts
+    variance = (cells['Log_Loss_Sum_Sq'] - counts * mu ** 2) / (counts - 1).where(counts > 1)
+    return pd.DataFrame({
+        'Business_Unit': cells['Business_Unit'],
+        'Risk_Category': cells['Risk_Category'],
+        'Frequency': counts / period_years,
+        'Severity_Mu': mu,
+        'Severity_Sigma': np.sqrt(variance.clip(lower=0)).fillna(0.0),
+    }, columns=LDA_PARAMETER_COLUMNS)
+
+def _simulate_cell_annual_losses(cell_parameters, num_years, rng):
+    """Simulates ``num_years`` aggregate annual losses of each cell, one column per cell."""
+    # Column-major, so each cell's years are contiguous
+    cell_losses = np.zeros((num_years, len(cell_parameters)), order='F')
+    expected_events = max(cell_parameters[:, 0].sum(), 1.0)
+    years_per_batch = max(1, int(LDA_EVENTS_PER_BATCH / expected_events))
+    for batch_start in range(0, num_years, years_per_batch):
+        batch_years = min(years_per_batch, num_years - batch_start)
+        year_index = np.arange(batch_years)
+        for cell, (frequency, mu, sigma) in enumerate(cell_parameters):
+            # Compound Poisson: N ~ Poisson(frequency) events per year, each lognormal(mu, sigma)
+            counts = rng.poisson(frequency, size=batch_years)
+            severities = rng.lognormal(mean=mu, sigma=sigma, size=counts.sum())
+            cell_losses[batch_start:batch_start + batch_years, cell] = np.bincount(
+                np.repeat(year_index, counts), weights=severities, minlength=batch_years)
+    return cell_losses
+
+def _simulate_annual_losses(cell_parameters, num_years, seed_seq):
+    """Simulates ``num_years`` aggregate annual losses from one independent seed stream."""
+    return _simulate_cell_annual_losses(cell_parameters, num_years, np.random.default_rng(seed_seq)).sum(axis=1)
+
+def _simulate_correlated_annual_losses(cell_parameters, num_years, seed_seq, factor, copula, degrees_of_freedom, check_years):
+    """Simulates ``num_years`` annual losses with copula-dependent cells.
+
+    Returns the dependent and the independent annual totals of the same cell draws and
+    the first ``check_years`` dependent rows per cell.
+    """
+    rng = np.random.default_rng(seed_seq)
+    # The cells are drawn exactly as in the independent simulation and then reordered
+    cell_losses = _simulate_cell_annual_losses(cell_parameters, num_years, rng)
+    independent = cell_losses.sum(axis=1)
+    cell_losses = reorder_to_copula(cell_losses, copula_scores(rng, factor, num_years, copula, degrees_of_freedom))
+    return cell_losses.sum(axis=1), independent, cell_losses[:check_years].copy()
+
+def _cell_parameters(parameters):
+    cell_parameters = parameters[['Frequency', 'Severity_Mu', 'Severity_Sigma']].to_numpy(dtype=np.float64)
+    if (cell_parameters[:, 0] < 0).any() or (cell_parameters[:, 2] < 0).any():
+        raise ValueError("Frequency and Severity_Sigma must be non-negative.")
+    return cell_parameters
+
+def _run_year_tasks(task, cell_parameters, num_years, seed, max_workers, *task_args):
+    """Runs ``task(cell_parameters, years, seed_seq, *task_args)`` over tasks of ``LDA_YEARS_PER_TASK`` years.
+
+    Each task gets its own ``SeedSequence`` child of ``seed`` and the tasks run across a
+    process pool of ``max_workers`` (default: all cores), so the results for a given
+    seed do not depend on the worker count.
+    """
+    task_years = [min(LDA_YEARS_PER_TASK, num_years - start) for start in range(0, num_years, LDA_YEARS_PER_TASK)]
+    seeds = np.random.SeedSequence(seed).spawn(len(task_years))
+    max_workers = min(max_workers or os.cpu_count() or 1, len(task_years))
+
+    if max_workers <= 1:
+        return [task(cell_parameters, years, seed_seq, *task_args) for years, seed_seq in zip(task_years, seeds)]
+    # Spawned workers avoid forking the multi-threaded Streamlit server
+    repeated = [[argument] * len(task_years) for argument in (cell_parameters, *task_args)]
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        return list(pool.map(task, repeated[0], task_years, seeds, *repeated[1:]))
+
+def simulate_annual_losses(parameters, num_years, seed=None, max_workers=None):
+    """Simulates the aggregate annual loss distribution implied by per-cell LDA parameters.
+
+    The years are split into tasks of ``LDA_YEARS_PER_TASK``, each with its own
+    ``SeedSequence`` child of ``seed``, and run across a process pool of ``max_workers``
+    (default: all cores). The result for a given seed does not depend on the worker count.
+    """
+    results = _run_year_tasks(_simulate_annual_losses, _cell_parameters(parameters), num_years, seed, max_workers)
+    return np.concatenate(results) if results else np.zeros(0)
+
+def simulate_correlated_annual_losses(parameters, correlation, num_years, copula="Gaussian", degrees_of_freedom=DEFAULT_DEGREES_OF_FREEDOM,
+                                      seed=None, max_workers=None, check_years=CORRELATION_CHECK_YEARS):
+    """Simulates the aggregate annual loss distribution with dependent cells, joined by a Gaussian or t copula.
+
+    ``correlation`` is the cells x cells copula correlation matrix in the row order of
+    ``parameters`` (see ``oprisk.copula.cell_correlation_matrix``). Each task simulates
+    its cells' annual losses exactly as ``simulate_annual_losses`` does for the same
+    seed, draws one batch of copula scores for all its years and reorders every cell's
+    losses to the ranks of its scores (Iman-Conover), so the marginals are unchanged
+    and only the dependence differs. Returns a dict with the ``annual_losses``, the
+    ``independent_annual_losses`` of the same draws before reordering (what
+    ``simulate_annual_losses`` returns for the seed) and a ``correlation_check`` of the
+    requested against the realized correlations on the first ``check_years`` years.
+    """
+    cell_parameters = _cell_parameters(parameters)
+    factor = correlation_factor(correlation)
+    if len(factor) != len(cell_parameters):
+        raise ValueError(f"The correlation matrix has {len(factor)} rows but there are {len(cell_parameters)} cells.")
+    if copula not in COPULAS:
+        raise ValueError(f"Unknown copula '{copula}'. Must be among {list(COPULAS)}.")
+    results = _run_year_tasks(_simulate_correlated_annual_losses, cell_parameters, num_years, seed, max_workers, factor, copula,
+                              degrees_of_freedom, check_years)
+    if results:
+        annual_losses, independent, check_losses = (np.concatenate(parts) for parts in zip(*results))
+    else:
+        annual_losses, independent, check_losses = np.zeros(0), np.zeros(0), np.zeros((0, len(factor)))
+    return {
+        "annual_losses": annual_losses,
+        "independent_annual_losses": independent,
+        "correlation_check": correlation_check(check_losses[:check_years], correlation, parameters),
+    }
+
+def summarize_annual_losses(annual_losses, quantiles=LDA_QUANTILES):
+    """Returns the expected loss, VaR at each quantile and the expected shortfall at the highest one."""
+    var_levels = np.quantile(annual_losses, quantiles)
+    summary = {"Expected Loss": float(annual_losses.mean())}
+    for level, value in zip(quantiles, var_levels):
+        summary[f"VaR {level:.1%}"] = float(value)
+    summary[f"ES {quantiles[-1]:.1%}"] = float(annual_losses[annual_losses >= var_levels[-1]].mean())
+    return summary
+
+def convergence_of_estimates(annual_losses, level=0.999, num_points=20, min_years=1000):
+    """Tracks the mean, VaR and expected shortfall at ``level`` as simulated years accumulate.
+
+    Estimates are evaluated on geometrically spaced prefixes of the simulated years,
+    which are independent draws, so the curves show how the capital figures settle.
+    """
+    num_years = len(annual_losses)
+    checkpoints = np.unique(np.geomspace(min(min_years, num_years), num_years, num_points).astype(np.int64))
+    rows = []
+    for years in checkpoints:
+        prefix = annual_losses[:years]
+        var = np.quantile(prefix, level)
+        rows.append({
+            'Simulated_Years': int(years),
+            'Expected_Loss': prefix.mean(),
+            'VaR': var,
+            'Expected_Shortfall': prefix[prefix >= var].mean(),
+        })
+    return pd.DataFrame(rows)
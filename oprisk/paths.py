@@ -0,0 +1,19 @@
+import os
+
+def resolve_in_directory(directory, path):
+    """Resolves a relative ``path`` inside ``directory`` and returns its real path.
+
+    Raises ValueError for absolute paths and for anything that resolves outside the
+    directory, whether through ``..`` components or symlinks, since the real path of
+    the result is compared with the real path of the directory.
+    """
+    path = path.strip()
+    if not path:
+        raise ValueError("Enter a file name.")
+    if os.path.isabs(path) or os.path.splitdrive(path)[0]:
+        raise ValueError(f"'{path}' must be relative to {directory}.")
+    root = os.path.realpath(directory)
+    resolved = os.path.realpath(os.path.join(root, path))
+    if os.path.commonpath([root, resolved]) != root:
+        raise ValueError(f"'{path}' is outside {directory}.")
+    return resolved
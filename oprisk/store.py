@@ -0,0 +1,143 @@
+import os
+import sqlite3
+import threading
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_ASSESSMENT_DB = os.environ.get("QULAB_ASSESSMENT_DB", "risk_assessments.db")
+ASSESSMENT_FIELDS = ["unit_name", "inherent_risk", "controls", "control_effectiveness", "residual_risk", "risk_description"]
+
+class AssessmentStore:
+    """Risk assessment portfolio indexed by unit_name and persisted to SQLite.
+
+    In memory, each field is a growable object array and a dict maps unit_name to its
+    row, so an upsert is O(1) and ``frame()`` wraps the arrays as a DataFrame view
+    instead of rebuilding rows. Frames handed out are never changed afterwards: an
+    update to a row they cover first copies the arrays (copy-on-write), while appends
+    write past the end of every view. The SQLite database runs in WAL mode so many app
+    processes can share one portfolio; every write stamps its rows with a new
+    revision, and ``refresh()`` applies only rows written by other connections since
+    the last revision seen.
+    """
+
+    def __init__(self, path=DEFAULT_ASSESSMENT_DB, initial_capacity=1024):
+        self.path = path
+        self.version = 0
+        self._lock = threading.RLock()
+        self._columns = {field: np.empty(initial_capacity, dtype=object) for field in ASSESSMENT_FIELDS}
+        self._index = {}
+        self._size = 0
+        self._revision = 0
+        self._frame = None
+        self._frame_version = -1
+        # Rows covered by the views handed out by frame(); updates below this copy the arrays first
+        self._shared_rows = 0
+
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS assessments ("
+            "unit_name TEXT PRIMARY KEY, inherent_risk TEXT, controls TEXT, control_effectiveness TEXT, "
+            "residual_risk TEXT, risk_description TEXT, revision INTEGER NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS assessments_revision ON assessments (revision)")
+        self.refresh()
+
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, unit_name):
+        return unit_name in self._index
+
+    def get(self, unit_name):
+        """Returns the assessment for ``unit_name`` as a dict, or None."""
+        with self._lock:
+            row = self._index.get(unit_name)
+            if row is None:
+                return None
+            return {field: self._columns[field][row] for field in ASSESSMENT_FIELDS}
+
+    def upsert(self, assessment):
+        """Adds or updates one assessment; returns True when it was newly added."""
+        added, _ = self.upsert_many([assessment])
+        return added == 1
+
+    def upsert_many(self, assessments):
+        """Adds or updates a batch of assessments in one transaction; returns (added, updated)."""
+        if isinstance(assessments, pd.DataFrame):
+            assessments = assessments[ASSESSMENT_FIELDS].to_dict('records')
+        rows = [tuple(assessment[field] for field in ASSESSMENT_FIELDS) for assessment in assessments]
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Catch up with other writers while holding the write lock
+                self.refresh()
+                revision = self._revision + 1
+                self._conn.executemany(
+                    "INSERT INTO assessments VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT(unit_name) DO UPDATE SET "
+                    "inherent_risk=excluded.inherent_risk, controls=excluded.controls, "
+                    "control_effectiveness=excluded.control_effectiveness, residual_risk=excluded.residual_risk, "
+                    "risk_description=excluded.risk_description, revision=excluded.revision",
+                    [row + (revision,) for row in rows],
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._revision = revision
+            added = self._apply(rows)
+            return added, len(rows) - added
+
+    def refresh(self):
+        """Applies rows written by other connections since the last revision seen."""
+        with self._lock:
+            changed = self._conn.execute(
+                f"SELECT {', '.join(ASSESSMENT_FIELDS)}, revision FROM assessments WHERE revision > ? ORDER BY revision",
+                (self._revision,),
+            ).fetchall()
+            if changed:
+                self._apply([row[:-1] for row in changed])
+                self._revision = changed[-1][-1]
+
+    def frame(self):
+        """Returns the portfolio as a DataFrame view over the column arrays, reused until the next write."""
+        with self._lock:
+            if self._frame_version != self.version:
+                self._frame = pd.DataFrame(
+                    {field: pd.Series(self._columns[field][:self._size], dtype=object, copy=False) for field in ASSESSMENT_FIELDS},
+                    copy=False,
+                )
+                self._frame_version = self.version
+            self._shared_rows = self._size
+            return self._frame
+
+    def close(self):
+        self._conn.close()
+
+    def _apply(self, rows):
+        added = 0
+        for row in rows:
+            position = self._index.get(row[0])
+            if position is not None and position < self._shared_rows:
+                self._columns = {field: values.copy() for field, values in self._columns.items()}
+                self._shared_rows = 0
+            if position is None:
+                if self._size == len(self._columns["unit_name"]):
+                    self._grow()
+                position = self._size
+                self._index[row[0]] = position
+                self._size += 1
+                added += 1
+            for field, value in zip(ASSESSMENT_FIELDS, row):
+                self._columns[field][position] = value
+        if rows:
+            self.version += 1
+        return added
+
+    def _grow(self):
+        for field, values in self._columns.items():
+            grown = np.empty(len(values) * 2, dtype=object)
+            grown[:len(values)] = values
+            self._columns[field] = grown
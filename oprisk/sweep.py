@@ -0,0 +1,118 @@
+import itertools
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from oprisk.simulation import (DEFAULT_BUSINESS_UNITS, DEFAULT_NEAR_MISS_PROBABILITY, DEFAULT_RISK_CATEGORIES, DEFAULT_SEVERITY_MU,
+                               DEFAULT_SEVERITY_SIGMA, build_loss_cube, generate_synthetic_loss_data, summarize_loss_cube)
+
+SWEEP_QUANTILES = (0.5, 0.9, 0.99, 0.999)
+SCENARIO_PARAMETERS = ["num_events", "start_date", "end_date", "business_units", "risk_categories",
+                       "severity_mu", "severity_sigma", "near_miss_probability"]
+SCENARIO_DEFAULTS = {
+    "business_units": DEFAULT_BUSINESS_UNITS,
+    "risk_categories": DEFAULT_RISK_CATEGORIES,
+    "severity_mu": DEFAULT_SEVERITY_MU,
+    "severity_sigma": DEFAULT_SEVERITY_SIGMA,
+    "near_miss_probability": DEFAULT_NEAR_MISS_PROBABILITY,
+}
+
+def expand_scenario_grid(grid):
+    """Expands a grid of generator parameters into one scenario dict per combination.
+
+    ``grid`` maps parameter names from ``SCENARIO_PARAMETERS`` to a list of values to try
+    (a single value is used as is). Business unit and risk category values are lists
+    themselves, so pass a list of lists to vary them. Unspecified parameters take the
+    generator defaults; ``num_events``, ``start_date`` and ``end_date`` are required.
+    """
+    unknown = sorted(set(grid) - set(SCENARIO_PARAMETERS))
+    if unknown:
+        raise ValueError(f"Unknown scenario parameters: {unknown}. Must be among {SCENARIO_PARAMETERS}.")
+    missing = [name for name in ("num_events", "start_date", "end_date") if name not in grid]
+    if missing:
+        raise ValueError(f"Scenario grid is missing required parameters: {missing}.")
+
+    axes = {}
+    for name in SCENARIO_PARAMETERS:
+        values = grid.get(name, SCENARIO_DEFAULTS.get(name))
+        is_list_parameter = name in ("business_units", "risk_categories")
+        if not isinstance(values, (list, tuple)) or (is_list_parameter and not (values and isinstance(values[0], (list, tuple)))):
+            values = [values]
+        axes[name] = [list(value) if is_list_parameter else value for value in values]
+    return [dict(zip(axes, combination)) for combination in itertools.product(*axes.values())]
+
+def summarize_scenario(loss_data, quantiles=SWEEP_QUANTILES):
+    """Reduces one simulated dataset to headline statistics and a per-business-unit breakdown."""
+    aggregates = summarize_loss_cube(build_loss_cube(loss_data))
+    totals = aggregates["totals"]
+    loss_by_bu = aggregates["loss_by_bu"].sort_values('Loss_Amount', ascending=False)
+    bu_counts = loss_data['Business_Unit'].value_counts()
+    summary = {
+        "Events": totals["event_count"],
+        "Total_Loss": totals["total_loss"],
+        "Average_Loss": totals["average_loss"],
+        "Max_Loss": totals["max_loss"],
+        "Near_Miss_Rate": float(loss_data['Near_Miss_Flag'].mean()),
+        "Average_Recovery_Days": totals["average_recovery_days"],
+    }
+    for level, value in zip(quantiles, np.quantile(loss_data['Loss_Amount'].to_numpy(dtype=np.float64), quantiles)):
+        summary[f"Loss_P{level * 100:g}"] = float(value)
+    # Concentration ratio: share of total losses from the largest business unit
+    summary["Top_Business_Unit"] = str(loss_by_bu['Business_Unit'].iloc[0])
+    summary["Concentration_Ratio"] = loss_by_bu['Loss_Amount'].iloc[0] / totals["total_loss"]
+    by_bu = pd.DataFrame({
+        'Business_Unit': loss_by_bu['Business_Unit'].astype(str).to_numpy(),
+        'Event_Count': bu_counts.reindex(loss_by_bu['Business_Unit']).to_numpy(),
+        'Total_Loss': loss_by_bu['Loss_Amount'].to_numpy(),
+        'Loss_Share': (loss_by_bu['Loss_Amount'] / totals["total_loss"]).to_numpy(),
+    })
+    return summary, by_bu
+
+def _run_scenario(scenario, seed):
+    """Simulates one scenario in a worker and returns only its summary statistics."""
+    loss_data = generate_synthetic_loss_data(seed=seed, **scenario)
+    if len(loss_data) == 0:
+        raise ValueError("Each scenario needs at least one event.")
+    return summarize_scenario(loss_data)
+
+def scenario_label(scenario, varying):
+    """Describes a scenario by the parameters that differ across the sweep."""
+    parts = []
+    for name in varying:
+        value = scenario[name]
+        if isinstance(value, list):
+            value = "+".join(map(str, value))
+        parts.append(f"{name}={value}")
+    return ", ".join(parts) or "base"
+
+def run_scenario_sweep(scenarios, seed=None, max_workers=None):
+    """Runs every scenario across a process pool and returns (summary, by_business_unit) DataFrames.
+
+    Each scenario gets an independent ``SeedSequence`` child of ``seed``, so results do
+    not depend on the worker count. Workers return summary statistics only, never raw
+    rows, so the sweep scales with the cores available rather than with memory traffic.
+    """
+    seeds = [int(child.generate_state(1)[0]) for child in np.random.SeedSequence(seed).spawn(len(scenarios))]
+    max_workers = min(max_workers or os.cpu_count() or 1, len(scenarios))
+
+    if max_workers <= 1:
+        results = [_run_scenario(scenario, scenario_seed) for scenario, scenario_seed in zip(scenarios, seeds)]
+    else:
+        # Spawned workers avoid forking the multi-threaded Streamlit server
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            results = list(pool.map(_run_scenario, scenarios, seeds))
+
+    varying = [name for name in SCENARIO_PARAMETERS if len({repr(scenario[name]) for scenario in scenarios}) > 1]
+    summary_rows, bu_frames = [], []
+    for number, (scenario, scenario_seed, (summary, by_bu)) in enumerate(zip(scenarios, seeds, results), start=1):
+        label = scenario_label(scenario, varying)
+        summary_rows.append({"Scenario": number, "Label": label, **scenario, "Seed": scenario_seed, **summary})
+        by_bu.insert(0, 'Scenario', number)
+        by_bu.insert(1, 'Label', label)
+        bu_frames.append(by_bu)
+    if not summary_rows:
+        return pd.DataFrame(), pd.DataFrame()
+    return pd.DataFrame(summary_rows), pd.concat(bu_frames, ignore_index=True)
@@ -0,0 +1,187 @@
+import numpy as np
+import pandas as pd
+
+ROLLING_WINDOWS = (30, 90, 365)
+EWMA_HALFLIFE_DAYS = 30
+ROLLING_VAR_LEVEL = 0.99
+QUANTILE_BINS_PER_DECADE = 100
+DENSE_PROFILE_CELLS = 1 << 22
+PROFILE_CHUNK_ROWS = 1 << 20
+
+def _loss_bins(losses, bins_per_decade):
+    """Returns the log-spaced bin of each loss; zero losses go to the lowest bin rather than log10(0)."""
+    return np.floor(np.log10(np.maximum(np.asarray(losses, dtype=np.float64), 1e-2)) * bins_per_decade).astype(np.int64)
+
+def build_daily_loss_profile(loss_data, bins_per_decade=QUANTILE_BINS_PER_DECADE):
+    """Reduces loss events to per-day, per-Business_Unit counts of losses in log-spaced bins.
+
+    Each row holds the number and sum of the losses of one business unit on one day
+    that fall into one bin (``[10**(b / bins_per_decade), 10**((b + 1) / bins_per_decade))``).
+    This is everything the rolling totals, counts, EWMA rates and rolling quantiles need,
+    in a single pass over the events. Profiles of disjoint event sets combine with
+    ``merge_daily_loss_profiles``.
+    """
+    if len(loss_data) == 0:
+        return pd.DataFrame({'Date': pd.Series([], dtype='datetime64[ns]'), 'Business_Unit': loss_data['Business_Unit'].iloc[:0],
+                             'Loss_Bin': np.array([], dtype=np.int64), 'Event_Count': np.array([], dtype=np.int64), 'Loss_Sum': np.array([])})
+    timestamps = loss_data['Timestamp'].to_numpy()
+    first_day, last_day = timestamps.min().astype('datetime64[D]'), timestamps.max().astype('datetime64[D]')
+    first_bin, last_bin = _loss_bins(loss_data['Loss_Amount'].agg(['min', 'max']).to_numpy(), bins_per_decade)
+    num_days, num_bins = int((last_day - first_day).astype(np.int64)) + 1, int(last_bin - first_bin) + 1
+    num_units = len(loss_data['Business_Unit'].cat.categories)
+    unit_codes = loss_data['Business_Unit'].cat.codes.to_numpy()
+    losses = loss_data['Loss_Amount'].to_numpy()
+
+    def cell_keys(rows):
+        # One integer key per (unit, day, bin) cell
+        days = (timestamps[rows].astype('datetime64[D]') - first_day).astype(np.int64)
+        bins = _loss_bins(losses[rows], bins_per_decade) - first_bin
+        return (unit_codes[rows].astype(np.int64) * num_days + days) * num_bins + bins
+
+    num_cells = num_units * num_days * num_bins
+    if num_cells <= DENSE_PROFILE_CELLS:
+        # Counting into the dense grid chunk by chunk is linear in the events and keeps temporaries small
+        counts, sums = np.zeros(num_cells, dtype=np.int64), np.zeros(num_cells)
+        for start in range(0, len(losses), PROFILE_CHUNK_ROWS):
+            rows = slice(start, start + PROFILE_CHUNK_ROWS)
+            keys = cell_keys(rows)
+            counts += np.bincount(keys, minlength=num_cells)
+            sums += np.bincount(keys, weights=losses[rows], minlength=num_cells)
+        cells = np.flatnonzero(counts)
+        counts, sums = counts[cells], sums[cells]
+    else:
+        cells, inverse, counts = np.unique(cell_keys(slice(None)), return_inverse=True, return_counts=True)
+        sums = np.bincount(inverse, weights=losses, minlength=len(cells))
+    unit_day, cell_bin = np.divmod(cells, num_bins)
+    cell_unit, cell_day = np.divmod(unit_day, num_days)
+    return pd.DataFrame({
+        'Date': (first_day + cell_day).astype('datetime64[ns]'),
+        'Business_Unit': pd.Categorical.from_codes(cell_unit, dtype=loss_data['Business_Unit'].dtype),
+        'Loss_Bin': cell_bin + first_bin,
+        'Event_Count': counts,
+        'Loss_Sum': sums,
+    })
+
+def merge_daily_loss_profiles(profiles):
+    """Combines daily loss profiles of disjoint event sets into the profile of their union."""
+    nonempty = [profile for profile in profiles if len(profile) > 0]
+    if len(nonempty) <= 1:
+        return nonempty[0] if nonempty else profiles[0]
+    profiles = nonempty
+    merged = pd.concat(profiles, ignore_index=True)
+    merged['Business_Unit'] = merged['Business_Unit'].astype('category')
+    # Profiles of consecutive periods (appended batches) share no cells
+    spans = sorted((profile['Date'].min(), profile['Date'].max()) for profile in profiles)
+    if all(previous[1] < following[0] for previous, following in zip(spans, spans[1:])):
+        return merged
+    return merged.groupby(['Date', 'Business_Unit', 'Loss_Bin'], observed=True, sort=False).agg(
+        Event_Count=('Event_Count', 'sum'),
+        Loss_Sum=('Loss_Sum', 'sum'),
+    ).reset_index()
+
+def _window_quantile(histogram_cumsum, window, level, first_bin, bins_per_decade):
+    """Returns the ``level`` quantile of the losses in each trailing ``window``-day window.
+
+    ``histogram_cumsum`` is the running per-bin count over days (one leading zero row),
+    so a window's histogram is the difference of two rows rather than a rescan of its
+    events. The quantile is interpolated log-linearly inside its bin.
+    """
+    num_days = histogram_cumsum.shape[0] - 1
+    ends = np.arange(1, num_days + 1)
+    counts = histogram_cumsum[ends] - histogram_cumsum[np.maximum(ends - window, 0)]
+    cumulative = np.cumsum(counts, axis=1)
+    totals = cumulative[:, -1]
+    target = level * totals
+    # First bin whose cumulative count reaches the target rank
+    position = np.minimum((cumulative < target[:, None]).sum(axis=1), counts.shape[1] - 1)
+    rows = np.arange(num_days)
+    below = cumulative[rows, position] - counts[rows, position]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        fraction = np.clip((target - below) / counts[rows, position], 0, 1)
+        quantile = 10.0 ** ((first_bin + position + fraction) / bins_per_decade)
+    return np.where(totals > 0, quantile, np.nan)
+
+def rolling_loss_analytics_from_profile(profile, start_date=None, end_date=None, windows=ROLLING_WINDOWS, var_level=ROLLING_VAR_LEVEL,
+                                        ewma_halflife=EWMA_HALFLIFE_DAYS, bins_per_decade=QUANTILE_BINS_PER_DECADE):
+    """Computes rolling per-Business_Unit loss analytics from a daily loss profile.
+
+    Returns one row per day and business unit with, for each window ``w`` in
+    ``windows``, the trailing ``w``-day loss total (``Loss_{w}D``), event count
+    (``Events_{w}D``) and empirical ``var_level`` quantile of individual losses
+    (``VaR_{w}D``), plus exponentially weighted daily loss and event rates
+    (``EWMA_Daily_Loss``, ``EWMA_Daily_Events``) with a half-life of ``ewma_halflife``
+    days. Totals and counts come from cumulative sums over the day grid, quantiles
+    from a rolling log-binned histogram (accurate to a fraction of one bin, about 2.3%
+    at the default resolution). Windows are truncated at ``start_date``.
+    """
+    first_day = pd.Timestamp(start_date if start_date is not None else profile['Date'].min())
+    last_day = pd.Timestamp(end_date if end_date is not None else profile['Date'].max())
+    dates = pd.date_range(first_day, last_day, freq='D')
+    num_days = len(dates)
+    in_range = ((profile['Date'] >= first_day) & (profile['Date'] <= last_day)).to_numpy()
+    profile = profile[in_range]
+    day_index = ((profile['Date'] - first_day).dt.days).to_numpy()
+    unit_codes = profile['Business_Unit'].cat.codes.to_numpy()
+    first_bin = int(profile['Loss_Bin'].min()) if len(profile) else 0
+    num_bins = int(profile['Loss_Bin'].max()) - first_bin + 1 if len(profile) else 1
+    bin_index = profile['Loss_Bin'].to_numpy() - first_bin
+    event_counts = profile['Event_Count'].to_numpy()
+
+    frames = []
+    for code, unit in enumerate(profile['Business_Unit'].cat.categories):
+        mask = unit_codes == code
+        if not mask.any():
+            continue
+        daily_counts = np.bincount(day_index[mask], weights=event_counts[mask], minlength=num_days)
+        daily_losses = np.bincount(day_index[mask], weights=profile['Loss_Sum'].to_numpy()[mask], minlength=num_days)
+        histogram = np.bincount(day_index[mask] * num_bins + bin_index[mask], weights=event_counts[mask],
+                                minlength=num_days * num_bins).reshape(num_days, num_bins)
+        histogram_cumsum = np.vstack([np.zeros((1, num_bins)), np.cumsum(histogram, axis=0)])
+        count_cumsum = np.concatenate([[0.0], np.cumsum(daily_counts)])
+        loss_cumsum = np.concatenate([[0.0], np.cumsum(daily_losses)])
+
+        ends = np.arange(1, num_days + 1)
+        columns = {'Date': dates, 'Business_Unit': unit}
+        for window in windows:
+            starts = np.maximum(ends - window, 0)
+            columns[f'Loss_{window}D'] = loss_cumsum[ends] - loss_cumsum[starts]
+            columns[f'Events_{window}D'] = np.rint(count_cumsum[ends] - count_cumsum[starts]).astype(np.int64)
+            columns[f'VaR_{window}D'] = _window_quantile(histogram_cumsum, window, var_level, first_bin, bins_per_decade)
+        daily = pd.DataFrame({'Loss': daily_losses, 'Events': daily_counts})
+        ewma = daily.ewm(halflife=ewma_halflife).mean()
+        columns['EWMA_Daily_Loss'] = ewma['Loss'].to_numpy()
+        columns['EWMA_Daily_Events'] = ewma['Events'].to_numpy()
+        frames.append(pd.DataFrame(columns))
+    if not frames:
+        return pd.DataFrame(columns=['Date', 'Business_Unit'])
+    analytics = pd.concat(frames, ignore_index=True)
+    analytics['Business_Unit'] = pd.Categorical(analytics['Business_Unit'], categories=profile['Business_Unit'].cat.categories)
+    return analytics
+
+def rolling_loss_analytics(loss_data, start_date=None, end_date=None, windows=ROLLING_WINDOWS, var_level=ROLLING_VAR_LEVEL,
+                           ewma_halflife=EWMA_HALFLIFE_DAYS):
+    """Computes rolling per-Business_Unit loss analytics from loss events; see ``rolling_loss_analytics_from_profile``."""
+    return rolling_loss_analytics_from_profile(build_daily_loss_profile(loss_data), start_date, end_date, windows=windows,
+                                               var_level=var_level, ewma_halflife=ewma_halflife)
+
+def deterioration_report(analytics, window=ROLLING_WINDOWS[0]):
+    """Compares each business unit's latest ``window``-day totals, counts and VaR with the window before.
+
+    Units whose losses, event counts or tail losses rose against the previous window
+    are the ones to look at first; the report is sorted by the change in loss total.
+    """
+    rows = []
+    for unit, unit_analytics in analytics.groupby('Business_Unit', observed=True, sort=False):
+        if len(unit_analytics) <= window:
+            continue
+        latest, previous = unit_analytics.iloc[-1], unit_analytics.iloc[-1 - window]
+        row = {'Business_Unit': unit}
+        for metric in ('Loss', 'Events', 'VaR'):
+            column = f'{metric}_{window}D'
+            row[column] = latest[column]
+            row[f'Previous_{column}'] = previous[column]
+            row[f'{metric}_Change'] = latest[column] / previous[column] - 1 if previous[column] else np.nan
+        rows.append(row)
+    if not rows:
+        return pd.DataFrame()
+    return pd.DataFrame(rows).sort_values('Loss_Change', ascending=False, ignore_index=True)
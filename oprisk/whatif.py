@@ -0,0 +1,103 @@
+import numpy as np
+import pandas as pd
+
+from oprisk.assessment import (CONTROL_EFFECTIVENESS_LEVELS, INHERENT_RISK_LEVELS, RESIDUAL_RISK_LEVELS, RESIDUAL_RISK_LOOKUP,
+                               level_codes)
+
+CONTROL_CHANGE_FIELDS = ["to", "from", "units", "inherent_risk"]
+
+def encode_portfolio(portfolio):
+    """Encodes a portfolio's unit names and risk levels once, for any number of what-if scenarios."""
+    inherent = level_codes(portfolio['inherent_risk'], INHERENT_RISK_LEVELS)
+    control = level_codes(portfolio['control_effectiveness'], CONTROL_EFFECTIVENESS_LEVELS)
+    if (inherent < 0).any() or (control < 0).any():
+        raise ValueError("Unknown inherent risk or control effectiveness level.")
+    unit_name = portfolio['unit_name'].astype('str').reset_index(drop=True)
+    return {
+        "unit_name": unit_name,
+        # Lower-cased once, so unit filters match case-insensitively with a plain substring scan
+        "unit_key": unit_name.str.lower(),
+        "inherent": inherent,
+        "control": control,
+    }
+
+def _codes(levels, allowed, field):
+    unknown = [level for level in levels if level not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown {field} levels: {unknown}. Must be among {allowed}.")
+    return [allowed.index(level) for level in levels]
+
+def apply_control_changes(encoded, changes):
+    """Returns the control effectiveness codes of an encoded portfolio after ``changes``.
+
+    Each change is a dict that sets control effectiveness ``to`` a level for every unit
+    matching all of its optional filters: current levels in ``from``, inherent risk
+    levels in ``inherent_risk``, and ``units``, a case-insensitive substring of the
+    unit name. Changes apply in order, each to the result of the previous one.
+    """
+    control = encoded["control"].copy()
+    for change in changes:
+        unknown = sorted(set(change) - set(CONTROL_CHANGE_FIELDS))
+        if unknown or "to" not in change:
+            raise ValueError(f"Control changes need a 'to' level and only the fields {CONTROL_CHANGE_FIELDS}; got {sorted(change)}.")
+        target, = _codes([change["to"]], CONTROL_EFFECTIVENESS_LEVELS, "control effectiveness")
+        mask = np.ones(len(control), dtype=bool)
+        if change.get("from"):
+            mask &= np.isin(control, _codes(change["from"], CONTROL_EFFECTIVENESS_LEVELS, "control effectiveness"))
+        if change.get("inherent_risk"):
+            mask &= np.isin(encoded["inherent"], _codes(change["inherent_risk"], INHERENT_RISK_LEVELS, "inherent risk"))
+        if change.get("units"):
+            mask &= encoded["unit_key"].str.contains(change["units"].lower(), regex=False).to_numpy(dtype=bool)
+        control[mask] = target
+    return control
+
+def residual_risk_heat_map(inherent, control, approach):
+    """Counts assessments per inherent risk x control effectiveness cell, with each cell's residual risk."""
+    if approach not in RESIDUAL_RISK_LOOKUP:
+        raise ValueError("Invalid approach. Must be 'Simple' or 'Weighted'.")
+    counts = np.bincount(inherent.astype(np.int64) * len(CONTROL_EFFECTIVENESS_LEVELS) + control,
+                         minlength=len(INHERENT_RISK_LEVELS) * len(CONTROL_EFFECTIVENESS_LEVELS))
+    cells = pd.MultiIndex.from_product([INHERENT_RISK_LEVELS, CONTROL_EFFECTIVENESS_LEVELS], names=['Inherent_Risk', 'Control_Effectiveness'])
+    heat_map = cells.to_frame(index=False)
+    heat_map['Residual_Risk'] = pd.Categorical.from_codes(RESIDUAL_RISK_LOOKUP[approach].ravel(), categories=RESIDUAL_RISK_LEVELS)
+    heat_map['Count'] = counts
+    return heat_map
+
+def run_what_if(encoded, changes=(), approach="Simple", baseline_approach=None):
+    """Applies control changes to a whole encoded portfolio and compares residual risk before and after.
+
+    "Before" is the current portfolio under ``baseline_approach`` (default: ``approach``)
+    and "after" is the changed portfolio under ``approach``, so with no changes the two
+    approaches themselves are compared. Residual risk is looked up for every unit at
+    once in ``RESIDUAL_RISK_LOOKUP``. Returns a dict with the before/after residual
+    risk ``distribution``, the before/after heat maps of counts per cell, and the
+    ``changed_units`` whose control effectiveness or residual risk changed.
+    """
+    baseline_approach = baseline_approach or approach
+    for name in (approach, baseline_approach):
+        if name not in RESIDUAL_RISK_LOOKUP:
+            raise ValueError("Invalid approach. Must be 'Simple' or 'Weighted'.")
+    inherent, control = encoded["inherent"], encoded["control"]
+    control_after = apply_control_changes(encoded, changes)
+    residual_before = RESIDUAL_RISK_LOOKUP[baseline_approach][inherent, control]
+    residual_after = RESIDUAL_RISK_LOOKUP[approach][inherent, control_after]
+
+    before = np.bincount(residual_before, minlength=len(RESIDUAL_RISK_LEVELS))
+    after = np.bincount(residual_after, minlength=len(RESIDUAL_RISK_LEVELS))
+    distribution = pd.DataFrame({'Residual_Risk': RESIDUAL_RISK_LEVELS, 'Before': before, 'After': after, 'Change': after - before})
+
+    changed = np.flatnonzero((control_after != control) | (residual_after != residual_before))
+    changed_units = pd.DataFrame({
+        'unit_name': encoded["unit_name"].take(changed).reset_index(drop=True),
+        'inherent_risk': pd.Categorical.from_codes(inherent[changed], categories=INHERENT_RISK_LEVELS),
+        'control_before': pd.Categorical.from_codes(control[changed], categories=CONTROL_EFFECTIVENESS_LEVELS),
+        'control_after': pd.Categorical.from_codes(control_after[changed], categories=CONTROL_EFFECTIVENESS_LEVELS),
+        'residual_before': pd.Categorical.from_codes(residual_before[changed], categories=RESIDUAL_RISK_LEVELS),
+        'residual_after': pd.Categorical.from_codes(residual_after[changed], categories=RESIDUAL_RISK_LEVELS),
+    })
+    return {
+        "distribution": distribution,
+        "heat_map_before": residual_risk_heat_map(inherent, control, baseline_approach),
+        "heat_map_after": residual_risk_heat_map(inherent, control_after, approach),
+        "changed_units": changed_units,
+    }
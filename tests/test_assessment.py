@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from oprisk.assessment import (CONTROL_EFFECTIVENESS_LEVELS, IMPORT_REQUIRED_FIELDS, INHERENT_RISK_LEVELS, RISK_MATRICES,
+                               calculate_residual_risk, read_assessment_file, validate_assessments)
+
+def _assessments():
+    return pd.DataFrame({
+        "unit_name": ["Retail Payments", "Trade Settlement"],
+        "inherent_risk": ["High", "Medium"],
+        "controls": ["Dual approval", "Reconciliation"],
+        "control_effectiveness": ["Effective", "Partially Effective"],
+        "risk_description": ["Payment fraud", "Failed settlements"],
+    })
+
+@pytest.mark.parametrize("missing", [None, np.nan])
+@pytest.mark.parametrize("field", IMPORT_REQUIRED_FIELDS)
+def test_null_required_field_is_rejected(field, missing):
+    assessments = _assessments().astype(object)
+    assessments.loc[0, field] = missing
+
+    valid, rejected = validate_assessments(assessments)
+
+    assert valid["unit_name"].tolist() == ["Trade Settlement"]
+    assert rejected.index.tolist() == [0]
+
+@pytest.mark.parametrize("field", IMPORT_REQUIRED_FIELDS)
+def test_null_in_categorical_column_is_rejected(field, tmp_path):
+    path = tmp_path / "assessments.parquet"
+    assessments = _assessments().astype(object)
+    assessments.loc[0, field] = None
+    # Categorical columns are written dictionary-encoded and read back as categoricals
+    assessments.astype("category").to_parquet(path)
+
+    valid, rejected = validate_assessments(read_assessment_file(str(path), path.name))
+
+    assert valid["unit_name"].tolist() == ["Trade Settlement"]
+    assert rejected.index.tolist() == [0]
+
+@pytest.mark.parametrize("approach", list(RISK_MATRICES))
+def test_batch_residual_risk_matches_row_wise(approach):
+    rng = np.random.default_rng(5)
+    num_rows = 5_000
+    df = pd.DataFrame({
+        "unit_name": [f"Unit {i}" for i in range(num_rows)],
+        "inherent_risk": np.asarray(INHERENT_RISK_LEVELS, dtype=object)[rng.integers(0, 3, num_rows)],
+        "controls": "Dual authorization",
+        "control_effectiveness": np.asarray(CONTROL_EFFECTIVENESS_LEVELS, dtype=object)[rng.integers(0, 3, num_rows)],
+        "risk_description": "Payment fraud",
+    })
+
+    valid, rejected = validate_assessments(df, approach)
+
+    expected = df.astype(str).assign(residual_risk=[calculate_residual_risk(inherent, control, approach)
+                                                    for inherent, control in zip(df["inherent_risk"], df["control_effectiveness"])])
+    assert rejected.empty
+    pd.testing.assert_frame_equal(valid, expected[valid.columns])
@@ -0,0 +1,61 @@
+import gc
+
+import numpy as np
+
+from oprisk.cache import DatasetCache
+
+def _dataset(megabytes):
+    return np.zeros(megabytes * 1024 * 1024, dtype=np.uint8)
+
+def test_handles_count_references_and_released_entries_stay_cached():
+    cache = DatasetCache(max_bytes=10 * 1024 * 1024)
+    first = cache.acquire("a", lambda: _dataset(1))
+    second = cache.acquire("a", lambda: _dataset(1))
+    assert first.entry is second.entry
+    assert cache.stats()["references"] == 2
+
+    del first
+    gc.collect()
+    assert cache.stats()["references"] == 1
+    del second
+    gc.collect()
+    stats = cache.stats()
+    assert (stats["references"], stats["shared_entries"], stats["entries"], stats["releases"]) == (0, 0, 1, 1)
+
+    misses = stats["misses"]
+    cache.get_or_create("a", lambda: _dataset(1))
+    assert cache.stats()["misses"] == misses
+
+def test_held_entries_are_pinned_and_released_entries_are_evicted_by_budget():
+    cache = DatasetCache(max_bytes=3 * 1024 * 1024)
+    held = cache.acquire("held", lambda: _dataset(2))
+    released = cache.acquire("released", lambda: _dataset(2))
+    del released
+    gc.collect()
+
+    cache.get_or_create("new", lambda: _dataset(2))
+
+    assert cache._lookup("held") is held.entry
+    assert cache._lookup("released") is None
+    assert cache.stats()["evictions"] == 1
+
+def test_release_during_garbage_collection_under_the_lock_does_not_deadlock():
+    cache = DatasetCache()
+    handle = cache.acquire("a", lambda: _dataset(1))
+    # Garbage collection can run a handle's finalizer on a thread that is inside the cache
+    with cache._lock:
+        del handle
+        gc.collect()
+    assert cache.stats()["references"] == 0
+
+def test_aggregates_count_against_the_budget_and_are_evicted_with_their_entry():
+    cache = DatasetCache(max_bytes=3 * 1024 * 1024)
+    entry = cache.get_or_create("a", lambda: _dataset(1))
+    figure = cache.get_aggregate(entry, "figure", lambda data: object(), nbytes=lambda value: 1024 * 1024)
+    assert cache.get_aggregate(entry, "figure", lambda data: object()) is figure
+    assert cache.stats()["nbytes"] == 2 * 1024 * 1024
+
+    cache.get_or_create("b", lambda: _dataset(2))
+
+    assert cache._lookup("a") is None
+    assert cache.stats()["nbytes"] == 2 * 1024 * 1024
@@ -0,0 +1,16 @@
+import pandas as pd
+import pytest
+
+from oprisk.export import export_to_file
+
+def test_export_refuses_to_overwrite_unless_asked(tmp_path):
+    path = tmp_path / "table.csv"
+    path.write_text("keep me")
+    table = pd.DataFrame({"Business_Unit": ["Retail"], "Loss_Amount": [1200.5]})
+
+    with pytest.raises(FileExistsError):
+        export_to_file(table, str(path), overwrite=False)
+    assert path.read_text() == "keep me"
+
+    export_to_file(table, str(path), overwrite=True)
+    pd.testing.assert_frame_equal(pd.read_csv(path), table)
@@ -0,0 +1,34 @@
+import datetime
+
+import pandas as pd
+import pytest
+
+from oprisk.history import LossHistory
+from oprisk.simulation import bin_loss_amounts, build_loss_cube, summarize_loss_cube
+from oprisk.timeseries import build_daily_loss_profile
+
+def _appended_history():
+    # The appended batches split February, so merged cells overlap with the parent's
+    history = LossHistory.generate(20_000, datetime.date(2023, 1, 1), datetime.date(2023, 1, 31), ["Retail Banking", "Operations"],
+                                   ["External Fraud", "System Failures"], seed=11)
+    return history.append_events(5_000, 10).append_events(8_000, 30)
+
+def test_merged_cube_matches_full_rebuild():
+    history = _appended_history()
+    full = history.frame()
+
+    pd.testing.assert_frame_equal(history.cube, build_loss_cube(full))
+    merged, rebuilt = summarize_loss_cube(history.cube), summarize_loss_cube(build_loss_cube(full))
+    for view in ("monthly", "loss_by_bu", "avg_loss_by_bu", "loss_by_risk", "loss_by_risk_bu"):
+        pd.testing.assert_frame_equal(merged[view], rebuilt[view])
+    assert merged["totals"] == pytest.approx(rebuilt["totals"])
+
+def test_merged_histogram_and_daily_profile_match_full_rebuild():
+    history = _appended_history()
+    full = history.frame()
+
+    pd.testing.assert_frame_equal(history.loss_histogram, bin_loss_amounts(full["Loss_Amount"]))
+    columns = ["Date", "Business_Unit", "Loss_Bin"]
+    merged = history.daily_profile.sort_values(columns, ignore_index=True)
+    rebuilt = build_daily_loss_profile(full).sort_values(columns, ignore_index=True)
+    pd.testing.assert_frame_equal(merged, rebuilt, check_categorical=False)
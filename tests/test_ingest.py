@@ -0,0 +1,52 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+
+from oprisk.ingest import read_loss_data
+from oprisk.lda import fit_lda_parameters
+
+def _loss_events(**overrides):
+    events = pd.DataFrame({
+        "Timestamp": pd.to_datetime(["2023-01-05", "2023-02-10", "2023-03-15", "2023-04-20"]),
+        "Business_Unit": ["Retail", "Retail", "Operations", "Operations"],
+        "Risk_Category": ["Fraud", "Fraud", "Systems", "Systems"],
+        "Loss_Amount": [1200.0, 3400.0, 560.0, 7800.0],
+        "Near_Miss_Flag": [False, True, False, False],
+        "Control_Breach_Type": ["Type1", "Type2", "Type1", "Type3"],
+        "Recovery_Time_Days": [3, 10, 5, 7],
+    })
+    return events.assign(**overrides)
+
+def test_zero_loss_amount_is_rejected(tmp_path):
+    path = tmp_path / "losses.csv"
+    _loss_events(Loss_Amount=[1200.0, 0.0, 560.0, 7800.0]).to_csv(path, index=False)
+
+    loss_data, rejected = read_loss_data(str(path))
+
+    assert len(loss_data) == 3
+    assert rejected["reason"].tolist() == ["Missing or non-positive Loss_Amount"]
+    parameters = fit_lda_parameters(loss_data)
+    assert np.isfinite(parameters[["Frequency", "Severity_Mu", "Severity_Sigma"]].to_numpy()).all()
+
+def test_date_range_filters_tz_aware_parquet(tmp_path):
+    path = tmp_path / "losses.parquet"
+    # Berlin is UTC+1 in winter, so in UTC the events fall on Jan 5, Feb 9, Mar 14 and Apr 20
+    timestamps = pd.to_datetime(["2023-01-05 12:00", "2023-02-10 00:30", "2023-03-15 00:30", "2023-04-20 12:00"])
+    _loss_events(Timestamp=timestamps.tz_localize("Europe/Berlin")).to_parquet(path, index=False)
+
+    loss_data, rejected = read_loss_data(str(path), start_date=datetime.date(2023, 2, 10), end_date=datetime.date(2023, 3, 31))
+
+    assert rejected.empty
+    assert loss_data["Timestamp"].tolist() == [pd.Timestamp("2023-03-14 23:30")]
+
+def test_loss_amounts_keep_cents(tmp_path):
+    path = tmp_path / "losses.csv"
+    amounts = [123456789.12, 3400.01, 560.99, 98765432.1]
+    _loss_events(Loss_Amount=amounts).to_csv(path, index=False)
+
+    loss_data, _ = read_loss_data(str(path))
+    compact, _ = read_loss_data(str(path), compact_amounts=True)
+
+    assert loss_data["Loss_Amount"].tolist() == amounts
+    assert compact["Loss_Amount"].dtype == np.float32
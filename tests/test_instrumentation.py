@@ -0,0 +1,16 @@
+from oprisk.instrumentation import RunProfile
+
+def test_prometheus_sums_measurements_of_one_section():
+    profile = RunProfile()
+    profile.page = "Loss Data"
+    profile.section("Loss by Business Unit")
+    profile.record("Loss by Business Unit", "payload_bytes", 1200)
+    profile.record("Loss by Business Unit", "payload_bytes", 800)
+    profile.record('Risk "Heat" Map', "payload_bytes", 50)
+
+    samples = [line for line in profile.to_prometheus().splitlines() if not line.startswith("#")]
+
+    series = [sample.rsplit(" ", 1)[0] for sample in samples]
+    assert len(series) == len(set(series)) == 3
+    assert 'qulab_section_payload_bytes{page="Loss Data",section="Loss by Business Unit"} 2000' in samples
+    assert 'qulab_section_payload_bytes{page="Loss Data",section="Risk \\"Heat\\" Map"} 50' in samples
@@ -0,0 +1,40 @@
+import threading
+
+from oprisk.jobs import JobManager
+
+def _counting_job(job, started, release):
+    for chunk in range(1, 1_000):
+        job.report(chunk / 1_000, f"Chunk {chunk}", partial={"chunks": chunk})
+        if chunk == 3:
+            started.set()
+            release.wait()
+    return "finished"
+
+def test_cancelled_job_stops_and_keeps_its_partial_result():
+    manager = JobManager(max_workers=1)
+    started, release = threading.Event(), threading.Event()
+    job = manager.submit("Counting", _counting_job, started, release)
+    queued = manager.submit("Queued", _counting_job, threading.Event(), threading.Event())
+    assert started.wait(5)
+    assert manager.queue_position(queued) == 0 and queued.state == "queued"
+
+    job.cancel()
+    queued.cancel()
+    release.set()
+
+    assert job.wait(5) and queued.wait(5)
+    assert (job.state, job.result, job.partial) == ("cancelled", None, {"chunks": 3})
+    assert queued.state == "cancelled" and queued.started is None
+    assert manager.stats()["cancelled"] == 2
+    manager.shutdown()
+
+def test_finished_job_replaces_partial_results_with_its_result():
+    manager = JobManager(max_workers=1)
+    release = threading.Event()
+    release.set()
+
+    job = manager.submit("Counting", _counting_job, threading.Event(), release)
+
+    assert job.wait(5)
+    assert (job.state, job.result, job.partial, job.progress) == ("done", "finished", None, 1.0)
+    manager.shutdown()
@@ -0,0 +1,20 @@
+import os
+
+import pytest
+
+from oprisk.paths import resolve_in_directory
+
+def test_relative_path_resolves_inside_directory(tmp_path):
+    assert resolve_in_directory(str(tmp_path), "exports/losses.csv") == os.path.join(os.path.realpath(tmp_path), "exports", "losses.csv")
+
+@pytest.mark.parametrize("path", ["/etc/passwd", "../outside.csv", "sub/../../outside.csv", ""])
+def test_paths_leaving_directory_are_rejected(tmp_path, path):
+    with pytest.raises(ValueError):
+        resolve_in_directory(str(tmp_path / "root"), path)
+
+def test_symlink_out_of_directory_is_rejected(tmp_path):
+    root = tmp_path / "root"
+    root.mkdir()
+    (root / "link.csv").symlink_to(tmp_path / "target.csv")
+    with pytest.raises(ValueError):
+        resolve_in_directory(str(root), "link.csv")
@@ -0,0 +1,60 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from oprisk.simulation import (STREAM_BLOCK_SIZE, build_loss_cube, generate_synthetic_loss_data, iter_synthetic_loss_chunks, loss_sample_candidates,
+                               merge_loss_cubes, rollup_loss_cube, sample_loss_events)
+
+START_DATE = datetime.date(2023, 1, 1)
+END_DATE = datetime.date(2023, 12, 31)
+BUSINESS_UNITS = ["Retail Banking", "Operations", "Asset Management"]
+RISK_CATEGORIES = ["External Fraud", "System Failures"]
+NUM_EVENTS = STREAM_BLOCK_SIZE + 40_000
+
+@pytest.mark.parametrize("chunk_size", [70_000, STREAM_BLOCK_SIZE, NUM_EVENTS + 1])
+def test_chunked_generation_matches_one_shot(chunk_size):
+    expected = generate_synthetic_loss_data(NUM_EVENTS, START_DATE, END_DATE, BUSINESS_UNITS, RISK_CATEGORIES, seed=7)
+
+    chunks = list(iter_synthetic_loss_chunks(NUM_EVENTS, START_DATE, END_DATE, BUSINESS_UNITS, RISK_CATEGORIES, seed=7, chunk_size=chunk_size))
+
+    assert all(len(chunk) <= chunk_size for chunk in chunks)
+    pd.testing.assert_frame_equal(pd.concat(chunks), expected, check_exact=True)
+
+def test_loss_cube_matches_raw_groupby():
+    loss_data = generate_synthetic_loss_data(50_000, START_DATE, END_DATE, BUSINESS_UNITS, RISK_CATEGORIES, seed=3)
+    half = len(loss_data) // 2
+    merged = merge_loss_cubes([build_loss_cube(loss_data.iloc[:half]), build_loss_cube(loss_data.iloc[half:])])
+    dimensions = ["Year_Month", "Business_Unit", "Risk_Category"]
+
+    raw = loss_data.assign(Year_Month=loss_data["Timestamp"].dt.to_period("M").dt.to_timestamp().astype("datetime64[ns]"),
+                           Loss_Amount=loss_data["Loss_Amount"].astype(np.float64))
+    expected = raw.groupby(dimensions, observed=True).agg(
+        Event_Count=("Loss_Amount", "size"),
+        Loss_Sum=("Loss_Amount", "sum"),
+        Loss_Min=("Loss_Amount", "min"),
+        Loss_Max=("Loss_Amount", "max"),
+        Recovery_Days_Sum=("Recovery_Time_Days", "sum"),
+        Loss_Mean=("Loss_Amount", "mean"),
+        Loss_Std=("Loss_Amount", lambda losses: losses.std(ddof=0)),
+    ).reset_index()
+
+    for cube in (build_loss_cube(loss_data), merged):
+        rolled = rollup_loss_cube(cube, dimensions)
+        pd.testing.assert_frame_equal(rolled[expected.columns], expected, check_dtype=False)
+
+def test_sample_keeps_the_largest_losses_and_every_business_unit():
+    loss_data = generate_synthetic_loss_data(100_000, START_DATE, END_DATE, BUSINESS_UNITS, RISK_CATEGORIES, seed=5)
+    largest = set(loss_data["Loss_Amount"].nlargest(500).index)
+
+    direct = sample_loss_events(loss_data, max_points=5_000, tail_points=500)
+    # Candidates of two halves are merged the way appended batches are
+    candidates = loss_sample_candidates(pd.concat([loss_sample_candidates(loss_data.iloc[:50_000], seed=1),
+                                                   loss_sample_candidates(loss_data.iloc[50_000:], seed=2)]))
+    from_candidates = sample_loss_events(candidates, max_points=5_000, tail_points=500)
+
+    for sample in (direct, from_candidates):
+        assert len(sample) <= 5_000
+        assert largest <= set(sample.index)
+        assert set(sample["Business_Unit"]) == set(BUSINESS_UNITS)
@@ -0,0 +1,37 @@
+from oprisk.store import AssessmentStore
+
+def _assessment(unit_name, residual_risk="Low"):
+    return {"unit_name": unit_name, "inherent_risk": "High", "controls": "Dual authorization",
+            "control_effectiveness": "Effective", "residual_risk": residual_risk, "risk_description": "Payment fraud"}
+
+def test_frame_is_stable_across_later_writes(tmp_path):
+    store = AssessmentStore(str(tmp_path / "assessments.db"), initial_capacity=2)
+    store.upsert(_assessment("Retail Payments"))
+    frame = store.frame()
+
+    store.upsert(_assessment("Retail Payments", "High"))
+    store.upsert_many([_assessment("Trade Settlement"), _assessment("Custody")])
+
+    assert frame["residual_risk"].tolist() == ["Low"]
+    assert store.frame()["residual_risk"].tolist() == ["High", "Low", "Low"]
+    store.close()
+
+def test_writes_persist_and_refresh_across_connections(tmp_path):
+    path = str(tmp_path / "assessments.db")
+    writer = AssessmentStore(path)
+    writer.upsert_many([_assessment("Retail Payments"), _assessment("Trade Settlement")])
+    reader = AssessmentStore(path)
+    before = reader.frame()
+
+    writer.upsert(_assessment("Trade Settlement", "Medium"))
+    writer.upsert(_assessment("Custody"))
+    reader.refresh()
+
+    assert before["residual_risk"].tolist() == ["Low", "Low"]
+    assert reader.get("Trade Settlement")["residual_risk"] == "Medium"
+    assert reader.frame()["unit_name"].tolist() == ["Retail Payments", "Trade Settlement", "Custody"]
+    writer.close()
+    reader.close()
+    reopened = AssessmentStore(path)
+    assert len(reopened) == 3 and reopened.get("Custody") == _assessment("Custody")
+    reopened.close()
@@ -0,0 +1,28 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+
+from oprisk.simulation import generate_synthetic_loss_data
+from oprisk.timeseries import QUANTILE_BINS_PER_DECADE, rolling_loss_analytics
+
+# The binned VaR is interpolated inside a log-spaced bin, so it is accurate to one bin width
+VAR_TOLERANCE = 10 ** (1 / QUANTILE_BINS_PER_DECADE) - 1
+
+def test_rolling_analytics_match_brute_force_windows():
+    loss_data = generate_synthetic_loss_data(40_000, datetime.date(2023, 1, 1), datetime.date(2023, 12, 31),
+                                             ["Retail Banking", "Operations"], ["External Fraud"], seed=4)
+    analytics = rolling_loss_analytics(loss_data, windows=(30, 90), var_level=0.99).set_index(["Date", "Business_Unit"])
+
+    days = loss_data["Timestamp"].dt.normalize()
+    for date in pd.date_range("2023-01-15", "2023-12-31", freq="7D"):
+        for unit in ("Retail Banking", "Operations"):
+            row = analytics.loc[(date, unit)]
+            for window in (30, 90):
+                in_window = (loss_data["Business_Unit"] == unit) & (days > date - pd.Timedelta(days=window)) & (days <= date)
+                losses = loss_data.loc[in_window, "Loss_Amount"].to_numpy(dtype=np.float64)
+                assert row[f"Events_{window}D"] == len(losses)
+                np.testing.assert_allclose(row[f"Loss_{window}D"], losses.sum(), rtol=1e-9)
+                # Tail order statistics are far apart, so any value between the two around the rank is exact
+                lower, upper = np.quantile(losses, 0.99, method="lower"), np.quantile(losses, 0.99, method="higher")
+                assert lower / (1 + VAR_TOLERANCE) <= row[f"VaR_{window}D"] <= upper * (1 + VAR_TOLERANCE)
@@ -0,0 +1,40 @@
+import pandas as pd
+import pytest
+
+from oprisk.assessment import RESIDUAL_RISK_LEVELS, calculate_residual_risk
+from oprisk.whatif import encode_portfolio, run_what_if
+
+def _portfolio():
+    return pd.DataFrame({
+        "unit_name": ["Operations North", "Operations South", "Retail Payments", "Trade Settlement"],
+        "inherent_risk": ["High", "Medium", "High", "Low"],
+        "control_effectiveness": ["Partially Effective", "Partially Effective", "Partially Effective", "Ineffective"],
+    })
+
+def _distribution(inherent, control, approach):
+    residual = pd.Series([calculate_residual_risk(i, c, approach) for i, c in zip(inherent, control)])
+    return residual.value_counts().reindex(RESIDUAL_RISK_LEVELS, fill_value=0).tolist()
+
+@pytest.mark.parametrize("approach", ["Simple", "Weighted"])
+def test_control_change_shifts_only_matching_units(approach):
+    portfolio = _portfolio()
+
+    result = run_what_if(encode_portfolio(portfolio), [{"from": ["Partially Effective"], "to": "Effective", "units": "OPERATIONS"}],
+                         approach=approach)
+
+    changed = portfolio["control_effectiveness"].where(~portfolio["unit_name"].str.startswith("Operations"), "Effective")
+    assert result["changed_units"]["unit_name"].tolist() == ["Operations North", "Operations South"]
+    assert result["distribution"]["Before"].tolist() == _distribution(portfolio["inherent_risk"], portfolio["control_effectiveness"], approach)
+    assert result["distribution"]["After"].tolist() == _distribution(portfolio["inherent_risk"], changed, approach)
+    heat_map = result["heat_map_after"].set_index(["Inherent_Risk", "Control_Effectiveness"])["Count"]
+    assert heat_map.sum() == len(portfolio)
+    assert heat_map[("High", "Effective")] == 1 and heat_map[("High", "Partially Effective")] == 1
+
+def test_without_changes_compares_the_two_approaches():
+    portfolio = _portfolio()
+
+    result = run_what_if(encode_portfolio(portfolio), approach="Weighted", baseline_approach="Simple")
+
+    assert result["distribution"]["Before"].tolist() == _distribution(portfolio["inherent_risk"], portfolio["control_effectiveness"], "Simple")
+    assert result["distribution"]["After"].tolist() == _distribution(portfolio["inherent_risk"], portfolio["control_effectiveness"], "Weighted")
+    assert (result["changed_units"]["control_before"] == result["changed_units"]["control_after"]).all()